@@ -0,0 +1,150 @@
+import concurrent.futures
+import csv
+import json
+
+import pokershell.config as config
+import pokershell.eval.cache as cache
+import pokershell.eval.simulation as simulation
+import pokershell.parser as parser
+
+FIELDS = ('line', 'input', 'simulator', 'player_num', 'win', 'tie', 'lose', 'total',
+          'equity', 'error')
+
+
+def format_result(result):
+    """Returns win, tie and lose percentages of result and number of games, pot
+    share percentages of the player and known opponents are given as 'equity'.
+    """
+    counts = (result.win, result.tie, result.lose)
+    record = {}
+    if isinstance(result.win, int):
+        record['total'] = result.total
+        counts = [count / result.total * 100 for count in counts]
+    record['win'], record['tie'], record['lose'] = (round(count, 4) for count in counts)
+    if result.equities:
+        record['equity'] = [round(share / result.total * 100, 4)
+                            for share in result.equities]
+    return record
+
+
+def simulate_task(task):
+    """Simulates task (simulator, player_num, cards, opponents, ranges)."""
+    simulator, player_num, cards, opponents, ranges = task
+    kwargs = {}
+    if opponents:
+        kwargs['opponents'] = opponents
+    if ranges:
+        kwargs['ranges'] = ranges
+    return simulator.simulate(player_num, *cards, **kwargs)
+
+
+class JsonLinesWriter:
+    def __init__(self, stream):
+        super().__init__()
+        self._stream = stream
+
+    def write(self, record):
+        self._stream.write(json.dumps(record) + '\n')
+        self._stream.flush()
+
+
+class CsvWriter:
+    def __init__(self, stream):
+        super().__init__()
+        self._stream = stream
+        self._writer = csv.DictWriter(stream, FIELDS)
+        self._writer.writeheader()
+
+    def write(self, record):
+        self._writer.writerow(record)
+        self._stream.flush()
+
+
+WRITERS = {'jsonl': JsonLinesWriter, 'csv': CsvWriter}
+
+
+class BatchEvaluator:
+    """Evaluates game states given by input lines in worker processes.
+
+    Lines are read lazily and records are written in order of finished simulations.
+    Lines with game states equal up to suit relabeling are simulated once, at most
+    'window' simulations are in flight, so memory does not grow with input length.
+    """
+
+    def __init__(self, writer, window=None, result_cache=None):
+        super().__init__()
+        self._writer = writer
+        self.window = window or simulation.worker_pool.processes * 4
+        self._cache = result_cache or cache.ResultCache()
+        self._manager = simulation.SimulatorManager()
+        # future -> cache key, cache key -> records waiting for the simulation
+        self._pending = {}
+        self._waiting = {}
+
+    def evaluate(self, lines):
+        try:
+            for number, line in enumerate(lines, 1):
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    self._evaluate_line(number, line)
+            self._wait(0)
+        except KeyboardInterrupt:
+            simulation.worker_pool.cancel()
+            raise
+
+    def _evaluate_line(self, number, line):
+        record = {'line': number, 'input': line}
+        try:
+            state = parser.LineParser.parse_game(line)
+        except ValueError as e:
+            self._write_error(record, str(e))
+            return
+        player_num = state.player_num or config.player_num.value
+        simulator = self._manager.find_simulator(player_num, *state.cards,
+                                                 opponents=state.opponents,
+                                                 ranges=state.ranges)
+        if not simulator:
+            self._write_error(record, 'No simulator found')
+            return
+        record['simulator'] = simulator.name
+        record['player_num'] = player_num
+        key = cache.make_key(simulator, player_num, state.cards, state.opponents,
+                             state.ranges)
+        if key in self._waiting:
+            self._waiting[key].append(record)
+            return
+        result = self._cache.get(key)
+        if result is not None:
+            self._write_result(record, result)
+            return
+        self._wait(self.window - 1)
+        future = simulation.worker_pool.submit(simulate_task,
+                                               (simulator, player_num, state.cards,
+                                                state.opponents, state.ranges))
+        self._pending[future] = key
+        self._waiting[key] = [record]
+
+    def _wait(self, max_pending):
+        while len(self._pending) > max_pending:
+            done, _ = concurrent.futures.wait(
+                self._pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                key = self._pending.pop(future)
+                records = self._waiting.pop(key)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    for record in records:
+                        self._write_error(record, str(e))
+                    continue
+                self._cache.put(key, result)
+                for record in records:
+                    self._write_result(record, result)
+
+    def _write_result(self, record, result):
+        record.update(format_result(result))
+        self._writer.write(record)
+
+    def _write_error(self, record, error):
+        record['error'] = error
+        self._writer.write(record)
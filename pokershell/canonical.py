@@ -0,0 +1,69 @@
+import itertools
+
+SUIT_NUM = 4
+CARD_NUM = 13 * SUIT_NUM
+
+_PERMUTATIONS = tuple(itertools.permutations(range(SUIT_NUM)))
+
+
+def permute(codes, perm):
+    """Relabels suits of given card codes, 'perm' maps old suit index to new one."""
+    return tuple(code & ~3 | perm[code & 3] for code in codes)
+
+
+def suit_symmetries(*groups):
+    """Returns suit permutations mapping every given group of card codes onto itself."""
+    result = []
+    for perm in _PERMUTATIONS:
+        if all(set(permute(group, perm)) == set(group) for group in groups):
+            result.append(perm)
+    return result
+
+
+def orbits(combinations, symmetries):
+    """Collapses card combinations equivalent under given suit symmetries.
+
+    Returns dictionary mapping orbit representative to orbit size.
+    """
+    weights = {}
+    for combination in combinations:
+        representative = min(tuple(sorted(permute(combination, perm)))
+                             for perm in symmetries)
+        weights[representative] = weights.get(representative, 0) + 1
+    return weights
+
+
+def canonize(*groups):
+    """Maps groups of card codes (e.g. hole cards and board) to canonical form.
+
+    Order of cards within group does not matter. Inputs equivalent by suit
+    relabeling get the same canonical form. Returns tuple (canonical_groups, perm)
+    where 'perm' maps original suit index to canonical one.
+    """
+    best, best_perm = None, None
+    for perm in _PERMUTATIONS:
+        form = tuple(tuple(sorted(permute(group, perm))) for group in groups)
+        if best is None or form < best:
+            best, best_perm = form, perm
+    return best, best_perm
+
+
+def invert(perm):
+    """Returns suit permutation reverting given one."""
+    inverse = [0] * SUIT_NUM
+    for suit, image in enumerate(perm):
+        inverse[image] = suit
+    return tuple(inverse)
+
+
+def classes(count):
+    """Returns canonical forms of all 'count' card combinations with weights.
+
+    Weight is number of combinations sharing the canonical form. For example
+    169 preflop classes are 'classes(2)', 1755 distinct flops are 'classes(3)'.
+    """
+    weights = {}
+    for combination in itertools.combinations(range(CARD_NUM), count):
+        form = canonize(combination)[0][0]
+        weights[form] = weights.get(form, 0) + 1
+    return weights
@@ -0,0 +1,192 @@
+import collections
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import pokershell.canonical as canonical
+import pokershell.config as config
+import pokershell.eval.simulation as simulation
+import pokershell.eval.tables as tables
+
+# stored results of other format or hand evaluator version are dropped on open
+CACHE_VERSION = 2
+CACHE_FILE = os.path.join(os.path.expanduser('~'), '.pokershell', 'results.sqlite')
+
+
+def make_key(simulator, player_num, cards, opponents=(), ranges=()):
+    """Returns cache key of simulation, games equivalent by suit relabeling share it."""
+    codes = [card.code for card in cards]
+    opponents = [[card.code for card in hole] for hole in opponents]
+    (hole, board, *opponents), perm = canonical.canonize(codes[:2], codes[2:],
+                                                         *opponents)
+    key = '%s|%d|%s|%s|%r' % (simulator.name, player_num,
+                              ','.join(map(str, hole)), ','.join(map(str, board)),
+                              simulator.precision)
+    if opponents:
+        key += '|' + ';'.join(','.join(map(str, other)) for other in opponents)
+    if ranges:
+        # ranges relabeled the same way as cards, long keys are hashed
+        range_keys = ';'.join(opponent_range.key(perm) for opponent_range in ranges)
+        key += '|r' + hashlib.sha1(range_keys.encode()).hexdigest()
+    return key
+
+
+class ResultCache:
+    """Simulation results cache.
+
+    Recently used results are kept in memory, all results are stored in SQLite
+    file so that they survive restart. Both are limited in size, least recently
+    used results are evicted first.
+    """
+    cache_size = config.register_option(name='cache-size', value=1024, type=int,
+                                        short=None,
+                                        description='Number of simulation results '
+                                                    'kept in memory')
+    cache_file = config.register_option(name='cache-file', value=CACHE_FILE, type=str,
+                                        short=None,
+                                        description='File storing simulation results '
+                                                    'between sessions (empty - results '
+                                                    'are not stored)')
+    cache_file_size = config.register_option(name='cache-file-size', value=100000,
+                                             type=int, short=None,
+                                             description='Number of simulation results '
+                                                         'stored in cache file')
+
+    version = '%d.%d' % (CACHE_VERSION, tables.TABLE_VERSION)
+
+    def __init__(self, size=1024, path=None, file_size=100000):
+        super().__init__()
+        self.size = size
+        self.file_size = file_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._memory = collections.OrderedDict()
+        self._connection = self._open(path) if path else None
+        # upper estimate of stored entries, counting them on every insert is slow
+        self._file_count = self._file_entries()
+
+    def _open(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(path)
+        with connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS meta '
+                               '(name TEXT PRIMARY KEY, value TEXT)')
+            connection.execute('CREATE TABLE IF NOT EXISTS results '
+                               '(key TEXT PRIMARY KEY, value TEXT, accessed REAL)')
+            row = connection.execute("SELECT value FROM meta "
+                                     "WHERE name = 'version'").fetchone()
+            if row is None or row[0] != self.version:
+                connection.execute('DELETE FROM results')
+                connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                                   (self.version,))
+        return connection
+
+    def get(self, key):
+        """Returns cached result or None."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+        if self._connection:
+            row = self._connection.execute('SELECT value FROM results WHERE key = ?',
+                                           (key,)).fetchone()
+            if row:
+                with self._connection:
+                    self._connection.execute('UPDATE results SET accessed = ? '
+                                             'WHERE key = ?', (time.time(), key))
+                result = simulation.SimulationResult(*json.loads(row[0]))
+                self._remember(key, result)
+                self.hits += 1
+                return result
+        self.misses += 1
+
+    def put(self, key, result):
+        self._remember(key, result)
+        if self._connection:
+            value = json.dumps([result.win, result.tie, result.lose,
+                                result.winning_hands, result.beating_hands,
+                                result.equities])
+            with self._connection:
+                self._connection.execute('INSERT OR REPLACE INTO results '
+                                         'VALUES (?, ?, ?)', (key, value, time.time()))
+                self._file_count += 1
+                if self._file_count > self.file_size:
+                    self._file_count = self._file_entries()
+                    excess = self._file_count - self.file_size
+                    if excess > 0:
+                        self._connection.execute('DELETE FROM results WHERE key IN '
+                                                 '(SELECT key FROM results '
+                                                 'ORDER BY accessed LIMIT ?)', (excess,))
+                        self._file_count -= excess
+
+    def simulate(self, simulator, player_num, *cards, progress=None, opponents=(),
+                 ranges=()):
+        """Returns tuple (result, previous) where 'previous' is cached result or None.
+
+        Simulation is launched on miss. Resumable simulation continues from cached
+        result, so that repeated simulation refines it. Callable 'progress' receives
+        partial results of streaming simulator. Hole cards of known opponents and
+        ranges of opponents are passed to simulator supporting them.
+        """
+        key = make_key(simulator, player_num, cards, opponents, ranges)
+        previous = self.get(key)
+        if previous is not None and not simulator.resumable:
+            return previous, previous
+        kwargs = {}
+        if previous is not None:
+            kwargs['result'] = previous
+        if progress and simulator.streaming:
+            kwargs['progress'] = progress
+        if opponents:
+            kwargs['opponents'] = opponents
+        if ranges:
+            kwargs['ranges'] = ranges
+        result = simulator.simulate(player_num, *cards, **kwargs)
+        self.put(key, result)
+        return result, previous
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def _file_entries(self):
+        if self._connection:
+            return self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        return 0
+
+    def clear(self):
+        self._memory.clear()
+        self.hits = 0
+        self.misses = 0
+        if self._connection:
+            with self._connection:
+                self._connection.execute('DELETE FROM results')
+            self._file_count = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return collections.OrderedDict([
+            ('Memory Entries', '%d / %d' % (len(self._memory), self.size)),
+            ('File Entries', '%d / %d' % (self._file_entries(), self.file_size)
+             if self._connection else '-'),
+            ('File', self.path or '-'),
+            ('Hits', self.hits),
+            ('Misses', self.misses),
+            ('Hit Rate', '%.2f%%' % (self.hits * 100 / lookups) if lookups else '-'),
+        ])
+
+    def close(self):
+        if self._connection:
+            self._connection.close()
+            self._connection = None
+
+    @classmethod
+    def from_config(cls):
+        return cls(cls.cache_size.value, cls.cache_file.value, cls.cache_file_size.value)
@@ -15,11 +15,17 @@ class EvalContext:
             self.rank_dict[card.rank].append(card)
         self.rank_counts = set(map(len, self.rank_dict.values()))
         self.rank_num = len(self.rank_dict)
+        self.rank_mask = 0
+        for card in self.cards:
+            self.rank_mask |= 1 << (card.code >> 2)
 
     def _init_suits(self):
         self.suit_dict = collections.defaultdict(list)
         for card in self.cards:
             self.suit_dict[card.suit].append(card)
+        self.suit_masks = collections.defaultdict(int)
+        for card in self.cards:
+            self.suit_masks[card.suit] |= 1 << (card.code >> 2)
         self.max_suit_count = max(map(len, self.suit_dict.values()))
 
     def get_ranks(self, count, check_better=True):
@@ -0,0 +1,249 @@
+import math
+import multiprocessing
+import multiprocessing.managers
+import os
+import queue
+import random
+import secrets
+import signal
+import socket
+import time
+import uuid
+
+import pokershell.eval.simulation as simulation
+import pokershell.eval.vectorized as vectorized
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7451
+# environment variable holding authkey of coordinator, so that it is not shown in
+# process list
+AUTHKEY_VARIABLE = 'POKERSHELL_AUTHKEY'
+
+
+def parse_address(text, default_host=DEFAULT_HOST):
+    """Returns address tuple of 'HOST[:PORT]' text, empty host is 'default_host'."""
+    host, _, port = text.partition(':')
+    return host or default_host, int(port) if port else DEFAULT_PORT
+
+
+# queues living in the coordinator's manager process
+_queues = {}
+
+
+def _get_queue(name):
+    if name not in _queues:
+        _queues[name] = queue.Queue()
+    return _queues[name]
+
+
+def _get_jobs():
+    return _get_queue('jobs')
+
+
+def _get_results():
+    return _get_queue('results')
+
+
+def _ignore_interrupt():
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class _CoordinatorManager(multiprocessing.managers.BaseManager):
+    pass
+
+
+_CoordinatorManager.register('get_jobs', callable=_get_jobs)
+_CoordinatorManager.register('get_results', callable=_get_results)
+
+
+class _WorkerManager(multiprocessing.managers.BaseManager):
+    pass
+
+
+_WorkerManager.register('get_jobs')
+_WorkerManager.register('get_results')
+
+
+class Coordinator:
+    """Distributes Monte Carlo sampling among worker processes on several hosts.
+
+    Simulation is split into jobs of fixed number of samples, each job has its own
+    random seed derived from simulation seed, so the result does not depend on
+    which worker takes which job. Workers pull jobs from shared queue, faster
+    workers simply take more of them. Job not finished within 'job_timeout' since
+    a worker started it, or taken from the queue and not started within it, is
+    queued again, so lost worker only delays simulation. Results of repeated jobs
+    are counted once.
+
+    Jobs and results are pickled, which lets anybody knowing the authkey run code
+    on coordinator and workers. Coordinator listens on loopback unless other host
+    is given, random authkey is generated unless given.
+    """
+    job_size = 20000
+    job_timeout = 30.0
+    # simulation fails when it is not finished in time or no worker reports anything
+    run_timeout = 3600.0
+    idle_timeout = 120.0
+    poll_interval = 0.1
+
+    def __init__(self, address=(DEFAULT_HOST, DEFAULT_PORT), authkey=None):
+        super().__init__()
+        self.authkey = authkey or secrets.token_hex(16).encode()
+        self._manager = _CoordinatorManager(address, self.authkey)
+        self._jobs = None
+        self._results = None
+        self.stats = {'jobs': 0, 'reissued': 0, 'workers': {}}
+
+    def start(self):
+        self._manager.start(_ignore_interrupt)
+        self._jobs = self._manager.get_jobs()
+        self._results = self._manager.get_results()
+
+    @property
+    def address(self):
+        return self._manager.address
+
+    def simulate(self, player_num, cards, sample_num, seed=None, timeout=None):
+        """Returns result of 'sample_num' samples of game drawn by workers.
+
+        Raises 'TimeoutError' when simulation is not finished within 'timeout'
+        seconds ('run_timeout' by default) or when no worker reports progress
+        within 'idle_timeout', e.g. because none is connected.
+        """
+        run_id = uuid.uuid4().hex
+        if seed is None:
+            seed = random.randrange(1 << 32)
+        job_num = -(-sample_num // self.job_size)
+        start = time.time()
+        deadline = start + (self.run_timeout if timeout is None else timeout)
+        jobs = {}
+        # job index -> [queue time, start time or None]
+        pending = {}
+        for index in range(job_num):
+            size = min(self.job_size, sample_num - index * self.job_size)
+            jobs[index] = (run_id, index, player_num, tuple(cards), size, seed + index)
+            pending[index] = [start, None]
+            self._jobs.put(jobs[index])
+        self.stats['jobs'] += job_num
+        result = simulation.ParallelSimulatorMixin._empty_result()
+        progressed = start
+        try:
+            while pending:
+                received, part = self._receive(run_id, pending)
+                now = time.time()
+                if received:
+                    progressed = now
+                if part is not None:
+                    result += part
+                if now > deadline:
+                    raise TimeoutError('Distributed simulation not finished in time, '
+                                       '%d of %d jobs pending' % (len(pending), job_num))
+                if now - progressed > self.idle_timeout:
+                    raise TimeoutError('No worker progress for %.0f seconds'
+                                       % self.idle_timeout)
+                self._reissue(jobs, pending)
+        finally:
+            self._drain()
+        return result
+
+    def _receive(self, run_id, pending):
+        """Returns tuple (received, result) of message of given simulation."""
+        try:
+            kind, job_run_id, index, worker, payload = self._results.get(
+                timeout=self.poll_interval)
+        except queue.Empty:
+            return False, None
+        if job_run_id != run_id or index not in pending:
+            return False, None
+        if kind == 'start':
+            pending[index][1] = time.time()
+            return True, None
+        del pending[index]
+        workers = self.stats['workers']
+        workers[worker] = workers.get(worker, 0) + 1
+        return True, payload
+
+    def _reissue(self, jobs, pending):
+        now = time.time()
+        queue_empty = None
+        for index, (queued, started) in pending.items():
+            if started is not None:
+                lost = now - started > self.job_timeout
+            else:
+                # job taken from empty queue but never started, its worker died
+                # between taking and starting it
+                lost = now - queued > self.job_timeout
+                if lost:
+                    if queue_empty is None:
+                        queue_empty = self._jobs.qsize() == 0
+                    lost = queue_empty
+            if lost:
+                pending[index] = [now, None]
+                self.stats['reissued'] += 1
+                self._jobs.put(jobs[index])
+
+    def _drain(self):
+        # jobs of finished simulation are not needed anymore
+        try:
+            while True:
+                self._jobs.get_nowait()
+        except queue.Empty:
+            pass
+
+    def shutdown(self):
+        self._manager.shutdown()
+
+
+class DistributedSimulator(simulation.AbstractSimulator):
+    """Uses Monte Carlo method on workers connected to coordinator.
+    Simulator draws given number of samples, results are inaccurate.
+    """
+    name = 'distributed'
+    exact = False
+    cards_num = simulation.MonteCarloSimulator.cards_num
+    players_num = simulation.MonteCarloSimulator.players_num
+
+    def __init__(self, coordinator, sim_samples=100000):
+        super().__init__()
+        self._coordinator = coordinator
+        self._sim_samples = sim_samples
+
+    def simulate(self, player_num, *cards):
+        return self._coordinator.simulate(player_num, cards, self._sim_samples)
+
+    @property
+    def precision(self):
+        return self._sim_samples
+
+
+def work(address, authkey, name=None):
+    """Processes jobs of coordinator until connection to it is lost."""
+    manager = _WorkerManager(address, authkey)
+    manager.connect()
+    jobs, results = manager.get_jobs(), manager.get_results()
+    simulator = simulation.MonteCarloSimulator()
+    sample_fc = simulator._sample_batch if vectorized.AVAILABLE else simulator._sample
+    name = name or '%s:%d' % (socket.gethostname(), os.getpid())
+    while True:
+        try:
+            run_id, index, player_num, cards, sample_num, seed = jobs.get(timeout=1)
+            results.put(('start', run_id, index, name, None))
+            result = sample_fc(player_num, math.inf, cards, sample_num=sample_num,
+                               seed=seed)
+            results.put(('done', run_id, index, name, result))
+        except queue.Empty:
+            continue
+        except (EOFError, OSError):
+            return
+
+
+def start_workers(address, authkey, processes=None):
+    """Starts worker processes on this host, returns list of them."""
+    workers = []
+    for number in range(processes or multiprocessing.cpu_count()):
+        name = '%s:%d' % (socket.gethostname(), number)
+        worker = multiprocessing.Process(target=work, args=(address, authkey, name),
+                                         daemon=True)
+        worker.start()
+        workers.append(worker)
+    return workers
@@ -1,4 +1,5 @@
 import pokershell.eval as eval
+import pokershell.eval.tables as tables
 import pokershell.model as model
 
 
@@ -82,26 +83,21 @@ class FlushEvaluator(eval.AbstractEvaluator):
 
 class StraightEvaluator(eval.AbstractEvaluator):
     def find(self, context):
-        return self._find_straight(context.cards)
+        return self._find_straight(context.rank_mask)
 
     @staticmethod
-    def _find_straight(cards):
-        ranks = {card.rank for card in cards}
-        rank_nums = sorted(map(lambda rank: rank.value[1], ranks), reverse=True)
-        if model.Rank.ACE in ranks:
-            rank_nums.append(1)
-        for rank_ord in rank_nums:
-            lower = rank_ord - 4
-            if all(r in rank_nums for r in range(lower, rank_ord + 1)):
-                return lambda: (model.Rank.from_ord(rank_ord),)
+    def _find_straight(rank_mask):
+        top = tables.STRAIGHT_TABLE[rank_mask]
+        if top:
+            return lambda: (model.Rank.from_ord(top),)
 
 
 class StraightFlushEvaluator(StraightEvaluator):
     required_suit_count = 5
 
     def find(self, context):
-        for suit_set in context.suit_dict.values():
-            if len(suit_set) >= 5:
-                result = self._find_straight(suit_set)
-                if result:
-                    return result
+        # straight within single suit mask implies at least five suited cards
+        for suit_mask in context.suit_masks.values():
+            result = self._find_straight(suit_mask)
+            if result:
+                return result
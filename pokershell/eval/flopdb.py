@@ -0,0 +1,126 @@
+import array
+import bisect
+import itertools
+import mmap
+import os
+import struct
+import zlib
+
+import pokershell.canonical as canonical
+import pokershell.model as model
+
+# binary database of exact heads-up flop results: header, sorted keys of canonical
+# hole and flop codes, then record of every key in native byte order
+DATABASE_VERSION = 1
+DATABASE_FILE = os.path.join(os.path.expanduser('~'), '.pokershell', 'flop.bin')
+# record: win, tie and lose counts, winning hands and beating hands histograms
+RECORD_SIZE = 3 + 2 * len(model.Hand)
+_MAGIC = b'PSFL'
+_HEADER = struct.Struct('=4sIII')
+_CODE_BITS = 6
+
+
+def pack_key(hole, flop):
+    """Returns database key of canonical hole and flop codes."""
+    key = 0
+    for code in itertools.chain(hole, flop):
+        key = key << _CODE_BITS | code
+    return key
+
+
+def pack_record(win, tie, lose, winning_hands, beating_hands):
+    return array.array('I', itertools.chain((win, tie, lose), winning_hands,
+                                            beating_hands))
+
+
+def game_forms(holes=None):
+    """Returns sorted list of canonical (hole, flop) forms.
+
+    All 1286792 forms are returned unless canonical holes are given.
+    """
+    result = []
+    for hole in holes or sorted(canonical.classes(2)):
+        symmetries = canonical.suit_symmetries(hole)
+        deck = [code for code in range(canonical.CARD_NUM) if code not in hole]
+        flops = canonical.orbits(itertools.combinations(deck, 3), symmetries)
+        result.extend((tuple(hole), flop) for flop in flops)
+    result.sort()
+    return result
+
+
+def record_offset(count, position):
+    """Returns offset of record at given position in file of 'count' records."""
+    return _HEADER.size + 4 * count + 4 * RECORD_SIZE * position
+
+
+def create_file(path, keys):
+    """Creates file of given keys with empty records, it is unusable until sealed."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, 0, 0, len(keys)))
+        f.write(keys.tobytes())
+        f.truncate(record_offset(len(keys), len(keys)))
+
+
+def seal_file(path):
+    """Writes version and checksum of filled records to file header."""
+    with open(path, 'r+b') as f:
+        count = _HEADER.unpack(f.read(_HEADER.size))[3]
+        checksum = 0
+        while True:
+            block = f.read(1 << 20)
+            if not block:
+                break
+            checksum = zlib.crc32(block, checksum)
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, DATABASE_VERSION, checksum, count))
+
+
+def load_database_file(path=DATABASE_FILE):
+    """Maps database file to memory.
+
+    Raises 'ValueError' for stale, corrupted or unfinished file.
+    """
+    with open(path, 'rb') as f:
+        database_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(database_map) < _HEADER.size:
+        raise ValueError('Truncated flop database file %s' % path)
+    magic, version, checksum, count = _HEADER.unpack_from(database_map)
+    if magic != _MAGIC or version != DATABASE_VERSION:
+        raise ValueError('Stale or unfinished flop database file %s' % path)
+    payload = memoryview(database_map)[_HEADER.size:]
+    if (len(database_map) != record_offset(count, count) or
+            zlib.crc32(payload) != checksum):
+        raise ValueError('Corrupted flop database file %s' % path)
+    return FlopDatabase(payload[:4 * count].cast('I'), payload[4 * count:].cast('I'))
+
+
+class FlopDatabase:
+    """Exact heads-up results of games known on the flop.
+
+    Games equal up to suit relabeling share one record, database generated only
+    for some holes is usable as well.
+    """
+
+    def __init__(self, keys, records):
+        super().__init__()
+        self._keys = keys
+        self._records = records
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, hole, flop):
+        """Returns record (win, tie, lose, winning_hands, beating_hands) of card codes
+        or None when the game is not in database.
+        """
+        key = pack_key(*canonical.canonize(hole, flop)[0])
+        position = bisect.bisect_left(self._keys, key)
+        if position == len(self._keys) or self._keys[position] != key:
+            return None
+        record = self._records[position * RECORD_SIZE:(position + 1) * RECORD_SIZE]
+        hand_num = len(model.Hand)
+        return (record[0], record[1], record[2], list(record[3:3 + hand_num]),
+                list(record[3 + hand_num:]))
@@ -12,13 +12,15 @@ class Street(enum.IntEnum):
 
 
 class GameState(utils.CommonEqualityMixin, utils.CommonReprMixin):
-    def __init__(self, cards, player_num, pot):
+    def __init__(self, cards, player_num, pot, opponents=(), ranges=()):
         super().__init__()
         if player_num and not 2 <= player_num <= 10:
             raise ValueError('Illegal player number %d' % player_num)
         self._cards = cards
         self._player_num = player_num
         self._pot = pot
+        self._opponents = tuple(tuple(hole) for hole in opponents)
+        self._ranges = tuple(ranges)
         self._previous = None
 
     def is_successor(self, other):
@@ -42,6 +44,16 @@ class GameState(utils.CommonEqualityMixin, utils.CommonReprMixin):
     def pot(self):
         return self._pot
 
+    @property
+    def opponents(self):
+        """Known hole cards of opponents."""
+        return self._opponents
+
+    @property
+    def ranges(self):
+        """Ranges of opponents ('ranges.Range')."""
+        return self._ranges
+
     @property
     def pot_growth(self):
         if self.pot and self.previous and self.previous.pot:
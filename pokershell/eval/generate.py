@@ -0,0 +1,384 @@
+import argparse
+import array
+import json
+import math
+import os
+import random
+import sys
+import zlib
+
+import pokershell.eval.distributed as distributed
+import pokershell.eval.flopdb as flopdb
+import pokershell.eval.headsup as headsup
+import pokershell.eval.lookup as lookup
+import pokershell.eval.pool as pool
+import pokershell.eval.simulation as simulation
+import pokershell.eval.vectorized as vectorized
+import pokershell.model as model
+
+# samples drawn before the number of samples needed for precision is estimated again
+_SAMPLE_BLOCK = 1 << 20
+_TASK_NUM = len(lookup.PLAYER_NUMS) * lookup.CLASS_NUM
+
+
+class Journal:
+    """Records finished chunks of long generation, so that interrupted generation
+    continues where it stopped.
+
+    Journal belongs to generation of given identity (e.g. checksum of its input),
+    journal of other generation is discarded.
+    """
+
+    def __init__(self, path, identity):
+        super().__init__()
+        self.path = path
+        self.identity = identity
+        # finished chunk index -> payload recorded with it
+        self.done = {}
+        try:
+            with open(path) as f:
+                # the last line is empty or torn by interruption
+                lines = f.read().split('\n')[:-1]
+        except FileNotFoundError:
+            lines = []
+        if lines and lines[0] == identity:
+            for line in lines[1:]:
+                index, _, payload = line.partition(' ')
+                self.done[int(index)] = payload
+
+    def start(self):
+        """Starts new journal, finished chunks are forgotten."""
+        self.done.clear()
+        with open(self.path, 'w') as f:
+            f.write(self.identity + '\n')
+
+    def add(self, index, payload=''):
+        with open(self.path, 'a') as f:
+            f.write('%d %s\n' % (index, payload))
+            f.flush()
+            os.fsync(f.fileno())
+        self.done[index] = payload
+
+    def remove(self):
+        os.remove(self.path)
+
+
+def _evaluate_flops(chunk):
+    index, game_forms = chunk
+    simulator = simulation.BruteForceSimulator()
+    records = array.array('I')
+    for hole, flop in game_forms:
+        if pool.cancelled():
+            break
+        cards = [model.Card.from_code(code) for code in hole + flop]
+        result = simulator.simulate(2, *cards)
+        records.extend(flopdb.pack_record(result.win, result.tie, result.lose,
+                                          result.winning_hands, result.beating_hands))
+    return index, records
+
+
+def generate_flop_database(path=flopdb.DATABASE_FILE, game_forms=None, chunk_size=64,
+                           progress=None):
+    """Computes exact heads-up results of canonical hole and flop forms.
+
+    Chunks of forms are evaluated by worker pool and their records written to
+    '<path>.partial' file as soon as they are finished. Generation interrupted
+    for any reason continues from the last finished chunk when started again with
+    the same forms. Finished file is sealed by checksum and renamed to 'path'.
+    Callable 'progress' receives number of finished and all chunks.
+    """
+    game_forms = game_forms or flopdb.game_forms()
+    keys = array.array('I', (flopdb.pack_key(hole, flop) for hole, flop in game_forms))
+    if list(keys) != sorted(set(keys)):
+        raise ValueError('Forms must be canonical, sorted and unique')
+    partial = path + '.partial'
+    journal = Journal(partial + '.journal',
+                      '%08x-%d' % (zlib.crc32(keys.tobytes()), chunk_size))
+    if not journal.done or not os.path.exists(partial):
+        flopdb.create_file(partial, keys)
+        journal.start()
+    chunks = [(index, game_forms[start:start + chunk_size])
+              for index, start in enumerate(range(0, len(game_forms), chunk_size))]
+    pending = [chunk for chunk in chunks if chunk[0] not in journal.done]
+    with open(partial, 'r+b') as f:
+        for index, records in simulation.worker_pool.map_unordered(_evaluate_flops,
+                                                                   pending):
+            f.seek(flopdb.record_offset(len(keys), index * chunk_size))
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            journal.add(index)
+            if progress:
+                progress(len(journal.done), len(chunks))
+    flopdb.seal_file(partial)
+    os.replace(partial, path)
+    journal.remove()
+
+
+def _evaluate_matchups(chunk):
+    index, matchups = chunk
+    counts = []
+    for hole, other in matchups:
+        if pool.cancelled():
+            break
+        counts.append(vectorized.showdown_counts(hole, other))
+    return index, counts
+
+
+def generate_headsup_matrix(path=headsup.MATRIX_FILE, matchups=None, chunk_size=64,
+                            progress=None):
+    """Evaluates canonical preflop matchups over all boards.
+
+    Chunks of matchups are evaluated by worker pool, their results are recorded in
+    journal '<path>.journal' and generation interrupted for any reason continues
+    from it when started again with the same matchups. Callable 'progress'
+    receives number of finished and all chunks.
+    """
+    if not vectorized.AVAILABLE:
+        raise ValueError('Heads-up matrix generation needs numpy')
+    matchups = matchups or headsup.matchup_forms()
+    keys = array.array('I', (headsup.pack_key(*matchup) for matchup in matchups))
+    journal = Journal(path + '.journal',
+                      '%08x-%d' % (zlib.crc32(keys.tobytes()), chunk_size))
+    if not journal.done:
+        journal.start()
+    chunks = [(index, matchups[start:start + chunk_size])
+              for index, start in enumerate(range(0, len(matchups), chunk_size))]
+    pending = [chunk for chunk in chunks if chunk[0] not in journal.done]
+    for index, counts in simulation.worker_pool.map_unordered(_evaluate_matchups,
+                                                              pending):
+        journal.add(index, json.dumps(counts))
+        if progress:
+            progress(len(journal.done), len(chunks))
+    counts = {}
+    for index, chunk in chunks:
+        counts.update(zip(chunk, map(tuple, json.loads(journal.done[index]))))
+    headsup.write_matrix_file(path, counts)
+    journal.remove()
+
+
+def _sample(player_num, cards, sample_num, seed):
+    simulator = simulation.MonteCarloSimulator()
+    sample_fc = simulator._sample_batch if vectorized.AVAILABLE else simulator._sample
+    return sample_fc(player_num, math.inf, cards, sample_num=sample_num, seed=seed)
+
+
+def _simulate_class(task, sample_fc=_sample):
+    """Simulates preflop class, 'sample_fc' draws given number of seeded samples
+    (e.g. 'distributed.Coordinator.simulate').
+    """
+    index, player_num, class_index, precision, seed = task
+    cards = tuple(model.Card.from_code(code) for code in lookup.class_hole(class_index))
+    seeds = random.Random(seed)
+    result = simulation.ParallelSimulatorMixin._empty_result()
+    sample_num = simulation.MonteCarloSimulator.min_samples
+    while sample_num > 0 and not pool.cancelled():
+        result += sample_fc(player_num, cards, min(sample_num, _SAMPLE_BLOCK),
+                            seeds.getrandbits(32))
+        # samples needed for 95% confidence interval of win rate within +/- precision
+        needed = result.win_rate * (1 - result.win_rate) * (196 / precision) ** 2
+        sample_num = math.ceil(needed) - result.total
+    return index, result
+
+
+def _text_code(class_index):
+    # text tables name classes by the lower rank first, offsuit without suffix
+    name = lookup.class_name(class_index)
+    return name[1] + name[0] + name[2:].replace('o', '')
+
+
+def generate_preflop_tables(directory=lookup.TEXT_DIR, precision=0.05, seed=0,
+                            player_nums=lookup.PLAYER_NUMS, progress=None,
+                            coordinator=None):
+    """Simulates every preflop class for given player counts.
+
+    Each class is sampled until 95% confidence interval of its win rate is within
+    +/- 'precision' percent. Samples are seeded, so that tables are reproducible.
+    Results of finished classes are recorded in journal in 'directory', interrupted
+    generation with the same parameters continues from it. Tables are written in
+    text format for each player count and into binary index with hand histograms.
+    Index rows of other player counts are kept from existing index or read from
+    text tables in 'directory', index is not written when neither exists. Callable
+    'progress' receives number of finished and all classes. Samples are drawn by
+    workers of started 'distributed.Coordinator' if given, by local worker
+    processes otherwise.
+    """
+    if precision <= 0:
+        raise ValueError('Precision must be positive')
+    games = [(player_num, class_index) for player_num in player_nums
+             for class_index in range(lookup.CLASS_NUM)]
+    tasks = [(index, player_num, class_index, precision, seed * _TASK_NUM + index)
+             for index, (player_num, class_index) in enumerate(games)]
+    os.makedirs(directory, exist_ok=True)
+    journal = Journal(os.path.join(directory, 'preflop.journal'),
+                      'preflop-%r-%d-%s' % (precision, seed,
+                                            ','.join(map(str, player_nums))))
+    if not journal.done:
+        journal.start()
+    pending = [task for task in tasks if task[0] not in journal.done]
+    if coordinator:
+        # classes one by one, samples of each are spread among remote workers
+        simulated = (_simulate_class(task, coordinator.simulate) for task in pending)
+    else:
+        simulated = simulation.worker_pool.map_unordered(_simulate_class, pending)
+    for index, result in simulated:
+        journal.add(index, json.dumps([result.win, result.tie, result.lose,
+                                       result.winning_hands, result.beating_hands]))
+        if progress:
+            progress(len(journal.done), len(tasks))
+    results = {}
+    for index, player_num, class_index, _, _ in tasks:
+        results[player_num, class_index] = simulation.SimulationResult(
+            *json.loads(journal.done[index]))
+    for player_num in player_nums:
+        _write_text_table(os.path.join(directory, '%d.txt' % player_num),
+                          {class_index: results[player_num, class_index]
+                           for class_index in range(lookup.CLASS_NUM)})
+    index_path = os.path.join(directory, 'equity.bin')
+    index = _base_index(index_path, directory, player_nums)
+    if index is not None:
+        for (player_num, class_index), result in results.items():
+            counts = [result.win, result.tie]
+            counts.extend(result.winning_hands)
+            counts.extend(result.beating_hands)
+            position = ((player_num - lookup.PLAYER_NUMS.start) * lookup.CLASS_NUM +
+                        class_index) * lookup.RECORD_SIZE
+            index[position:position + lookup.RECORD_SIZE] = array.array(
+                'd', (count / result.total * 100 for count in counts))
+        lookup.write_index_file(index_path, index)
+    journal.remove()
+
+
+def _base_index(path, directory, player_nums):
+    # rows of player counts that are not regenerated come from existing index, or
+    # from text tables without histograms, none without both
+    if set(player_nums) == set(lookup.PLAYER_NUMS):
+        return array.array('d', [math.nan]) * (
+            len(lookup.PLAYER_NUMS) * lookup.CLASS_NUM * lookup.RECORD_SIZE)
+    try:
+        return array.array('d', lookup.load_index_file(path))
+    except (OSError, ValueError):
+        pass
+    try:
+        return lookup.read_text_files(directory)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _write_text_table(path, results):
+    rows = sorted(results.items(), key=lambda item: item[1].win_rate, reverse=True)
+    with open(path, 'w') as f:
+        for rank, (class_index, result) in enumerate(rows, 1):
+            win = result.win / result.total * 100
+            tie = result.tie / result.total * 100
+            f.write('%d\t%s\t%5.2f\t%5.2f\t%5.2f\n' %
+                    (rank, _text_code(class_index), win, tie, win + tie))
+
+
+def _parse_holes(names):
+    return [lookup.class_hole(lookup.parse_class(name)) for name in names]
+
+
+def _print_progress(done, total):
+    sys.stdout.write('\r%d / %d' % (done, total))
+    sys.stdout.flush()
+
+
+def _start_coordinator(address, authkey):
+    authkey = authkey or os.environ.get(distributed.AUTHKEY_VARIABLE)
+    coordinator = distributed.Coordinator(distributed.parse_address(address),
+                                          authkey and authkey.encode())
+    coordinator.start()
+    host, port = coordinator.address
+    print('Coordinator listening on %s:%d, connect workers by:' % (host, port))
+    print('    %s=%s pokershell worker HOST:%d' %
+          (distributed.AUTHKEY_VARIABLE, coordinator.authkey.decode(), port))
+    return coordinator
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generates Poker Shell equity tables')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+    flop_parser = commands.add_parser('flop', help='exact heads-up flop database, '
+                                                   'runs for many CPU hours and '
+                                                   'continues when interrupted')
+    flop_parser.add_argument('-o', '--output', default=flopdb.DATABASE_FILE,
+                             help='output file (default: %(default)s)')
+    flop_parser.add_argument('--holes', nargs='+', default=None, metavar='CLASS',
+                             help='generate only given preflop classes, e.g. AKs QQ')
+    flop_parser.add_argument('--chunk-size', type=int, default=64,
+                             help='forms evaluated by single task (default: '
+                                  '%(default)s)')
+    headsup_parser = commands.add_parser('headsup', help='exact preflop heads-up '
+                                                         'matrix, runs for few CPU '
+                                                         'hours and continues when '
+                                                         'interrupted')
+    headsup_parser.add_argument('-o', '--output', default=headsup.MATRIX_FILE,
+                                help='output file (default: %(default)s)')
+    headsup_parser.add_argument('--classes', nargs='+', default=None, metavar='CLASS',
+                                help='generate only matchups of given preflop classes '
+                                     'against each other, e.g. AKs QQ')
+    headsup_parser.add_argument('--chunk-size', type=int, default=64,
+                                help='matchups evaluated by single task (default: '
+                                     '%(default)s)')
+    preflop_parser = commands.add_parser('preflop', help='preflop tables of all '
+                                                         'classes, continues when '
+                                                         'interrupted')
+    preflop_parser.add_argument('-o', '--output', default=lookup.TEXT_DIR,
+                                help='output directory (default: %(default)s)')
+    preflop_parser.add_argument('-e', '--precision', type=float, default=0.05,
+                                help='95 percent confidence interval of win rate is '
+                                     'within +/- given percent (default: %(default)s)')
+    preflop_parser.add_argument('--seed', type=int, default=0,
+                                help='random seed (default: %(default)s)')
+    preflop_parser.add_argument('--players', type=int, nargs='+',
+                                default=list(lookup.PLAYER_NUMS),
+                                choices=lookup.PLAYER_NUMS, metavar='PLAYER_NUM',
+                                help='player counts, binary index is written only '
+                                     'for all of them (default: 2-10)')
+    preflop_parser.add_argument('--coordinator', default=None, metavar='[HOST][:PORT]',
+                                help='draw samples by workers started by "pokershell '
+                                     'worker" on other hosts, coordinator listens on '
+                                     'given address (default host: %s, port: %d)'
+                                     % (distributed.DEFAULT_HOST,
+                                        distributed.DEFAULT_PORT))
+    preflop_parser.add_argument('--authkey', default=None,
+                                help='key shared with workers (default: $%s or '
+                                     'random key)' % distributed.AUTHKEY_VARIABLE)
+    args = parser.parse_args()
+    try:
+        if args.command == 'flop':
+            holes = _parse_holes(args.holes) if args.holes else None
+            generate_flop_database(args.output, flopdb.game_forms(holes),
+                                   args.chunk_size, _print_progress)
+            print('\nFlop database written to %s' % args.output)
+        elif args.command == 'headsup':
+            classes = None
+            if args.classes:
+                classes = [lookup.parse_class(name) for name in args.classes]
+            generate_headsup_matrix(args.output, headsup.matchup_forms(classes),
+                                    args.chunk_size, _print_progress)
+            print('\nHeads-up matrix written to %s' % args.output)
+        else:
+            coordinator = None
+            if args.coordinator is not None:
+                coordinator = _start_coordinator(args.coordinator, args.authkey)
+            try:
+                generate_preflop_tables(args.output, args.precision, args.seed,
+                                        sorted(set(args.players)), _print_progress,
+                                        coordinator)
+            finally:
+                if coordinator:
+                    coordinator.shutdown()
+            print('\nPreflop tables written to %s' % args.output)
+    except KeyboardInterrupt:
+        sys.exit('\nGeneration interrupted, run it again to continue')
+    except (ValueError, TimeoutError) as e:
+        sys.exit(str(e))
+    finally:
+        simulation.worker_pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
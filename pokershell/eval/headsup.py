@@ -0,0 +1,220 @@
+import array
+import bisect
+import mmap
+import os
+import struct
+import zlib
+
+import pokershell.canonical as canonical
+import pokershell.eval.lookup as lookup
+import pokershell.eval.vectorized as vectorized
+import pokershell.utils as utils
+
+# binary matrix of exact preflop heads-up results: header, sorted keys of canonical
+# matchups, win, tie and lose board counts of every matchup, then the same counts
+# of every pair of preflop classes summed over their hole combinations, all in
+# native byte order
+MATRIX_VERSION = 1
+MATRIX_FILE = os.path.join(os.path.expanduser('~'), '.pokershell', 'headsup.bin')
+_MAGIC = b'PSHU'
+_HEADER = struct.Struct('=4sIII')
+_MATRIX_SIZE = lookup.CLASS_NUM * lookup.CLASS_NUM * 3
+
+
+def pack_key(hole, other):
+    """Returns key of canonical matchup."""
+    return hole[0] << 18 | hole[1] << 12 | other[0] << 6 | other[1]
+
+
+def canonize(hole, other):
+    """Returns tuple (hole, other, swapped) of canonical matchup of hole card codes.
+
+    Matchup is stored once, with hole of the lower class index first, 'swapped'
+    tells that the order was changed.
+    """
+    swapped = lookup.class_index(*hole) > lookup.class_index(*other)
+    if swapped:
+        hole, other = other, hole
+    (hole, other), _ = canonical.canonize(hole, other)
+    return hole, other, swapped
+
+
+def class_matchups(first, second):
+    """Returns canonical matchups of hole of class 'first' against hole of class
+    'second' with weights, i.e. numbers of hole combinations of the second class
+    sharing the matchup against fixed hole of the first class.
+    """
+    hole = lookup.class_hole(first)
+    others = [other for other in lookup.class_combos(second)
+              if not set(other) & set(hole)]
+    weights = canonical.orbits(others, canonical.suit_symmetries(hole))
+    return {(hole, other): weight for other, weight in weights.items()}
+
+
+def matchup_forms(classes=None):
+    """Returns sorted list of canonical matchups of given preflop classes against
+    each other, all 47086 matchups by default.
+    """
+    classes = sorted(set(range(lookup.CLASS_NUM) if classes is None else classes))
+    forms = set()
+    for position, first in enumerate(classes):
+        for second in classes[position:]:
+            forms.update(class_matchups(first, second))
+    return sorted(forms)
+
+
+def class_matrix(counts):
+    """Sums counts of canonical matchups to counts of pairs of classes.
+
+    Counts of classes with some matchup missing are zero.
+    """
+    matrix = array.array('I', bytes(4 * _MATRIX_SIZE))
+    for first in range(lookup.CLASS_NUM):
+        for second in range(first, lookup.CLASS_NUM):
+            matchups = class_matchups(first, second)
+            if not all(matchup in counts for matchup in matchups):
+                continue
+            total = [0, 0, 0]
+            for matchup, weight in matchups.items():
+                for i, count in enumerate(counts[matchup]):
+                    total[i] += count * weight
+            position = (first * lookup.CLASS_NUM + second) * 3
+            matrix[position:position + 3] = array.array('I', total)
+            position = (second * lookup.CLASS_NUM + first) * 3
+            matrix[position:position + 3] = array.array('I', reversed(total))
+    return matrix
+
+
+def write_matrix_file(path, counts):
+    """Stores dictionary of canonical matchup counts together with class matrix."""
+    matchups = sorted(counts)
+    keys = array.array('I', (pack_key(*matchup) for matchup in matchups))
+    values = array.array('I')
+    for matchup in matchups:
+        values.extend(counts[matchup])
+    payload = b''.join(section.tobytes()
+                       for section in (keys, values, class_matrix(counts)))
+    header = _HEADER.pack(_MAGIC, MATRIX_VERSION, zlib.crc32(payload), len(keys))
+    utils.write_file_atomic(path, header + payload)
+
+
+def load_matrix_file(path=MATRIX_FILE):
+    """Maps matrix file to memory.
+
+    Raises 'ValueError' for stale or corrupted file.
+    """
+    with open(path, 'rb') as f:
+        matrix_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(matrix_map) < _HEADER.size:
+        raise ValueError('Truncated heads-up matrix file %s' % path)
+    magic, version, checksum, count = _HEADER.unpack_from(matrix_map)
+    if magic != _MAGIC or version != MATRIX_VERSION:
+        raise ValueError('Stale heads-up matrix file %s' % path)
+    payload = memoryview(matrix_map)[_HEADER.size:]
+    if (len(payload) != 4 * (4 * count + _MATRIX_SIZE) or
+            zlib.crc32(payload) != checksum):
+        raise ValueError('Corrupted heads-up matrix file %s' % path)
+    return HeadsUpMatrix(payload[:4 * count].cast('I'),
+                         payload[4 * count:16 * count].cast('I'),
+                         payload[16 * count:].cast('I'))
+
+
+class HeadsUpMatrix:
+    """Exact preflop results of holes against known holes and of preflop classes
+    against each other.
+
+    Results are tuples (win, tie, lose) of board counts. Matchups missing in
+    matrix are evaluated on demand, which takes fraction of second per matchup.
+    """
+
+    def __init__(self, keys=(), values=(), matrix=None):
+        super().__init__()
+        self._keys = keys
+        self._values = values
+        self._matrix = matrix
+        self._evaluated = {}
+
+    def get(self, hole, other):
+        """Returns result of hole card codes against other hole card codes."""
+        hole, other, swapped = canonize(hole, other)
+        result = self._get_canonical((hole, other))
+        return tuple(reversed(result)) if swapped else result
+
+    def stored(self, hole, other):
+        """Returns result of hole card codes against other hole card codes stored in
+        matrix file or None.
+        """
+        hole, other, swapped = canonize(hole, other)
+        result = self._get_stored((hole, other))
+        if result and swapped:
+            return tuple(reversed(result))
+        return result
+
+    def _get_stored(self, matchup):
+        key = pack_key(*matchup)
+        position = bisect.bisect_left(self._keys, key)
+        if position < len(self._keys) and self._keys[position] == key:
+            return tuple(self._values[position * 3:position * 3 + 3])
+
+    def _get_canonical(self, matchup):
+        result = self._get_stored(matchup)
+        if result:
+            return result
+        if matchup not in self._evaluated:
+            if not vectorized.AVAILABLE:
+                raise ValueError('Matchup is not in heads-up matrix, numpy is needed '
+                                 'to evaluate it')
+            self._evaluated[matchup] = vectorized.showdown_counts(*matchup)
+        return self._evaluated[matchup]
+
+    def get_class(self, first, second):
+        """Returns result of preflop class against another class summed over all
+        their hole combinations which do not share cards.
+        """
+        if self._matrix is not None:
+            position = (first * lookup.CLASS_NUM + second) * 3
+            result = tuple(self._matrix[position:position + 3])
+            if any(result):
+                return result
+        low, high = min(first, second), max(first, second)
+        total = [0, 0, 0]
+        for matchup, weight in class_matchups(low, high).items():
+            for i, count in enumerate(self._get_canonical(matchup)):
+                total[i] += count * weight
+        return tuple(reversed(total)) if first > second else tuple(total)
+
+
+_matrices = {}
+
+
+def get_matrix(path=MATRIX_FILE):
+    """Returns matrix loaded from file, matrix evaluating all matchups on demand
+    when the file is missing or invalid.
+    """
+    if path not in _matrices:
+        try:
+            _matrices[path] = load_matrix_file(path)
+        except (OSError, ValueError):
+            _matrices[path] = HeadsUpMatrix()
+    return _matrices[path]
+
+
+def equity(hole, other, path=MATRIX_FILE):
+    """Returns tuple (win, tie, lose) in percents of hole card codes against other
+    hole card codes.
+    """
+    return _percents(get_matrix(path).get(hole, other))
+
+
+def class_equity(first, second, path=MATRIX_FILE):
+    """Returns tuple (win, tie, lose) in percents of preflop class against another
+    class given by names, e.g. 'AKo' and 'QQ'.
+    """
+    counts = get_matrix(path).get_class(lookup.parse_class(first),
+                                        lookup.parse_class(second))
+    return _percents(counts)
+
+
+def _percents(counts):
+    total = sum(counts)
+    return tuple(count / total * 100 for count in counts)
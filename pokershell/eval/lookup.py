@@ -0,0 +1,190 @@
+import argparse
+import array
+import itertools
+import math
+import mmap
+import os
+import struct
+import zlib
+
+import pokershell.canonical as canonical
+import pokershell.eval.tables as tables
+import pokershell.model as model
+import pokershell.utils as utils
+
+PLAYER_NUMS = range(2, 11)
+# hole classes form 13x13 grid: pairs on diagonal, suited hands above it
+# (row is the higher rank) and offsuit hands below
+CLASS_NUM = tables.RANK_NUM * tables.RANK_NUM
+RANK_CHARS = ''.join(rank.value[0] for rank in model.Rank)
+
+# binary index: header, then record of every hole class for every player count,
+# record is win and tie percentage followed by percentages of winning hands and
+# beating hands by hand category, all doubles in native byte order. Histograms of
+# tables converted from text format are unknown (NaN).
+INDEX_VERSION = 2
+TEXT_DIR = os.path.join(os.path.dirname(__file__), 'preflop')
+INDEX_FILE = os.path.join(TEXT_DIR, 'equity.bin')
+_MAGIC = b'PSPF'
+_HEADER = struct.Struct('=4sII')
+RECORD_SIZE = 2 + 2 * len(model.Hand)
+_INDEX_SIZE = len(PLAYER_NUMS) * CLASS_NUM * RECORD_SIZE
+
+
+def class_index(first, second):
+    """Returns preflop class index of two hole card codes."""
+    high, low = first >> 2, second >> 2
+    if high < low:
+        high, low = low, high
+    if first & 3 == second & 3:
+        return high * tables.RANK_NUM + low
+    return low * tables.RANK_NUM + high
+
+
+def class_name(index):
+    """Returns name of preflop class, e.g. 'AKs', 'AKo' or 'TT'."""
+    row, column = divmod(index, tables.RANK_NUM)
+    if row == column:
+        return RANK_CHARS[row] * 2
+    if row > column:
+        return RANK_CHARS[row] + RANK_CHARS[column] + 's'
+    return RANK_CHARS[column] + RANK_CHARS[row] + 'o'
+
+
+def parse_class(name):
+    """Returns class index of class name, offsuit suffix 'o' is optional.
+
+    Ranks may be given in any order ('AKs' or 'KAs').
+    """
+    first, second = RANK_CHARS.index(name[0]), RANK_CHARS.index(name[1])
+    high, low = max(first, second), min(first, second)
+    if name[2:] == 's' and high != low:
+        return high * tables.RANK_NUM + low
+    if name[2:] in ('', 'o'):
+        return low * tables.RANK_NUM + high
+    raise ValueError("Invalid preflop class '%s'" % name)
+
+
+def class_hole(index):
+    """Returns canonical hole card codes of preflop class."""
+    row, column = divmod(index, tables.RANK_NUM)
+    # the second card of pair or offsuit hand has another suit
+    hole = (row << 2, column << 2 | (row <= column))
+    return canonical.canonize(hole)[0][0]
+
+
+# class index of every pair of card codes, indexed by first * CARD_NUM + second,
+# entries of the same card twice are meaningless
+CLASS_TABLE = array.array('B', (class_index(first, second)
+                                for first in range(tables.CARD_NUM)
+                                for second in range(tables.CARD_NUM)))
+
+
+_CLASS_COMBOS = [[] for _ in range(CLASS_NUM)]
+for _hole in itertools.combinations(range(tables.CARD_NUM), 2):
+    _CLASS_COMBOS[class_index(*_hole)].append(_hole)
+
+
+def class_combos(index):
+    """Returns all hole card codes of preflop class, e.g. 6 combinations of pair."""
+    return list(_CLASS_COMBOS[index])
+
+
+def read_text_files(directory=TEXT_DIR):
+    """Reads preflop tables in text format, returns index array."""
+    index = array.array('d', [math.nan]) * _INDEX_SIZE
+    for player_num in PLAYER_NUMS:
+        offset = (player_num - PLAYER_NUMS.start) * CLASS_NUM
+        with open(os.path.join(directory, '%d.txt' % player_num)) as f:
+            for line in f:
+                line_split = line.split()
+                if not line_split:
+                    continue
+                position = (offset + parse_class(line_split[1])) * RECORD_SIZE
+                index[position] = float(line_split[2])
+                index[position + 1] = float(line_split[3])
+    return index
+
+
+def write_index_file(path=INDEX_FILE, index=None):
+    """Stores preflop index to binary file, text tables are read if not given."""
+    payload = (index if index is not None else read_text_files()).tobytes()
+    header = _HEADER.pack(_MAGIC, INDEX_VERSION, zlib.crc32(payload))
+    utils.write_file_atomic(path, header + payload)
+
+
+def load_index_file(path=INDEX_FILE):
+    """Maps preflop index file to memory.
+
+    Raises 'ValueError' for stale or corrupted file.
+    """
+    with open(path, 'rb') as f:
+        index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(index_map) < _HEADER.size:
+        raise ValueError('Truncated preflop index file %s' % path)
+    magic, version, checksum = _HEADER.unpack_from(index_map)
+    if magic != _MAGIC or version != INDEX_VERSION:
+        raise ValueError('Stale preflop index file %s' % path)
+    payload = memoryview(index_map)[_HEADER.size:]
+    if len(payload) != 8 * _INDEX_SIZE or zlib.crc32(payload) != checksum:
+        raise ValueError('Corrupted preflop index file %s' % path)
+    return payload.cast('d')
+
+
+def _load_index():
+    try:
+        return load_index_file()
+    except FileNotFoundError:
+        return read_text_files()
+    except ValueError:
+        try:
+            write_index_file()
+            return load_index_file()
+        except (OSError, ValueError):
+            return read_text_files()
+
+
+INDEX = _load_index()
+
+
+def equity(player_num, first, second):
+    """Returns tuple (win, tie) in percents of hole card codes against random hands
+    of 'player_num' - 1 opponents.
+    """
+    position = _position(player_num, first, second)
+    return INDEX[position], INDEX[position + 1]
+
+
+def record(player_num, first, second):
+    """Returns tuple (win, tie, winning_hands, beating_hands) in percents of hole
+    card codes, histograms are None when unknown.
+    """
+    position = _position(player_num, first, second)
+    win, tie = INDEX[position], INDEX[position + 1]
+    winning_hands, beating_hands = None, None
+    if not math.isnan(INDEX[position + 2]):
+        hand_num = len(model.Hand)
+        winning_hands = INDEX[position + 2:position + 2 + hand_num].tolist()
+        beating_hands = INDEX[position + 2 + hand_num:position + RECORD_SIZE].tolist()
+    return win, tie, winning_hands, beating_hands
+
+
+def _position(player_num, first, second):
+    if player_num not in PLAYER_NUMS:
+        raise ValueError('No preflop data for %d players' % player_num)
+    return ((player_num - PLAYER_NUMS.start) * CLASS_NUM +
+            CLASS_TABLE[first * tables.CARD_NUM + second]) * RECORD_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Converts Poker Shell preflop tables '
+                                                 'to binary index')
+    parser.add_argument('-o', '--output', default=INDEX_FILE,
+                        help='output file (default: %(default)s)')
+    args = parser.parse_args()
+    write_index_file(args.output)
+    print('Preflop index written to %s' % args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@ import functools
 
 import pokershell.eval.context as context
 import pokershell.eval.evaluators as evaluators
+import pokershell.eval.tables as tables
 import pokershell.model as model
 
 
@@ -28,6 +29,14 @@ class EvalResult:
             self._complement_ranks = self._ranks_lazy()
         return self._complement_ranks
 
+    @property
+    def strength(self):
+        return tables.pack(self.hand, [rank.value[1] for rank in self.complement_ranks])
+
+    @classmethod
+    def from_strength(cls, strength):
+        return cls(tables.get_hand(strength), lambda: tables.get_ranks(strength))
+
 
 class EvaluatorManager:
     evaluators = [None] * len(model.Hand)
@@ -38,6 +47,17 @@ class EvaluatorManager:
         cls.evaluators[hand] = evaluator
 
     def find_best_hand(self, cards, min_hand=None):
+        strength = self.get_strength(cards)
+        if min_hand and strength >> tables.HAND_SHIFT < min_hand:
+            return
+        return EvalResult.from_strength(strength)
+
+    @staticmethod
+    def get_strength(cards):
+        """Returns best hand of given cards as single comparable integer."""
+        return tables.evaluate([card.code for card in cards])
+
+    def find_best_hand_by_evaluators(self, cards, min_hand=None):
         ctx = context.EvalContext(*cards)
         for hand in reversed(model.Hand):
             evaluator = self.evaluators[hand]
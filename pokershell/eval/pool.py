@@ -0,0 +1,133 @@
+import concurrent.futures
+import concurrent.futures.process
+import multiprocessing
+import signal
+
+BrokenProcessPool = concurrent.futures.process.BrokenProcessPool
+
+# set in worker processes, running tasks are asked to stop early
+_cancel_event = None
+
+
+def cancelled():
+    """Returns True in worker process when running task should stop early."""
+    return _cancel_event is not None and _cancel_event.is_set()
+
+
+def in_worker():
+    return _cancel_event is not None
+
+
+def _init_process(cancel_event, initializer):
+    global _cancel_event
+    _cancel_event = cancel_event
+    # Ctrl-C is handled by the main process only, which cancels the tasks
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if initializer:
+        initializer()
+
+
+class WorkerPool:
+    """Long-lived pool of worker processes shared by all simulations.
+
+    Processes are started lazily on first use and kept warm between simulations.
+    Pool broken by death of a worker process is replaced by a new one.
+    Interrupted or timed out tasks are cancelled, long running tasks should check
+    'cancelled' regularly. Tasks which use the pool themselves run its work inline.
+    """
+
+    def __init__(self, initializer=None, processes=None):
+        super().__init__()
+        self._initializer = initializer
+        self._processes = processes or multiprocessing.cpu_count()
+        self._executor = None
+        self._cancel_event = None
+
+    @property
+    def processes(self):
+        return 1 if in_worker() else self._processes
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._cancel_event = multiprocessing.Event()
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                self.processes, initializer=_init_process,
+                initargs=(self._cancel_event, self._initializer))
+        return self._executor
+
+    def map(self, fc, data):
+        if in_worker():
+            return list(map(fc, data))
+        data = list(data)
+        chunk_size, extra = divmod(len(data), self.processes * 4)
+        if extra:
+            chunk_size += 1
+        for attempt in range(2):
+            try:
+                return list(self._get_executor().map(fc, data,
+                                                     chunksize=max(chunk_size, 1)))
+            except BrokenProcessPool:
+                self.shutdown()
+                if attempt:
+                    raise
+            except KeyboardInterrupt:
+                self.cancel()
+                raise
+
+    def map_unordered(self, fc, data, timeout=None):
+        """Yields results of 'fc' applied to data items as soon as they are ready.
+
+        Tasks not finished within 'timeout' seconds are cancelled and their results
+        are not yielded.
+        """
+        if in_worker():
+            for item in data:
+                yield fc(item)
+            return
+        for attempt in range(2):
+            try:
+                executor = self._get_executor()
+                futures = [executor.submit(fc, item) for item in data]
+                break
+            except BrokenProcessPool:
+                self.shutdown()
+                if attempt:
+                    raise
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=timeout):
+                yield future.result()
+        except concurrent.futures.TimeoutError:
+            self.cancel()
+        except BrokenProcessPool:
+            self.shutdown()
+            raise
+        except BaseException:
+            # interrupted or abandoned by the caller
+            self.cancel()
+            raise
+
+    @property
+    def running(self):
+        return self._executor is not None
+
+    def submit(self, fc, item):
+        """Schedules 'fc' applied to item, returns future."""
+        for attempt in range(2):
+            try:
+                return self._get_executor().submit(fc, item)
+            except BrokenProcessPool:
+                self.shutdown()
+                if attempt:
+                    raise
+
+    def cancel(self):
+        """Stops running tasks and drops pending ones, pool is restarted on next use."""
+        if self._executor is not None:
+            self._cancel_event.set()
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
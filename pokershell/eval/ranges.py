@@ -0,0 +1,176 @@
+import random
+import re
+
+import pokershell.canonical as canonical
+import pokershell.eval.lookup as lookup
+import pokershell.eval.tables as tables
+import pokershell.model as model
+
+# weights are integer percents, so that exact results stay integer counts
+WEIGHT_UNIT = 100
+HOLE_RE = '([2-9tjqka][hscd]){2}'
+
+
+def _parse_ranks(name):
+    """Returns tuple (high, low, suffix) of rank indices and suffix of class name."""
+    ranks, suffix = name[:2].upper(), name[2:].lower()
+    if (len(ranks) != 2 or suffix not in ('', 's', 'o') or
+            not all(rank in lookup.RANK_CHARS for rank in ranks) or
+            ranks[0] == ranks[1] and suffix == 's'):
+        raise ValueError("Invalid preflop class '%s'" % name)
+    first, second = (lookup.RANK_CHARS.index(rank) for rank in ranks)
+    return max(first, second), min(first, second), suffix
+
+
+def _class_names(high, lows, suffix):
+    if suffix:
+        return [lookup.RANK_CHARS[high] + lookup.RANK_CHARS[low] + suffix
+                for low in lows]
+    return [lookup.RANK_CHARS[high] + lookup.RANK_CHARS[low] + kind
+            for low in lows for kind in ('s', 'o')]
+
+
+def _item_holes(item):
+    """Returns holes of single range item without weight."""
+    if re.fullmatch(HOLE_RE, item, re.IGNORECASE):
+        cards = model.Card.parse_cards((item[:2], item[2:]))
+        if cards[0] == cards[1]:
+            raise ValueError("Invalid hole '%s'" % item)
+        return [tuple(sorted(card.code for card in cards))]
+    if item.endswith('+'):
+        high, low, suffix = _parse_ranks(item[:-1])
+        if high == low:
+            names = [lookup.RANK_CHARS[rank] * 2 for rank in range(low, tables.RANK_NUM)]
+        else:
+            names = _class_names(high, range(low, high), suffix)
+    elif '-' in item:
+        first, last = (_parse_ranks(name) for name in item.split('-', 1))
+        (high, low, suffix), (last_high, last_low, last_suffix) = first, last
+        if high == low and last_high == last_low:
+            low, last_low = min(low, last_low), max(low, last_low)
+            names = [lookup.RANK_CHARS[rank] * 2 for rank in range(low, last_low + 1)]
+        elif high == last_high and suffix == last_suffix and high not in (low, last_low):
+            low, last_low = min(low, last_low), max(low, last_low)
+            names = _class_names(high, range(low, last_low + 1), suffix)
+        else:
+            raise ValueError("Invalid span '%s'" % item)
+    else:
+        high, low, suffix = _parse_ranks(item)
+        if high == low:
+            names = [lookup.RANK_CHARS[high] * 2]
+        else:
+            names = _class_names(high, [low], suffix)
+    holes = []
+    for name in names:
+        holes.extend(lookup.class_combos(lookup.parse_class(name)))
+    return holes
+
+
+def parse_range(text):
+    """Returns dictionary of holes (sorted card code pairs) of range and their
+    weights in percents.
+
+    Items are separated by commas: preflop class ('AKs', 'AKo', 'AK' stands for
+    both, 'TT'), class with '+' raising the lower card up to the higher one ('AQs+'
+    is AQs and AKs) or pair up to aces ('TT+'), span ('A2s-A5s', '22-55') or
+    specific hole ('AhKh'). Weight may follow colon, e.g. 'AKo:0.5', later items
+    override weights of earlier ones.
+    """
+    combos = {}
+    for item in text.replace(' ', '').split(','):
+        if not item:
+            continue
+        item, _, weight = item.partition(':')
+        weight = round(float(weight) * WEIGHT_UNIT) if weight else WEIGHT_UNIT
+        if not 0 <= weight <= WEIGHT_UNIT:
+            raise ValueError("Invalid weight of '%s'" % item)
+        for hole in _item_holes(item):
+            combos[hole] = weight
+    combos = {hole: weight for hole, weight in combos.items() if weight}
+    if not combos:
+        raise ValueError("Empty range '%s'" % text)
+    return combos
+
+
+class Range:
+    """Weighted hole combinations of opponent."""
+
+    def __init__(self, combos, text=None):
+        super().__init__()
+        self._combos = combos
+        self._text = text
+
+    @classmethod
+    def parse(cls, text):
+        return cls(parse_range(text), text)
+
+    @property
+    def combos(self):
+        return self._combos
+
+    def live(self, dead):
+        """Returns tuple (holes, weights) of combinations without dead card codes."""
+        dead = set(dead)
+        holes = sorted(hole for hole in self._combos if not dead.intersection(hole))
+        return holes, [self._combos[hole] for hole in holes]
+
+    def sampler(self, dead):
+        """Returns tuple (holes, alias_table) of combinations without dead card
+        codes. Raises 'ValueError' when all of them are blocked.
+        """
+        holes, weights = self.live(dead)
+        if not holes:
+            raise ValueError('All holes of range %s are blocked' % self)
+        return holes, AliasTable(weights)
+
+    def key(self, perm):
+        """Returns key of range with suits relabeled by given permutation."""
+        combos = sorted((sorted(canonical.permute(hole, perm)), weight)
+                        for hole, weight in self._combos.items())
+        return ','.join('%d.%d:%d' % (first, second, weight)
+                        for (first, second), weight in combos)
+
+    def __eq__(self, other):
+        return isinstance(other, Range) and self._combos == other._combos
+
+    def __len__(self):
+        return len(self._combos)
+
+    def __str__(self):
+        return self._text or ','.join(map(str, sorted(self._combos)))
+
+    def __repr__(self):
+        return '%s(%r)' % (self.__class__.__name__, str(self))
+
+
+class AliasTable:
+    """Draws indices with given weights in constant time (Vose's alias method)."""
+
+    def __init__(self, weights):
+        super().__init__()
+        count, total = len(weights), sum(weights)
+        if not count or total <= 0:
+            raise ValueError('Positive weights expected')
+        self.weights = list(weights)
+        scaled = [weight * count / total for weight in weights]
+        self.probabilities = [1.0] * count
+        self.aliases = list(range(count))
+        small = [i for i, value in enumerate(scaled) if value < 1]
+        large = [i for i, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probabilities[less] = scaled[less]
+            self.aliases[less] = more
+            scaled[more] += scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+
+    def __len__(self):
+        return len(self.probabilities)
+
+    def sample(self, rnd=random):
+        # single uniform number picks both the column and the coin
+        value = rnd.random() * len(self.probabilities)
+        index = int(value)
+        if value - index < self.probabilities[index]:
+            return index
+        return self.aliases[index]
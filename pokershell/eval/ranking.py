@@ -0,0 +1,141 @@
+import bisect
+import itertools
+
+import pokershell.eval.tables as tables
+import pokershell.model as model
+
+
+def count_disjoint(pairs, size, cuts):
+    """Counts sets of 'size' mutually disjoint card pairs in prefixes of 'pairs'.
+
+    Pairs are added one by one and numbers of disjoint sets of one, two and three
+    pairs are updated from card degrees, so no combinations are enumerated.
+    Returns list of counts for prefixes of lengths given by ascending 'cuts'.
+    """
+    if not 1 <= size <= 3:
+        raise ValueError('Only sets of 1-3 pairs are supported')
+    degrees = [0] * tables.CARD_NUM
+    # sum of neighbour degrees, neighbours and their bit mask for each card
+    degree_sums = [0] * tables.CARD_NUM
+    neighbours = [[] for _ in range(tables.CARD_NUM)]
+    masks = [0] * tables.CARD_NUM
+    singles, doubles, triples = 0, 0, 0
+    counts = []
+    cut_index = 0
+    for index, (card1, card2) in enumerate(pairs):
+        while cut_index < len(cuts) and cuts[cut_index] == index:
+            counts.append((singles, doubles, triples)[size - 1])
+            cut_index += 1
+        degree1, degree2 = degrees[card1], degrees[card2]
+        if size == 3:
+            # disjoint doubles avoiding both cards by inclusion-exclusion
+            touching1 = degree1 * (singles - degree1 + 1) - degree_sums[card1]
+            touching2 = degree2 * (singles - degree2 + 1) - degree_sums[card2]
+            common = bin(masks[card1] & masks[card2]).count('1')
+            triples += doubles - touching1 - touching2 + degree1 * degree2 - common
+            for card in neighbours[card1]:
+                degree_sums[card] += 1
+            for card in neighbours[card2]:
+                degree_sums[card] += 1
+            degree_sums[card1] += degree2 + 1
+            degree_sums[card2] += degree1 + 1
+            neighbours[card1].append(card2)
+            neighbours[card2].append(card1)
+            masks[card1] |= 1 << card2
+            masks[card2] |= 1 << card1
+        doubles += singles - degree1 - degree2
+        singles += 1
+        degrees[card1] = degree1 + 1
+        degrees[card2] = degree2 + 1
+    counts.extend([(singles, doubles, triples)[size - 1]] * (len(cuts) - cut_index))
+    return counts
+
+
+class BoardRanking:
+    """Strengths of all possible hole cards for fixed five card board.
+
+    Every hole cards combination not colliding with the board is evaluated once and
+    the strengths are sorted. Showdown of any player's hole cards against single
+    opponent is then answered by binary search. Opponent's holdings sharing a card
+    with player's hole cards are removed by correction. Showdown against more
+    opponents counts disjoint holdings within strength sorted prefixes.
+    """
+
+    def __init__(self, board):
+        self.board = tuple(board)
+        self._board_state = tables.PartialHand(self.board)
+        live = [code for code in range(tables.CARD_NUM) if code not in self.board]
+        self._card_strengths = [[] for _ in range(tables.CARD_NUM)]
+        evaluate = self._board_state.evaluate
+        strengths = []
+        for i, card1 in enumerate(live):
+            card1_strengths = self._card_strengths[card1]
+            for card2 in live[i + 1:]:
+                strength = evaluate(card1, card2)
+                strengths.append(strength)
+                card1_strengths.append(strength)
+                self._card_strengths[card2].append(strength)
+        strengths.sort()
+        self.sorted_strengths = strengths
+        self._hand_starts = [bisect.bisect_left(self.sorted_strengths,
+                                                hand << tables.HAND_SHIFT)
+                             for hand in range(len(model.Hand) + 1)]
+
+    def get_strength(self, hole):
+        return self._board_state.evaluate(*hole)
+
+    def showdown(self, hole, opponent_num=1):
+        """Compares given hole cards with all possible opponents' holdings.
+
+        Returns tuple (win, tie, lose, beaten_by) where 'beaten_by' is list
+        of beating holdings counts indexed by hand of the best opponent.
+        With more opponents unordered sets of their holdings are counted.
+        """
+        if opponent_num > 1:
+            return self._showdown_multiway(hole, opponent_num)
+        strength = self.get_strength(hole)
+        lower = bisect.bisect_left(self.sorted_strengths, strength)
+        upper = bisect.bisect_right(self.sorted_strengths, strength)
+        win, tie, lose = lower, upper - lower, len(self.sorted_strengths) - upper
+        my_hand = strength >> tables.HAND_SHIFT
+        beaten_by = [0] * len(model.Hand)
+        beaten_by[my_hand] = self._hand_starts[my_hand + 1] - upper
+        for hand in range(my_hand + 1, len(model.Hand)):
+            beaten_by[hand] = self._hand_starts[hand + 1] - self._hand_starts[hand]
+
+        # card removal: opponent can not hold any of player's cards
+        removed = self._card_strengths[hole[0]] + self._card_strengths[hole[1]]
+        removed.remove(strength)
+        for other in removed:
+            if other < strength:
+                win -= 1
+            elif other > strength:
+                lose -= 1
+                beaten_by[other >> tables.HAND_SHIFT] -= 1
+            else:
+                tie -= 1
+        return win, tie, lose, beaten_by
+
+    def _showdown_multiway(self, hole, opponent_num):
+        strength = self.get_strength(hole)
+        evaluate = self._board_state.evaluate
+        live = [code for code in range(tables.CARD_NUM)
+                if code not in self.board and code not in hole]
+        holdings = sorted((evaluate(card1, card2), card1, card2)
+                          for card1, card2 in itertools.combinations(live, 2))
+        strengths = [holding[0] for holding in holdings]
+        lower = bisect.bisect_left(strengths, strength)
+        upper = bisect.bisect_right(strengths, strength)
+        my_hand = strength >> tables.HAND_SHIFT
+        hands = range(my_hand, len(model.Hand))
+        # sets with the best holding up to cut: below, equal, then within each hand
+        cuts = [lower, upper]
+        for hand in hands:
+            hand_end = bisect.bisect_left(strengths, hand + 1 << tables.HAND_SHIFT)
+            cuts.append(max(upper, hand_end))
+        counts = count_disjoint([holding[1:] for holding in holdings],
+                                opponent_num, cuts)
+        beaten_by = [0] * len(model.Hand)
+        for hand, below, count in zip(hands, counts[1:], counts[2:]):
+            beaten_by[hand] = count - below
+        return counts[0], counts[1] - counts[0], counts[-1] - counts[1], beaten_by
@@ -1,13 +1,21 @@
 import abc
-import contextlib
+import atexit
 import functools
-import multiprocessing
+import itertools
+import math
+import operator
 import os
 import random
 import time
 
 import pokershell.config as config
-import pokershell.eval.manager as manager
+import pokershell.eval.flopdb as flopdb
+import pokershell.eval.headsup as headsup
+import pokershell.eval.lookup as lookup
+import pokershell.eval.pool as pool
+import pokershell.eval.ranking as ranking
+import pokershell.eval.tables as tables
+import pokershell.eval.vectorized as vectorized
 import pokershell.model as model
 import pokershell.utils as utils
 
@@ -19,12 +27,16 @@ class SimulatorManager:
     def register_simulator(cls, sim_class):
         cls.simulators.append(sim_class)
 
-    def find_simulator(self, player_num, *cards):
+    def find_simulator(self, player_num, *cards, opponents=(), ranges=()):
         assert isinstance(player_num, int)
         available = []
         for simulator in self.simulators:
-            if player_num in simulator.players_num \
-                    and len(cards) in simulator.cards_num:
+            # simulators of games with known opponents or ranges are used only for them
+            if bool(ranges) != simulator.opponent_ranges:
+                continue
+            if not ranges and bool(opponents) != simulator.known_opponents:
+                continue
+            if simulator.is_supported(player_num, len(cards)):
                 available.append(simulator)
         if available:
             best = sorted(available, key=lambda sim: sim.priority)[0]
@@ -32,12 +44,15 @@ class SimulatorManager:
 
 
 class SimulationResult(utils.CommonReprMixin):
-    def __init__(self, win, tie, lose, winning_hands, beating_hands):
+    def __init__(self, win, tie, lose, winning_hands, beating_hands, equities=None):
         self.win = win
         self.tie = tie
         self.lose = lose
         self._winning_hands = winning_hands
         self._beating_hands = beating_hands
+        # pot shares won by players of known cards (the player first) counted in
+        # games, split pot is shared equally by its winners
+        self.equities = equities
 
     @property
     def total(self):
@@ -47,6 +62,42 @@ class SimulationResult(utils.CommonReprMixin):
     def win_rate(self):
         return self.win / self.total
 
+    @property
+    def variance(self):
+        """Variance of win rate estimated from sampled games."""
+        rate = self.win_rate
+        return rate * (1 - rate) / self.total
+
+    @property
+    def std_error(self):
+        return math.sqrt(self.variance)
+
+    def confidence_interval(self, z=1.96):
+        """Win rate confidence interval, 95% confidence level by default."""
+        error = z * self.std_error
+        return max(self.win_rate - error, 0), min(self.win_rate + error, 1)
+
+    def __mul__(self, factor):
+        equities = None
+        if self.equities is not None:
+            equities = [share * factor for share in self.equities]
+        return SimulationResult(self.win * factor, self.tie * factor, self.lose * factor,
+                                [count * factor for count in self.winning_hands or ()],
+                                [count * factor for count in self.beating_hands or ()],
+                                equities)
+
+    def __add__(self, other):
+        winning, beating = [0] * len(model.Hand), [0] * len(model.Hand)
+        for result in (self, other):
+            ParallelSimulatorMixin._add_list(result.winning_hands or (), winning)
+            ParallelSimulatorMixin._add_list(result.beating_hands or (), beating)
+        equities = self.equities or other.equities
+        if self.equities and other.equities:
+            equities = [a + b for a, b in zip(self.equities, other.equities)]
+        return SimulationResult(self.win + other.win, self.tie + other.tie,
+                                self.lose + other.lose, winning, beating,
+                                equities and list(equities))
+
     @property
     def beating_hands(self):
         return self._beating_hands
@@ -75,11 +126,29 @@ class SimulationResult(utils.CommonReprMixin):
 
 class AbstractSimulator(metaclass=abc.ABCMeta):
     priority = 100
+    exact = True
+    # simulation can continue from result of previous simulation of the same game
+    resumable = False
+    # simulation reports partial results to progress callback
+    streaming = False
+    # simulation takes hole cards of opponents ('opponents' keyword argument)
+    known_opponents = False
+    # simulation takes ranges of opponents ('ranges' keyword argument)
+    opponent_ranges = False
 
     @abc.abstractmethod
     def simulate(self, player_num, *cards):
         pass
 
+    @property
+    def precision(self):
+        """Parameters affecting accuracy of results, None for exact simulator."""
+        return None
+
+    @classmethod
+    def is_supported(cls, player_num, cards_num):
+        return player_num in cls.players_num and cards_num in cls.cards_num
+
     @classmethod
     def from_config(cls):
         return cls()
@@ -88,17 +157,12 @@ class AbstractSimulator(metaclass=abc.ABCMeta):
 class ParallelSimulatorMixin:
     @classmethod
     def _simulate_parallel(cls, sim_fc, data):
-        with contextlib.closing(multiprocessing.Pool()) as pool:
-            partial_results = pool.map(sim_fc, data)
-            win, tie, lose = 0, 0, 0
-            beating, winning = [0] * len(model.Hand), [0] * len(model.Hand)
-            for result in partial_results:
-                win += result.win
-                tie += result.tie
-                lose += result.lose
-                cls._add_list(result.beating_hands, beating)
-                cls._add_list(result.winning_hands, winning)
-            return SimulationResult(win, tie, lose, winning, beating)
+        partial_results = worker_pool.map(sim_fc, data)
+        return functools.reduce(operator.add, partial_results, cls._empty_result())
+
+    @staticmethod
+    def _empty_result():
+        return SimulationResult(0, 0, 0, [0] * len(model.Hand), [0] * len(model.Hand))
 
     @staticmethod
     def _add_list(target_lst, add_lst):
@@ -110,124 +174,262 @@ class BruteForceSimulator(AbstractSimulator, ParallelSimulatorMixin):
     """Uses brute force to simulate all possible game outcomes.
     Simulator evaluates all permutations of unknown cards and gives accurate results.
     From performance reason is usable only for limited unknown cards number.
-    Allows simulate game only with 2 players after turn.
+    Allows simulate game with 2 players after flop and with up to 4 players
+    on turn and river.
     """
     priority = 0
     name = 'brute-force'
-    cards_num = {6, 7}
-    players_num = {2}
+    cards_num = {5, 6, 7}
+    players_num = {2, 3, 4}
+    multiway_cards_num = {6, 7}
 
-    def __init__(self):
-        super().__init__()
-        self._manager = manager.EvaluatorManager()
-
-    def _process(self, cards, generated):
-        return self._simulate_river(cards + generated)
+    @classmethod
+    def is_supported(cls, player_num, cards_num):
+        if player_num > 2 and cards_num not in cls.multiway_cards_num:
+            return False
+        return super().is_supported(player_num, cards_num)
+
+    def _process(self, player_num, codes, runout):
+        if pool.cancelled():
+            return self._empty_result()
+        generated, weight = runout
+        return self._simulate_codes(codes + [card.code for card in generated],
+                                    player_num) * weight
 
     def simulate(self, player_num, *cards):
         assert isinstance(player_num, int)
-        if player_num != 2:
-            raise ValueError('Only 2 players are supported')
+        if not self.is_supported(player_num, len(cards)):
+            raise ValueError('Unsupported game of %d players with %d cards' %
+                             (player_num, len(cards)))
         unknown_count = 7 - len(cards)
-        deck = model.Deck(*cards)
-        deck_cards = deck.cards
+        codes = [card.code for card in cards]
         if unknown_count:
-            fc = functools.partial(self._process, cards)
-            combinations = model.Card.all_combinations(deck_cards, unknown_count)
-            return self._simulate_parallel(fc, combinations)
+            # runouts equivalent by suit relabeling give the same result
+            runouts = model.Deck(*cards).orbits(unknown_count, cards[:2], cards[2:])
+            fc = functools.partial(self._process, player_num, codes)
+            return self._simulate_parallel(fc, runouts.items())
         else:
-            return self._simulate_river(cards)
-
-    def _simulate_river(self, cards):
-        common = cards[2:]
-        deck = model.Deck(*cards)
-        deck_cards = deck.cards
-        best_hand = self._manager.find_best_hand(cards)
-        beaten_by, win_by = [0] * len(model.Hand), [0] * len(model.Hand)
-        win, tie, lose = 0, 0, 0
-        for opponent in model.Card.all_combinations(deck_cards, 2):
-            opponent_cards = opponent + common
-            opponent_best = self._manager.find_best_hand(opponent_cards,
-                                                         min_hand=best_hand.hand)
-            if not opponent_best or best_hand > opponent_best:
-                win += 1
-            elif best_hand < opponent_best:
-                beaten_by[opponent_best.hand] += 1
-                lose += 1
-            elif best_hand == opponent_best:
-                tie += 1
-        win_by[best_hand.hand] = win
+            return self._simulate_codes(codes, player_num)
+
+    def _simulate_river(self, cards, player_num=2):
+        return self._simulate_codes([card.code for card in cards], player_num)
+
+    @staticmethod
+    def _simulate_codes(codes, player_num=2):
+        board_ranking = ranking.BoardRanking(codes[2:])
+        win, tie, lose, beaten_by = board_ranking.showdown(codes[:2], player_num - 1)
+        win_by = [0] * len(model.Hand)
+        win_by[board_ranking.get_strength(codes[:2]) >> tables.HAND_SHIFT] = win
         return SimulationResult(win, tie, lose, win_by, beaten_by)
 
 
 class MonteCarloSimulator(AbstractSimulator, ParallelSimulatorMixin):
     """Uses Monte Carlo method to calculate game outcome.
     Simulator randomly samples unknown cards in game.
-    Results are inaccurate. Result accuracy depends on simulation duration."""
+    Results are inaccurate. Simulation stops when given number of samples is drawn or
+    win rate confidence interval is narrow enough, at latest after simulation cycle
+    when it is given. Without any of these limits simulation takes default cycle.
+    Repeated simulation of the same game continues sampling from previous result.
+    """
     name = 'monte-carlo'
+    exact = False
+    resumable = True
+    streaming = True
+    batch_size = 2048
+    # time slice of single round when simulation stops on reached precision
+    round_cycle = 0.1
+    # time slice of single round when partial results are reported
+    progress_cycle = 0.05
+    # late worker results are dropped after simulation cycle and this grace period
+    deadline_grace = 0.5
+    # number of samples drawn between checks of time and cancellation
+    check_interval = 256
+    min_samples = 1000
+    # simulation cycle when neither cycle, samples nor precision is given
+    default_cycle = 1
     cards_num = set(range(2, 8))
-    players_num = set(range(2, 11))
-    sim_cycle = config.register_option(name='sim-cycle', value=1, type=int, short='-t',
+    players_num = set(lookup.PLAYER_NUMS)
+    sim_cycle = config.register_option(name='sim-cycle', value=0, type=int, short='-t',
                                        description='Duration of Monte Carlo '
-                                                   'simulation in seconds')
-
-    def __init__(self, sim_cycle=1):
+                                                   'simulation in seconds (0 - no '
+                                                   'limit with samples or precision '
+                                                   'given, 1 second otherwise)')
+    sim_samples = config.register_option(name='sim-samples', value=0, type=int,
+                                         short='-n',
+                                         description='Number of samples drawn in Monte '
+                                                     'Carlo simulation (0 - no limit)')
+    sim_precision = config.register_option(name='sim-precision', value=0.0, type=float,
+                                           short='-e',
+                                           description='Monte Carlo simulation stops '
+                                                       'when 95 percent confidence '
+                                                       'interval of win rate is within '
+                                                       '+/- given percent (0 - disabled)')
+
+    def __init__(self, sim_cycle=0, sim_samples=0, sim_precision=0):
         super().__init__()
-        self._manager = manager.EvaluatorManager()
         if sim_cycle > 120:
             raise ValueError('Too long simulation %f seconds' % sim_cycle)
         self._sim_cycle = sim_cycle
+        self._sim_samples = sim_samples
+        self._sim_precision = sim_precision
 
-    def simulate(self, player_num, *cards):
+    @property
+    def time_limit(self):
+        """Duration of simulation in seconds, infinite when it stops on samples or
+        precision only.
+        """
+        if self._sim_cycle:
+            return self._sim_cycle
+        if self._sim_samples or self._sim_precision:
+            return math.inf
+        return self.default_cycle
+
+    def simulate(self, player_num, *cards, result=None, progress=None):
+        """Samples given game, samples are added to 'result' of previous simulation
+        of the same game when given. Stopping conditions apply to samples of this
+        simulation, except precision which is reached by all samples together.
+        Callable 'progress' is called with partial result whenever any worker
+        process finishes its part of simulation round. Simulation interrupted
+        by Ctrl-C returns samples drawn so far.
+        """
         assert isinstance(player_num, int)
-        start_data = (cards,) * multiprocessing.cpu_count()
-        fc = functools.partial(self._sample, player_num, self._sim_cycle)
-        return self._simulate_parallel(fc, start_data)
+        start = time.time()
+        processes = worker_pool.processes
+        start_data = (cards,) * processes
+        sample_fc = self._sample_batch if vectorized.AVAILABLE else self._sample
+        if result is None:
+            result = self._empty_result()
+        start_total = result.total
+        time_limit = self.time_limit
+        try:
+            while True:
+                cycle = time_limit - (time.time() - start)
+                if self._sim_precision or math.isinf(time_limit):
+                    cycle = min(cycle, self.round_cycle)
+                if progress:
+                    cycle = min(cycle, self.progress_cycle)
+                sample_num = None
+                if self._sim_samples:
+                    sampled = result.total - start_total
+                    sample_num = -(-(self._sim_samples - sampled) // processes)
+                fc = functools.partial(sample_fc, player_num, cycle,
+                                       sample_num=sample_num)
+                for partial_result in worker_pool.map_unordered(
+                        fc, start_data, timeout=cycle + self.deadline_grace):
+                    result += partial_result
+                    if progress:
+                        progress(result)
+                elapsed = time.time() - start
+                if self._is_finished(result, elapsed, result.total - start_total,
+                                     progress is None):
+                    return result
+        except KeyboardInterrupt:
+            return result
 
-    def _sample(self, player_num, sim_cycle, cards):
+    @property
+    def precision(self):
+        return self._sim_cycle, self._sim_samples, self._sim_precision
+
+    def _is_finished(self, result, elapsed, sampled, whole_cycle=True):
+        if elapsed >= self.time_limit:
+            return True
+        if self._sim_samples and sampled >= self._sim_samples:
+            return True
+        if self._sim_precision and result.total >= self.min_samples:
+            return 1.96 * result.std_error * 100 <= self._sim_precision
+        # without limits single round takes whole cycle unless results are streamed
+        return whole_cycle and not self._sim_precision and not self._sim_samples
+
+    def _sample(self, player_num, sim_cycle, cards, sample_num=None, seed=None):
         start = time.time()
-        common = cards[2:]
-        sampled_common_count = 5 - len(common)
-        deck_cards = model.Deck(*cards).cards
+        rnd = random.Random(seed) if seed is not None else random
+        codes = [card.code for card in cards]
+        my_state = tables.PartialHand(codes)
+        common_state = tables.PartialHand(codes[2:])
+        sampled_common_count = 7 - len(codes)
+        deck_codes = [card.code for card in model.Deck(*cards).cards]
         win, tie, lose = 0, 0, 0
         others_count = player_num - 1
         sampled_count = sampled_common_count + others_count * 2
         win_by, beaten_by = [0] * len(model.Hand), [0] * len(model.Hand)
-        while time.time() - start < sim_cycle:
-            sampled_cards = tuple(random.sample(deck_cards, sampled_count))
-            sampled_common = sampled_cards[:sampled_common_count]
-            my_cards = cards + sampled_common
-            my_hand = self._manager.find_best_hand(my_cards)
-            others_cards = sampled_cards[sampled_common_count:]
-            result, hand = self._eval_showdown(my_hand,
-                                               common + sampled_common,
-                                               others_cards)
-            if result == -1:
-                beaten_by[hand] += 1
-                lose += 1
-            elif result == 0:
-                tie += 1
-            else:
-                win_by[my_hand.hand] += 1
-                win += 1
+        while time.time() - start < sim_cycle and not pool.cancelled():
+            chunk_size = self.check_interval
+            if sample_num is not None:
+                chunk_size = min(chunk_size, sample_num - win - tie - lose)
+                if chunk_size <= 0:
+                    break
+            for _ in range(chunk_size):
+                sampled_codes = rnd.sample(deck_codes, sampled_count)
+                sampled_common = sampled_codes[:sampled_common_count]
+                my_best = my_state.evaluate(*sampled_common)
+                result, hand = self._eval_showdown(my_best,
+                                                   common_state.add(*sampled_common),
+                                                   sampled_codes[sampled_common_count:])
+                if result == -1:
+                    beaten_by[hand] += 1
+                    lose += 1
+                elif result == 0:
+                    tie += 1
+                else:
+                    win_by[hand] += 1
+                    win += 1
         return SimulationResult(win, tie, lose, win_by, beaten_by)
 
-    def _eval_showdown(self, my_hand, common, others_cards):
-        result = 1, my_hand.hand
-        for hand in zip(others_cards[::2], others_cards[1::2]):
-            opponent_cards = hand + common
-            opponent_best = self._manager.find_best_hand(opponent_cards,
-                                                         min_hand=my_hand.hand)
-            if opponent_best:
-                if my_hand < opponent_best:
-                    return -1, opponent_best.hand
-                elif my_hand == opponent_best:
-                    result = 0, my_hand.hand
-        return result
+    def _sample_batch(self, player_num, sim_cycle, cards, sample_num=None, seed=None):
+        """Vectorized variant of '_sample', resolves whole batch of showdowns at once."""
+        start = time.time()
+        numpy = vectorized.numpy
+        rng = numpy.random.default_rng(seed)
+        known = [card.code for card in cards]
+        sampled_common_count = 7 - len(known)
+        deck_codes = [card.code for card in model.Deck(*cards).cards]
+        sampled_count = sampled_common_count + (player_num - 1) * 2
+        win, tie, lose = 0, 0, 0
+        win_by, beaten_by = [0] * len(model.Hand), [0] * len(model.Hand)
+        hand_num = len(model.Hand)
+        while time.time() - start < sim_cycle and not pool.cancelled():
+            batch_size = self.batch_size
+            if sample_num is not None:
+                batch_size = min(batch_size, sample_num - win - tie - lose)
+                if batch_size <= 0:
+                    break
+            sampled = vectorized.sample(rng, deck_codes, batch_size, sampled_count)
+            sampled_common = sampled[:, :sampled_common_count]
+            common = numpy.hstack((numpy.tile(known[2:], (len(sampled), 1)),
+                                   sampled_common))
+            my_best = vectorized.evaluate(numpy.hstack(
+                (numpy.tile(known[:2], (len(sampled), 1)), common)))
+            others_best = numpy.zeros_like(my_best)
+            for seat in range(sampled_common_count, sampled_count, 2):
+                hole = sampled[:, seat:seat + 2]
+                seat_best = vectorized.evaluate(numpy.hstack((hole, common)))
+                numpy.maximum(others_best, seat_best, out=others_best)
+            won = my_best > others_best
+            lost = my_best < others_best
+            win_num, lose_num = int(won.sum()), int(lost.sum())
+            win += win_num
+            lose += lose_num
+            tie += len(sampled) - win_num - lose_num
+            self._add_list(numpy.bincount(my_best[won] >> tables.HAND_SHIFT,
+                                          minlength=hand_num).tolist(), win_by)
+            self._add_list(numpy.bincount(others_best[lost] >> tables.HAND_SHIFT,
+                                          minlength=hand_num).tolist(), beaten_by)
+        return SimulationResult(win, tie, lose, win_by, beaten_by)
+
+    @staticmethod
+    def _eval_showdown(my_best, common_state, others_codes):
+        result = 1
+        for i in range(0, len(others_codes), 2):
+            opponent_best = common_state.evaluate(others_codes[i], others_codes[i + 1])
+            if my_best < opponent_best:
+                return -1, opponent_best >> tables.HAND_SHIFT
+            elif my_best == opponent_best:
+                result = 0
+        return result, my_best >> tables.HAND_SHIFT
 
     @classmethod
     def from_config(cls):
-        return cls(cls.sim_cycle.value)
+        return cls(cls.sim_cycle.value, cls.sim_samples.value, cls.sim_precision.value)
 
 
 class LookUpSimulator(AbstractSimulator):
@@ -238,50 +440,433 @@ class LookUpSimulator(AbstractSimulator):
     priority = 0
     name = 'look-up'
     cards_num = {2}
-    players_num = set(range(2, 11))
+    players_num = set(lookup.PLAYER_NUMS)
+
+    def simulate(self, player_num, c1, c2):
+        assert isinstance(player_num, int)
+        win, tie, winning_hands, beating_hands = lookup.record(player_num, c1.code,
+                                                               c2.code)
+        return SimulationResult(win, tie, 100 - win - tie, winning_hands, beating_hands)
+
 
-    def __init__(self):
+class FlopLookUpSimulator(AbstractSimulator):
+    """Uses database of exact heads-up results of games known on the flop.
+    Database is generated by 'pokershell-generate flop', games missing in database
+    generated only for some holes are simulated by brute force.
+    """
+    priority = 0
+    name = 'flop-look-up'
+    cards_num = {5}
+    players_num = {2}
+    flop_db = config.register_option(name='flop-db', value=flopdb.DATABASE_FILE,
+                                     type=str, short=None,
+                                     description='File of heads-up flop database '
+                                                 '(see pokershell-generate)')
+
+    # database file path -> (modification time, database or None when file is invalid),
+    # file modified later, e.g. generated while running, is loaded again
+    _databases = {}
+
+    def __init__(self, path=flopdb.DATABASE_FILE):
         super().__init__()
-        self._sim_data = {}
-
-    def _init_data(self, player_num):
-        if player_num in self._sim_data:
-            return
-        code_dict = {}
-        directory = os.path.dirname(__file__)
-        data_file = os.path.join(directory, 'preflop', str(player_num) + '.txt')
-        with open(data_file) as f:
-            content = f.readlines()
-        for line in content:
-            line_split = line.split()
-            code = line_split[1]
-            win = float(line_split[2])
-            tie = float(line_split[3])
-            lose = 100 - win - tie
-            code_dict[code] = SimulationResult(win, tie, lose, None, None)
-        self._sim_data[player_num] = code_dict
+        self.path = path
 
-    def simulate(self, player_num, c1, c2):
+    @classmethod
+    def _get_database(cls, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        cached = cls._databases.get(path)
+        if cached is None or cached[0] != mtime:
+            try:
+                database = flopdb.load_database_file(path)
+            except (OSError, ValueError):
+                database = None
+            cached = cls._databases[path] = mtime, database
+        return cached[1]
+
+    @classmethod
+    def is_supported(cls, player_num, cards_num):
+        return (super().is_supported(player_num, cards_num) and
+                cls._get_database(cls.flop_db.value) is not None)
+
+    def simulate(self, player_num, *cards):
         assert isinstance(player_num, int)
-        self._init_data(player_num)
-        code = self._get_hole_code(c1, c2)
-        return self._sim_data[player_num][code]
-
-    def _get_hole_code(self, c1, c2):
-        ranks = sorted([c1.rank, c2.rank])
-        if c1.rank == c2.rank:
-            return self._get_code(ranks)
+        database = self._get_database(self.path)
+        codes = [card.code for card in cards]
+        record = None
+        if database is not None and len(codes) == 5 and player_num == 2:
+            record = database.get(codes[:2], codes[2:])
+        if record is None:
+            return BruteForceSimulator().simulate(player_num, *cards)
+        return SimulationResult(*record)
+
+    @classmethod
+    def from_config(cls):
+        return cls(cls.flop_db.value)
+
+
+class _ShowdownCounter:
+    """Counts results of showdowns, the first player is the player of the game."""
+
+    def __init__(self, known_num):
+        super().__init__()
+        self.known_num = known_num
+        self.win, self.tie, self.lose = 0, 0, 0
+        self.win_by, self.beaten_by = [0] * len(model.Hand), [0] * len(model.Hand)
+        self.equities = [0] * known_num
+
+    def add(self, strengths, weight=1):
+        best = max(strengths)
+        winners = [seat for seat, strength in enumerate(strengths) if strength == best]
+        share = weight / len(winners)
+        for seat in winners:
+            if seat < self.known_num:
+                self.equities[seat] += share
+        if winners[0]:
+            self.lose += weight
+            self.beaten_by[best >> tables.HAND_SHIFT] += weight
+        elif len(winners) == 1:
+            self.win += weight
+            self.win_by[best >> tables.HAND_SHIFT] += weight
         else:
-            if c1.suit == c2.suit:
-                return self._get_code(ranks) + 's'
-            else:
-                return self._get_code(ranks)
+            self.tie += weight
+
+    def result(self):
+        return SimulationResult(self.win, self.tie, self.lose, self.win_by,
+                                self.beaten_by, self.equities)
+
+
+class KnownHandsSimulator(AbstractSimulator, ParallelSimulatorMixin):
+    """Evaluates game against opponents of known hole cards.
+    Runouts and holes of the other opponents are enumerated when there are not too
+    many games, otherwise they are sampled for Monte Carlo simulation cycle or
+    samples. Result includes pot share of every player of known cards.
+    """
+    priority = 0
+    name = 'known-hands'
+    exact = False
+    known_opponents = True
+    cards_num = set(range(2, 8))
+    players_num = set(lookup.PLAYER_NUMS)
+    # games enumerated one by one, boards evaluated at once when numpy is available
+    enumeration_limit = 300000
+    vectorized_limit = 2000000
+    headsup_matrix = config.register_option(name='headsup-matrix',
+                                            value=headsup.MATRIX_FILE, type=str,
+                                            short=None,
+                                            description='File of pre-flop heads-up '
+                                                        'matrix (see '
+                                                        'pokershell-generate)')
+
+    def __init__(self, sim_cycle=0, sim_samples=0, matrix_path=headsup.MATRIX_FILE):
+        super().__init__()
+        self._sim_cycle = sim_cycle
+        self._sim_samples = sim_samples
+        self._matrix_path = matrix_path
+
+    @property
+    def precision(self):
+        return self._sim_cycle, self._sim_samples
+
+    @property
+    def time_limit(self):
+        """Duration of sampling in seconds, infinite when it stops on samples only."""
+        if self._sim_cycle:
+            return self._sim_cycle
+        return math.inf if self._sim_samples else MonteCarloSimulator.default_cycle
+
+    def simulate(self, player_num, *cards, opponents=()):
+        """Simulates game of given cards against opponents of known hole cards
+        ('opponents' is sequence of card pairs), hole cards of the others are
+        unknown. Attribute 'exact' tells whether games were enumerated.
+        """
+        assert isinstance(player_num, int)
+        codes = [card.code for card in cards]
+        known = [codes[:2]] + [[card.code for card in hole] for hole in opponents]
+        unknown_num = player_num - len(known)
+        if unknown_num < 0:
+            raise ValueError('%d known opponents in game of %d players' %
+                             (len(opponents), player_num))
+        dealt = list(itertools.chain(codes, *known[1:]))
+        if len(set(dealt)) != len(dealt):
+            raise ValueError('Duplicate cards')
+        board = codes[2:]
+        deck = [code for code in range(tables.CARD_NUM) if code not in dealt]
+        runout_num = 5 - len(board)
+        game_num = math.comb(len(deck), runout_num)
+        for seat in range(unknown_num):
+            game_num *= math.comb(len(deck) - runout_num - 2 * seat, 2)
+
+        self.exact = True
+        if len(known) == 2 and not unknown_num and not board:
+            counts = headsup.get_matrix(self._matrix_path).stored(*known)
+            if counts:
+                win, tie, lose = counts
+                return SimulationResult(win, tie, lose, None, None,
+                                        [win + tie / 2, lose + tie / 2])
+        if not unknown_num and vectorized.AVAILABLE and game_num <= self.vectorized_limit:
+            return self._enumerate_boards(known, board)
+        if game_num <= self.enumeration_limit:
+            runouts = list(itertools.combinations(deck, runout_num))
+            parts = worker_pool.processes * 4
+            fc = functools.partial(self._enumerate, known, board, unknown_num, deck)
+            return self._simulate_parallel(fc, [runouts[i::parts] for i in range(parts)])
+        self.exact = False
+        processes = worker_pool.processes
+        sample_num = -(-self._sim_samples // processes) if self._sim_samples else None
+        fc = functools.partial(self._sample, known, board, unknown_num, deck,
+                               self.time_limit, sample_num)
+        seeds = [random.getrandbits(32) for _ in range(processes)]
+        return self._simulate_parallel(fc, seeds)
+
+    @classmethod
+    def _enumerate_boards(cls, known, board):
+        return cls._count_strengths(vectorized.board_strengths(known, board))
+
+    @staticmethod
+    def _count_strengths(strengths, known_num=None):
+        """Counts results of (N, P) array of strengths of P players in N games, pot
+        shares are counted for the first 'known_num' players.
+        """
+        numpy = vectorized.numpy
+        best = strengths.max(axis=1)
+        winners = strengths == best[:, None]
+        winner_num = winners.sum(axis=1)
+        equities = (winners / winner_num[:, None]).sum(axis=0)[:known_num].tolist()
+        won = winners[:, 0] & (winner_num == 1)
+        lost = ~winners[:, 0]
+        win, lose = int(won.sum()), int(lost.sum())
+        hand_num = len(model.Hand)
+        win_by = numpy.bincount(best[won] >> tables.HAND_SHIFT, minlength=hand_num)
+        beaten_by = numpy.bincount(best[lost] >> tables.HAND_SHIFT, minlength=hand_num)
+        return SimulationResult(win, len(best) - win - lose, lose, win_by.tolist(),
+                                beaten_by.tolist(), equities)
+
+    @classmethod
+    def _enumerate(cls, known, board, unknown_num, deck, runouts):
+        counter = _ShowdownCounter(len(known))
+        for runout in runouts:
+            if pool.cancelled():
+                break
+            common = tables.PartialHand(board + list(runout))
+            strengths = [common.evaluate(*hole) for hole in known]
+            if not unknown_num:
+                counter.add(strengths)
+                continue
+            rest = [code for code in deck if code not in runout]
+            for holes in cls._deal(rest, unknown_num):
+                counter.add(strengths + [common.evaluate(*hole) for hole in holes])
+        return counter.result()
+
+    @classmethod
+    def _deal(cls, deck, seat_num):
+        """Yields all deals of hole cards to given number of seats."""
+        for hole in itertools.combinations(deck, 2):
+            if seat_num == 1:
+                yield (hole,)
+                continue
+            rest = [code for code in deck if code not in hole]
+            for holes in cls._deal(rest, seat_num - 1):
+                yield (hole,) + holes
 
     @staticmethod
-    def _get_code(ranks):
-        return ranks[0].value[0] + ranks[1].value[0]
+    def _sample(known, board, unknown_num, deck, sim_cycle, sample_num, seed):
+        start = time.time()
+        rnd = random.Random(seed)
+        counter = _ShowdownCounter(len(known))
+        runout_num = 5 - len(board)
+        sampled_count = runout_num + 2 * unknown_num
+        sampled = 0
+        while time.time() - start < sim_cycle and not pool.cancelled():
+            chunk_size = MonteCarloSimulator.check_interval
+            if sample_num is not None:
+                chunk_size = min(chunk_size, sample_num - sampled)
+                if chunk_size <= 0:
+                    break
+            for _ in range(chunk_size):
+                sampled_codes = rnd.sample(deck, sampled_count)
+                common = tables.PartialHand(board + sampled_codes[:runout_num])
+                strengths = [common.evaluate(*hole) for hole in known]
+                for seat in range(runout_num, sampled_count, 2):
+                    strengths.append(common.evaluate(sampled_codes[seat],
+                                                     sampled_codes[seat + 1]))
+                counter.add(strengths)
+            sampled += chunk_size
+        return counter.result()
+
+    @classmethod
+    def from_config(cls):
+        return cls(MonteCarloSimulator.sim_cycle.value,
+                   MonteCarloSimulator.sim_samples.value, cls.headsup_matrix.value)
+
+
+class RangeSimulator(KnownHandsSimulator):
+    """Evaluates game against opponents holding hands of weighted ranges, hole
+    cards of some opponents may be known and the others unknown.
+    River game against single range is exact: hands of the range are ranked on
+    the board and the player's result follows from the ranking, every hole counts
+    by its weight in percents. The others are
+    sampled for Monte Carlo simulation cycle or samples: range holes are drawn from
+    alias tables of combinations not blocked by known cards, deals of ranges
+    blocking each other are rejected and the rest comes from remaining deck.
+    Result includes pot share of the player, every known opponent and range.
+    """
+    name = 'range'
+    opponent_ranges = True
+    batch_size = MonteCarloSimulator.batch_size
+
+    def simulate(self, player_num, *cards, opponents=(), ranges=()):
+        """Simulates game of given cards against opponents of known hole cards
+        ('opponents' is sequence of card pairs) and opponents of ranges ('ranges' is
+        sequence of 'ranges.Range'), hole cards of the others are unknown.
+        """
+        assert isinstance(player_num, int)
+        codes = [card.code for card in cards]
+        known = [codes[:2]] + [[card.code for card in hole] for hole in opponents]
+        unknown_num = player_num - len(known) - len(ranges)
+        if unknown_num < 0:
+            raise ValueError('%d opponents in game of %d players' %
+                             (len(opponents) + len(ranges), player_num))
+        dealt = list(itertools.chain(codes, *known[1:]))
+        if len(set(dealt)) != len(dealt):
+            raise ValueError('Duplicate cards')
+        samplers = [opponent_range.sampler(dealt) for opponent_range in ranges]
+        if not self._can_deal([holes for holes, _ in samplers]):
+            raise ValueError('Ranges %s block each other' %
+                             ', '.join(map(str, ranges)))
+        board = codes[2:]
+        self.exact = len(board) == 5 and len(ranges) == 1 and not unknown_num
+        if self.exact:
+            holes, table = samplers[0]
+            return self._rank_range(known, board, holes, table.weights)
+        deck = [code for code in range(tables.CARD_NUM) if code not in dealt]
+        processes = worker_pool.processes
+        sample_num = -(-self._sim_samples // processes) if self._sim_samples else None
+        sample_fc = self._sample_batch if vectorized.AVAILABLE else self._sample_ranges
+        fc = functools.partial(sample_fc, known, board, samplers, unknown_num, deck,
+                               self.time_limit, sample_num)
+        seeds = [random.getrandbits(32) for _ in range(processes)]
+        return self._simulate_parallel(fc, seeds)
+
+    @staticmethod
+    def _can_deal(range_holes):
+        """Returns whether some hole of every range is disjoint with holes of the
+        others, deals of ranges blocking each other are rejected in sampling.
+        """
+        masks = sorted(({1 << first | 1 << second for first, second in holes}
+                        for holes in range_holes), key=len)
+        # narrow ranges first, dead ends are remembered by cards used so far
+        failed = set()
+
+        def deal(depth, used):
+            if depth == len(masks):
+                return True
+            if (depth, used) not in failed:
+                if any(not used & mask and deal(depth + 1, used | mask)
+                       for mask in masks[depth]):
+                    return True
+                failed.add((depth, used))
+            return False
+
+        return deal(0, 0)
+
+    @staticmethod
+    def _rank_range(known, board, holes, weights):
+        common = tables.PartialHand(board)
+        strengths = [common.evaluate(*hole) for hole in known]
+        ranked = sorted((common.evaluate(*hole), weight)
+                        for hole, weight in zip(holes, weights))
+        counter = _ShowdownCounter(len(known) + 1)
+        # hands of equal strength share the result
+        for strength, group in itertools.groupby(ranked, operator.itemgetter(0)):
+            counter.add(strengths + [strength], sum(weight for _, weight in group))
+        return counter.result()
+
+    @staticmethod
+    def _sample_ranges(known, board, samplers, unknown_num, deck, sim_cycle,
+                       sample_num, seed):
+        start = time.time()
+        rnd = random.Random(seed)
+        counter = _ShowdownCounter(len(known) + len(samplers))
+        runout_num = 5 - len(board)
+        drawn_count = runout_num + 2 * unknown_num
+        # cards of range holes are skipped among drawn cards
+        extra_count = drawn_count + 2 * len(samplers)
+        masks = [[1 << hole[0] | 1 << hole[1] for hole in holes] for holes, _ in samplers]
+        while time.time() - start < sim_cycle and not pool.cancelled():
+            chunk_size = MonteCarloSimulator.check_interval
+            if sample_num is not None:
+                chunk_size = min(chunk_size, sample_num - counter.win - counter.tie -
+                                 counter.lose)
+                if chunk_size <= 0:
+                    break
+            for _ in range(chunk_size):
+                used, holes = 0, []
+                for (range_holes, table), range_masks in zip(samplers, masks):
+                    index = table.sample(rnd)
+                    if used & range_masks[index]:
+                        break
+                    used |= range_masks[index]
+                    holes.append(range_holes[index])
+                else:
+                    drawn = [code for code in rnd.sample(deck, extra_count)
+                             if not used >> code & 1]
+                    common = tables.PartialHand(board + drawn[:runout_num])
+                    strengths = [common.evaluate(*hole) for hole in known]
+                    strengths.extend(common.evaluate(*hole) for hole in holes)
+                    for seat in range(runout_num, drawn_count, 2):
+                        strengths.append(common.evaluate(drawn[seat], drawn[seat + 1]))
+                    counter.add(strengths)
+        return counter.result()
+
+    @classmethod
+    def _sample_batch(cls, known, board, samplers, unknown_num, deck, sim_cycle,
+                      sample_num, seed):
+        """Vectorized variant of '_sample_ranges'."""
+        start = time.time()
+        numpy = vectorized.numpy
+        rng = numpy.random.default_rng(seed)
+        runout_num = 5 - len(board)
+        drawn_count = runout_num + 2 * unknown_num
+        board = numpy.asarray(board, dtype=numpy.int64)
+        range_holes = [numpy.asarray(holes, dtype=numpy.int64) for holes, _ in samplers]
+        alias_tables = [(numpy.asarray(table.probabilities), numpy.asarray(table.aliases))
+                        for _, table in samplers]
+        result = cls._empty_result()
+        while time.time() - start < sim_cycle and not pool.cancelled():
+            batch_size = cls.batch_size
+            if sample_num is not None:
+                batch_size = min(batch_size, sample_num - result.total)
+                if batch_size <= 0:
+                    break
+            holes = [hole_array[vectorized.alias_sample(rng, *alias_table, batch_size)]
+                     for hole_array, alias_table in zip(range_holes, alias_tables)]
+            dealt = numpy.hstack(holes)
+            ordered = numpy.sort(dealt, axis=1)
+            valid = (ordered[:, 1:] != ordered[:, :-1]).all(axis=1)
+            dealt, holes = dealt[valid], [hole[valid] for hole in holes]
+            count = len(dealt)
+            if not count:
+                continue
+            drawn = vectorized.sample(rng, deck, count, drawn_count, dealt)
+            common = numpy.hstack((numpy.tile(board, (count, 1)), drawn[:, :runout_num]))
+            seats = [numpy.tile(hole, (count, 1)) for hole in known] + holes
+            seats.extend(drawn[:, seat:seat + 2]
+                         for seat in range(runout_num, drawn_count, 2))
+            strengths = numpy.stack([vectorized.evaluate(numpy.hstack((seat, common)))
+                                     for seat in seats], axis=1)
+            result += cls._count_strengths(strengths, len(known) + len(samplers))
+        return result
+
 
+worker_pool = pool.WorkerPool()
+atexit.register(worker_pool.shutdown)
 
 SimulatorManager.register_simulator(LookUpSimulator)
+SimulatorManager.register_simulator(FlopLookUpSimulator)
 SimulatorManager.register_simulator(BruteForceSimulator)
 SimulatorManager.register_simulator(MonteCarloSimulator)
+SimulatorManager.register_simulator(KnownHandsSimulator)
+SimulatorManager.register_simulator(RangeSimulator)
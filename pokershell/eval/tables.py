@@ -0,0 +1,273 @@
+import argparse
+import array
+import itertools
+import mmap
+import os
+import struct
+import zlib
+
+import pokershell.model as model
+import pokershell.utils as utils
+
+RANK_NUM = len(model.Rank)
+SUIT_NUM = len(model.Suit)
+CARD_NUM = RANK_NUM * SUIT_NUM
+
+# hand strength is packed as: hand << HAND_SHIFT | r1 << 16 | r2 << 12 | ... | r5
+# where r1..r5 are rank ordinals (2-14) of the complement ranks, unused slots are 0
+HAND_SHIFT = 20
+RANK_BITS = 4
+
+# card key layout: 3 bits per rank count (ranks 2-A), then 4 bits per suit count
+SUIT_SHIFT = 3 * RANK_NUM
+RANK_MASK = (1 << SUIT_SHIFT) - 1
+FLUSH_OFFSET = sum(3 << (SUIT_SHIFT + 4 * suit) for suit in range(SUIT_NUM))
+FLUSH_BITS = sum(8 << (SUIT_SHIFT + 4 * suit) for suit in range(SUIT_NUM))
+
+# binary file with pregenerated tables: header, flush table, rank table keys and values
+# in native byte order, file of foreign byte order is treated as stale
+TABLE_VERSION = 1
+TABLE_FILE = os.path.join(os.path.dirname(__file__), 'ranks', 'hand_ranks.bin')
+_MAGIC = b'PSHR'
+_HEADER = struct.Struct('=4sIII')
+
+_STRAIGHT_MASKS = [(0b11111 << low, low + 6) for low in range(RANK_NUM - 5, -1, -1)]
+_STRAIGHT_MASKS.append((0b1000000001111, 5))
+
+
+def pack(hand, ranks):
+    strength = hand
+    for i in range(5):
+        strength <<= RANK_BITS
+        if i < len(ranks):
+            strength |= ranks[i]
+    return strength
+
+
+def get_hand(strength):
+    return model.Hand(strength >> HAND_SHIFT)
+
+
+def get_ranks(strength):
+    ranks = []
+    for shift in range(HAND_SHIFT - RANK_BITS, -1, -RANK_BITS):
+        rank_ord = strength >> shift & 0xf
+        if not rank_ord:
+            break
+        ranks.append(model.Rank.from_ord(rank_ord))
+    return tuple(ranks)
+
+
+def _top_ranks(mask, count):
+    ranks = []
+    for rank in range(RANK_NUM - 1, -1, -1):
+        if mask >> rank & 1:
+            ranks.append(rank + 2)
+            if len(ranks) == count:
+                break
+    return ranks
+
+
+def _build_straight_table():
+    table = [0] * (1 << RANK_NUM)
+    for mask in range(1 << RANK_NUM):
+        for straight, top in _STRAIGHT_MASKS:
+            if mask & straight == straight:
+                table[mask] = top
+                break
+    return table
+
+
+def _build_flush_table():
+    table = [0] * (1 << RANK_NUM)
+    for mask in range(1 << RANK_NUM):
+        if bin(mask).count('1') >= 5:
+            top = STRAIGHT_TABLE[mask]
+            if top:
+                table[mask] = pack(model.Hand.STRAIGHT_FLUSH, (top,))
+            else:
+                table[mask] = pack(model.Hand.FLUSH, _top_ranks(mask, 5))
+    return table
+
+
+def _rank_strength(counts):
+    mask = 0
+    quads, trips, pairs = [], [], []
+    for rank in range(RANK_NUM - 1, -1, -1):
+        count = counts[rank]
+        if count:
+            mask |= 1 << rank
+            if count == 4:
+                quads.append(rank + 2)
+            elif count == 3:
+                trips.append(rank + 2)
+            elif count == 2:
+                pairs.append(rank + 2)
+    if quads:
+        kicker = _top_ranks(mask & ~(1 << quads[0] - 2), 1)
+        return pack(model.Hand.FOUR_OF_KIND, quads + kicker)
+    if trips and len(trips) + len(pairs) >= 2:
+        return pack(model.Hand.FULL_HOUSE, (trips[0], max(trips[1:] + pairs)))
+    if STRAIGHT_TABLE[mask]:
+        return pack(model.Hand.STRAIGHT, (STRAIGHT_TABLE[mask],))
+    if trips:
+        kickers = _top_ranks(mask & ~(1 << trips[0] - 2), 2)
+        return pack(model.Hand.THREE_OF_KIND, trips + kickers)
+    if len(pairs) >= 2:
+        kicker = _top_ranks(mask & ~(1 << pairs[0] - 2) & ~(1 << pairs[1] - 2), 1)
+        return pack(model.Hand.TWO_PAIR, pairs[:2] + kicker)
+    if pairs:
+        kickers = _top_ranks(mask & ~(1 << pairs[0] - 2), 3)
+        return pack(model.Hand.ONE_PAIR, pairs + kickers)
+    return pack(model.Hand.HIGH_CARD, _top_ranks(mask, 5))
+
+
+def _build_rank_table():
+    table = {}
+    for card_num in range(5, 8):
+        for ranks in itertools.combinations_with_replacement(range(RANK_NUM), card_num):
+            counts = [0] * RANK_NUM
+            for rank in ranks:
+                counts[rank] += 1
+            if max(counts) <= 4:
+                key = sum(count << 3 * rank for rank, count in enumerate(counts))
+                table[key] = _rank_strength(counts)
+    keys = array.array('Q', sorted(table))
+    return keys, array.array('I', (table[key] for key in keys))
+
+
+def _build_tables():
+    keys, values = _build_rank_table()
+    return array.array('I', _build_flush_table()), keys, values
+
+
+def write_table_file(path=TABLE_FILE):
+    """Generates hand rank tables and stores them to binary file."""
+    flush, keys, values = _build_tables()
+    payload = b''.join(section.tobytes() for section in (flush, keys, values))
+    header = _HEADER.pack(_MAGIC, TABLE_VERSION, zlib.crc32(payload), len(keys))
+    utils.write_file_atomic(path, header + payload)
+
+
+def load_table_file(path=TABLE_FILE):
+    """Maps hand rank tables file to memory. Pages are shared by all processes.
+
+    Raises 'ValueError' for stale or corrupted file.
+    """
+    with open(path, 'rb') as f:
+        table_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(table_map) < _HEADER.size:
+        raise ValueError('Truncated hand rank table file %s' % path)
+    magic, version, checksum, rank_num = _HEADER.unpack_from(table_map)
+    if magic != _MAGIC or version != TABLE_VERSION:
+        raise ValueError('Stale hand rank table file %s' % path)
+    flush_size = 4 * (1 << RANK_NUM)
+    expected_size = _HEADER.size + flush_size + 12 * rank_num
+    payload = memoryview(table_map)[_HEADER.size:]
+    if len(table_map) != expected_size or zlib.crc32(payload) != checksum:
+        raise ValueError('Corrupted hand rank table file %s' % path)
+    values_start = flush_size + 8 * rank_num
+    return (payload[:flush_size].cast('I'),
+            payload[flush_size:values_start].cast('Q'),
+            payload[values_start:].cast('I'))
+
+
+def _load_tables():
+    try:
+        return load_table_file()
+    except FileNotFoundError:
+        return _build_tables()
+    except ValueError:
+        try:
+            write_table_file()
+            return load_table_file()
+        except (OSError, ValueError):
+            return _build_tables()
+
+
+def _create_rank_dict(keys, values):
+    # equal strengths share one int object so that reference counting in forked
+    # worker processes touches only few memory pages
+    strengths = {}
+    return {key: strengths.setdefault(value, value) for key, value in zip(keys, values)}
+
+
+CARD_KEYS = [1 << 3 * (code >> 2) | 1 << SUIT_SHIFT + 4 * (code & 3)
+             for code in range(CARD_NUM)]
+STRAIGHT_TABLE = _build_straight_table()
+_FLUSH_VIEW, RANK_KEYS, RANK_VALUES = _load_tables()
+FLUSH_TABLE = list(_FLUSH_VIEW)
+# CPython dict beats indexing mapped arrays several times on single lookup
+RANK_TABLE = _create_rank_dict(RANK_KEYS, RANK_VALUES)
+
+
+def evaluate(codes):
+    """Returns packed strength of the best 5 card hand of given 5-7 card codes."""
+    key = 0
+    for code in codes:
+        key += CARD_KEYS[code]
+    flush = key + FLUSH_OFFSET & FLUSH_BITS
+    if flush:
+        # with 7 cards or less there is no room for quads or full house beside flush
+        suit = (flush.bit_length() - SUIT_SHIFT - 4) >> 2
+        mask = 0
+        for code in codes:
+            if code & 3 == suit:
+                mask |= 1 << (code >> 2)
+        return FLUSH_TABLE[mask]
+    return RANK_TABLE[key & RANK_MASK]
+
+
+class PartialHand:
+    """Evaluation state of known cards, which is cheaply extended by more cards.
+
+    State keeps summed card keys (rank and suit counts) and rank bit mask per suit,
+    so evaluating known cards together with few additional cards costs only
+    the additional cards.
+    """
+    __slots__ = ('key', 'suit_masks')
+
+    def __init__(self, codes=()):
+        self.key = 0
+        self.suit_masks = [0] * SUIT_NUM
+        for code in codes:
+            self.key += CARD_KEYS[code]
+            self.suit_masks[code & 3] |= 1 << (code >> 2)
+
+    def add(self, *codes):
+        """Returns new state extended by given cards."""
+        state = PartialHand()
+        state.key = self.key
+        state.suit_masks = self.suit_masks[:]
+        for code in codes:
+            state.key += CARD_KEYS[code]
+            state.suit_masks[code & 3] |= 1 << (code >> 2)
+        return state
+
+    def evaluate(self, *codes):
+        """Returns packed strength of state cards together with given cards."""
+        key = self.key
+        for code in codes:
+            key += CARD_KEYS[code]
+        flush = key + FLUSH_OFFSET & FLUSH_BITS
+        if flush:
+            suit = (flush.bit_length() - SUIT_SHIFT - 4) >> 2
+            mask = self.suit_masks[suit]
+            for code in codes:
+                if code & 3 == suit:
+                    mask |= 1 << (code >> 2)
+            return FLUSH_TABLE[mask]
+        return RANK_TABLE[key & RANK_MASK]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generates Poker Shell hand rank tables')
+    parser.add_argument('-o', '--output', default=TABLE_FILE,
+                        help='output file (default: %(default)s)')
+    args = parser.parse_args()
+    write_table_file(args.output)
+    print('Hand rank tables written to %s' % args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import itertools
+
+import pokershell.eval.lookup as lookup
+import pokershell.eval.tables as tables
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+AVAILABLE = numpy is not None
+
+if AVAILABLE:
+    _CARD_KEYS = numpy.array(tables.CARD_KEYS, dtype=numpy.int64)
+    # rank table arrays are used without copy, mapped file pages are shared
+    _RANK_KEYS = numpy.frombuffer(tables.RANK_KEYS, dtype=numpy.int64)
+    _RANK_VALUES = numpy.frombuffer(tables.RANK_VALUES, dtype=numpy.uint32)
+    _FLUSH_TABLE = numpy.array(tables.FLUSH_TABLE, dtype=numpy.int64)
+    _FLUSH_BIT_SHIFTS = numpy.array([tables.SUIT_SHIFT + 4 * suit + 3
+                                     for suit in range(tables.SUIT_NUM)],
+                                    dtype=numpy.int64)
+    _PREFLOP_CLASSES = numpy.frombuffer(lookup.CLASS_TABLE, dtype=numpy.uint8)
+    _PREFLOP_INDEX = numpy.frombuffer(lookup.INDEX, dtype=numpy.float64).reshape(
+        len(lookup.PLAYER_NUMS), lookup.CLASS_NUM, lookup.RECORD_SIZE)
+
+
+def evaluate(cards):
+    """Evaluates (N, 5-7) array of card codes, returns (N,) array of packed strengths.
+    """
+    cards = numpy.asarray(cards, dtype=numpy.int64)
+    keys = _CARD_KEYS[cards].sum(axis=1)
+    rank_index = numpy.searchsorted(_RANK_KEYS, keys & tables.RANK_MASK)
+    strengths = _RANK_VALUES[rank_index].astype(numpy.int64)
+    flush = (keys + tables.FLUSH_OFFSET) & tables.FLUSH_BITS
+    flush_rows = numpy.flatnonzero(flush)
+    if flush_rows.size:
+        flush_bits = flush[flush_rows, None] >> _FLUSH_BIT_SHIFTS & 1
+        flush_suits = flush_bits.argmax(axis=1)
+        flush_cards = cards[flush_rows]
+        in_suit = (flush_cards & 3) == flush_suits[:, None]
+        masks = numpy.where(in_suit, 1 << (flush_cards >> 2), 0).sum(axis=1)
+        strengths[flush_rows] = _FLUSH_TABLE[masks]
+    return strengths
+
+
+def sample(rng, deck_codes, sample_num, count, dead=None):
+    """Draws `sample_num` rows of `count` distinct cards from given deck codes.
+
+    Cards of optional (sample_num, D) array `dead` of deck codes are excluded from
+    their rows.
+    """
+    deck = numpy.asarray(deck_codes, dtype=numpy.int64)
+    keys = rng.random((sample_num, len(deck)))
+    if dead is not None:
+        positions = numpy.zeros(tables.CARD_NUM, dtype=numpy.int64)
+        positions[deck] = numpy.arange(len(deck))
+        # random keys are below 1, dead cards are sorted last
+        keys[numpy.arange(sample_num)[:, None], positions[dead]] = 1
+    order = keys.argsort(axis=1)[:, :count]
+    return deck[order]
+
+
+def alias_sample(rng, probabilities, aliases, sample_num):
+    """Draws `sample_num` indices from alias table given by arrays of probabilities
+    and aliases.
+    """
+    index = rng.integers(len(probabilities), size=sample_num)
+    return numpy.where(rng.random(sample_num) < probabilities[index], index,
+                       aliases[index])
+
+
+def preflop_equity(player_num, holes):
+    """Returns (N, 2) array of win and tie percentages of (N, 2) array of hole card
+    codes against random hands of 'player_num' - 1 opponents.
+    """
+    if player_num not in lookup.PLAYER_NUMS:
+        raise ValueError('No preflop data for %d players' % player_num)
+    holes = numpy.asarray(holes, dtype=numpy.int64)
+    classes = _PREFLOP_CLASSES[holes[:, 0] * tables.CARD_NUM + holes[:, 1]]
+    return _PREFLOP_INDEX[player_num - lookup.PLAYER_NUMS.start, classes, :2]
+
+
+# card masks, card keys and rank masks per suit of all boards, built on demand
+_boards = None
+
+
+def _get_boards():
+    global _boards
+    if _boards is None:
+        combinations = itertools.combinations(range(tables.CARD_NUM), 5)
+        cards = numpy.fromiter(itertools.chain.from_iterable(combinations),
+                               dtype=numpy.int64).reshape(-1, 5)
+        card_masks = (numpy.int64(1) << cards).sum(axis=1)
+        keys = _CARD_KEYS[cards].sum(axis=1)
+        suit_masks = numpy.zeros((len(cards), tables.SUIT_NUM), dtype=numpy.int16)
+        for suit in range(tables.SUIT_NUM):
+            suit_masks[:, suit] = numpy.where((cards & 3) == suit,
+                                              1 << (cards >> 2), 0).sum(axis=1)
+        _boards = card_masks, keys, suit_masks
+    return _boards
+
+
+def _evaluate_boards(keys, suit_masks, hole):
+    keys = keys + sum(tables.CARD_KEYS[code] for code in hole)
+    rank_index = numpy.searchsorted(_RANK_KEYS, keys & tables.RANK_MASK)
+    strengths = _RANK_VALUES[rank_index].astype(numpy.int64)
+    flush = (keys + tables.FLUSH_OFFSET) & tables.FLUSH_BITS
+    flush_rows = numpy.flatnonzero(flush)
+    if flush_rows.size:
+        flush_suits = (flush[flush_rows, None] >> _FLUSH_BIT_SHIFTS & 1).argmax(axis=1)
+        masks = suit_masks[flush_rows, flush_suits].astype(numpy.int64)
+        for code in hole:
+            masks |= numpy.where(flush_suits == (code & 3), 1 << (code >> 2), 0)
+        strengths[flush_rows] = _FLUSH_TABLE[masks]
+    return strengths
+
+
+def board_strengths(holes, board=()):
+    """Returns (N, P) array of packed strengths of P hole card pairs on all N boards
+    completing given board codes.
+
+    All 5 card boards are precomputed on first use (about 60 MB), evaluating
+    a hand over all preflop boards takes about 0.1 second.
+    """
+    card_masks, keys, suit_masks = _get_boards()
+    dead = list(itertools.chain(board, *holes))
+    if len(set(dead)) != len(dead):
+        raise ValueError('Duplicate cards')
+    board_mask = sum(1 << code for code in board)
+    dead_mask = sum(1 << code for code in dead)
+    selected = (card_masks & dead_mask) == board_mask
+    keys, suit_masks = keys[selected], suit_masks[selected]
+    return numpy.stack([_evaluate_boards(keys, suit_masks, hole) for hole in holes],
+                       axis=1)
+
+
+def showdown_counts(hole, other, board=()):
+    """Returns tuple (win, tie, lose) of hole card codes against other hole card codes
+    counted over all boards completing given board codes.
+    """
+    strengths = board_strengths((hole, other), board)
+    first, second = strengths[:, 0], strengths[:, 1]
+    win, lose = int((first > second).sum()), int((first < second).sum())
+    return win, len(first) - win - lose, lose
@@ -3,6 +3,7 @@ import functools
 import itertools
 import random
 
+import pokershell.canonical as canonical
 import pokershell.utils as utils
 
 enable_unicode = False
@@ -71,6 +72,7 @@ class Card(utils.CommonEqualityMixin, metaclass=utils.MementoMetaclass):
     def __init__(self, rank, suit):
         self._rank = rank
         self._suit = suit
+        self._code = (rank.value[1] - 2) * len(Suit) + list(Suit).index(suit)
 
     @property
     def suit(self):
@@ -80,6 +82,11 @@ class Card(utils.CommonEqualityMixin, metaclass=utils.MementoMetaclass):
     def rank(self):
         return self._rank
 
+    @property
+    def code(self):
+        """Integer card code in range 0-51 (rank index * 4 + suit index)."""
+        return self._code
+
     def __key(self):
         return self._rank, self._suit
 
@@ -93,6 +100,10 @@ class Card(utils.CommonEqualityMixin, metaclass=utils.MementoMetaclass):
     def all_cards():
         return (Card(rank, suit) for rank in Rank for suit in Suit)
 
+    @staticmethod
+    def from_code(code):
+        return Card(list(Rank)[code >> 2], list(Suit)[code & 3])
+
     @staticmethod
     def all_combinations(cards, r):
         return itertools.combinations(cards, r)
@@ -111,6 +122,16 @@ class Card(utils.CommonEqualityMixin, metaclass=utils.MementoMetaclass):
         suit = [suit for suit in Suit if suit.value[1] == suit_str][0]
         return Card(rank, suit)
 
+    @staticmethod
+    def canonize(*groups):
+        """Maps groups of cards (e.g. hole cards and board) to canonical form.
+
+        Returns tuple (canonical_groups, perm), see 'canonical.canonize'.
+        """
+        forms, perm = canonical.canonize(*([card.code for card in group]
+                                           for group in groups))
+        return tuple(tuple(map(Card.from_code, form)) for form in forms), perm
+
     @classmethod
     def parse_cards_line(cls, cards_line):
         return cls.parse_cards(cards_line.split())
@@ -136,6 +157,19 @@ class Deck:
     def shuffle(self):
         random.shuffle(self._cards)
 
+    def orbits(self, count, *groups):
+        """Returns combinations of 'count' deck cards mapped to weights.
+
+        Combinations equivalent by suit relabeling, which keeps every given group
+        of cards in place, are collapsed to single one weighted by their number.
+        """
+        symmetries = canonical.suit_symmetries(*([card.code for card in group]
+                                                 for group in groups))
+        codes = [card.code for card in self._cards]
+        weights = canonical.orbits(itertools.combinations(codes, count), symmetries)
+        return {tuple(map(Card.from_code, combination)): weight
+                for combination, weight in weights.items()}
+
     def __repr__(self):
         return repr(self._cards)
 
@@ -1,10 +1,15 @@
 import re
 
 import pokershell.eval.game as game
+import pokershell.eval.ranges as ranges
 import pokershell.model as model
 
 NUM_RE = '\d+(\.(\d+)?)?'
 CARD_RE = '([2-9tjqka][hscd])+'
+# hole cards of opponent, e.g. '@KhKd'
+OPPONENT_RE = '@([2-9tjqka][hscd]){2}'
+# range of opponent, e.g. '@TT+,AQs+,KJo:0.5'
+RANGE_RE = '@[0-9tjqkahscdo+,:.-]+'
 
 
 class LineParser:
@@ -12,8 +17,13 @@ class LineParser:
     def parse_state(cls, line):
         cards, player_nums, pots = cls._parse_raw(line)
         pot = pots[-1] if pots else None
+        opponents = cls._parse_opponents(line)
+        opponent_ranges = [ranges.Range.parse(text) for text in cls._split_ranges(line)]
         player_num = player_nums[-1] if player_nums else None
-        return game.GameState(model.Card.parse_cards(cards), player_num, pot)
+        if player_num is None and (opponents or opponent_ranges):
+            player_num = len(opponents) + len(opponent_ranges) + 1
+        return game.GameState(model.Card.parse_cards(cards), player_num, pot,
+                              opponents, opponent_ranges)
 
     @staticmethod
     def _parse_raw(line):
@@ -27,6 +37,19 @@ class LineParser:
         player_nums = [int(param) for param in params if '.' not in param]
         return cards, player_nums, pots
 
+    @staticmethod
+    def _parse_opponents(line):
+        tokens = line.replace(';', ' ').split()
+        return [tuple(model.Card.parse_cards([token[1:3], token[3:5]]))
+                for token in tokens if re.fullmatch(OPPONENT_RE, token, re.IGNORECASE)]
+
+    @staticmethod
+    def _split_ranges(line):
+        tokens = line.replace(';', ' ').split()
+        return [token[1:] for token in tokens
+                if re.fullmatch(RANGE_RE, token, re.IGNORECASE) and
+                not re.fullmatch(OPPONENT_RE, token, re.IGNORECASE)]
+
     @classmethod
     def parse_history(cls, line):
         chunks = cls._split_line(line)
@@ -39,6 +62,16 @@ class LineParser:
             last_state = state
         return last_state
 
+    @classmethod
+    def parse_game(cls, line):
+        """Validates and parses line, raises 'ValueError' describing invalid line."""
+        if not cls.validate_syntax(line):
+            raise ValueError("Invalid syntax '%s'" % line)
+        errors = cls.validate_semantics(line)
+        if errors:
+            raise ValueError('; '.join(errors))
+        return cls.parse_history(line)
+
     @staticmethod
     def _split_line(line):
         return [token.strip() for token in line.split(';') if token.strip()]
@@ -47,16 +80,35 @@ class LineParser:
     def validate_syntax(line):
         line = line.replace(';', ' ')
         return all(re.fullmatch(NUM_RE, token) or
-                   re.fullmatch(CARD_RE, token, re.IGNORECASE)
+                   re.fullmatch(CARD_RE, token, re.IGNORECASE) or
+                   re.fullmatch(RANGE_RE, token, re.IGNORECASE)
                    for token in line.split())
 
     @classmethod
     def validate_semantics(cls, line):
         errors = []
         cards_str, player_nums, pots = cls._parse_raw(line)
+        opponents = cls._parse_opponents(line)
         cards = model.Card.parse_cards(cards_str)
-        if len(cards) != len(set(cards)):
-            errors.append('Duplicate cards: {0}'.format(cards))
+        dealt = list(cards) + [card for hole in opponents for card in hole]
+        if len(dealt) != len(set(dealt)):
+            errors.append('Duplicate cards: {0}'.format(dealt))
+        range_texts = cls._split_ranges(line)
+        for text in range_texts:
+            try:
+                opponent_range = ranges.Range.parse(text)
+            except ValueError as e:
+                errors.append(str(e))
+                continue
+            if not opponent_range.live(card.code for card in dealt)[0]:
+                errors.append('All holes of range %s are blocked' % text)
+        opponent_num = len(opponents) + len(range_texts)
+        if opponent_num > 9:
+            errors.append('Known opponent number is expected to be at most 9. '
+                          'Actual is %d' % opponent_num)
+        elif player_nums and player_nums[-1] <= opponent_num:
+            errors.append('Player number %d does not cover %d known opponents' %
+                          (player_nums[-1], opponent_num))
         card_num = len(cards_str)
         if not 2 <= card_num <= 7:
             errors.append('Card number is expected to be '
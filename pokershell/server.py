@@ -0,0 +1,313 @@
+import asyncio
+import collections
+import itertools
+import json
+import socket
+import time
+
+import pokershell.batch as batch
+import pokershell.config as config
+import pokershell.eval.cache as cache
+import pokershell.eval.ranges as ranges
+import pokershell.eval.simulation as simulation
+import pokershell.model as model
+import pokershell.parser as parser
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 7450
+
+
+def _simulate_games(games):
+    results = []
+    for game in games:
+        try:
+            results.append(batch.simulate_task(game))
+        except ValueError as e:
+            results.append(str(e))
+    return results
+
+
+class EquityServer:
+    """Serves simulation requests over TCP or Unix socket.
+
+    Protocol is one JSON object per line in both directions. Request either gives
+    game in eval command syntax ({"line": "As6c AdAc6d 3"}) or structured
+    ({"cards": ["As", "6c"], "player_num": 3}, hole cards of known opponents are given
+    as "opponents": [["Kh", "Kd"]] and ranges of opponents as "ranges": ["TT+,AQs+"]),
+    optional "id" is copied to response
+    and "budget" limits time of request in seconds. Requests {"type": "stats"} and
+    {"type": "health"} report server state.
+
+    Pre-flop look-ups are answered inline. Other requests arriving together are
+    collected into batches, equal games are simulated once and exact simulations
+    share single task of the worker pool. Bounded request queue and limited number
+    of requests in flight per connection push back on clients.
+    """
+    batch_size = 64
+    # time to wait for more requests before the batch is dispatched
+    batch_delay = 0.002
+    queue_size = 1024
+    connection_requests = 32
+    default_budget = 30.0
+    # part of the budget reserved for scheduling when Monte Carlo cycle is derived
+    budget_margin = 0.1
+
+    def __init__(self, result_cache=None):
+        super().__init__()
+        self._cache = result_cache or cache.ResultCache()
+        self._manager = simulation.SimulatorManager()
+        self._queue = None
+        self._dispatcher = None
+        self._in_flight = {}
+        self._connections = set()
+        self._started = time.time()
+        self.stats = collections.Counter()
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """Starts listening, returns 'asyncio' server."""
+        self._queue = asyncio.Queue(self.queue_size)
+        self._dispatcher = asyncio.ensure_future(self._dispatch())
+        if path:
+            return await asyncio.start_unix_server(self._handle_connection, path)
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def stop(self):
+        """Closes open connections and stops dispatching of requests."""
+        connections = list(self._connections)
+        for task in connections:
+            task.cancel()
+        if connections:
+            await asyncio.wait(connections)
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            await asyncio.wait([self._dispatcher])
+            self._dispatcher = None
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        server = await self.start(host, port, path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def _handle_connection(self, reader, writer):
+        slots = asyncio.Semaphore(self.connection_requests)
+        lock = asyncio.Lock()
+        tasks = set()
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        try:
+            while True:
+                # no more requests are read while too many are in flight
+                await slots.acquire()
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._respond(line, writer, lock, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except (ConnectionError, asyncio.CancelledError):
+            for task in tasks:
+                task.cancel()
+        finally:
+            self._connections.discard(connection)
+            writer.close()
+
+    async def _respond(self, line, writer, lock, slots):
+        try:
+            try:
+                response = await self.handle_request(line)
+            except Exception as e:
+                # client waits for every response line, so unexpected errors answer too
+                self.stats['errors'] += 1
+                response = {'error': 'Internal error: %s' % e}
+            async with lock:
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        finally:
+            slots.release()
+
+    async def handle_request(self, line):
+        """Returns response to request given as JSON line."""
+        start = time.time()
+        self.stats['requests'] += 1
+        response = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('JSON object expected')
+            if 'id' in request:
+                response['id'] = request['id']
+            request_type = request.get('type', 'eval')
+            if request_type == 'health':
+                response['status'] = 'ok'
+            elif request_type == 'stats':
+                response.update(self.get_stats())
+            elif request_type == 'eval':
+                response.update(await self._evaluate(request))
+            else:
+                raise ValueError("Unknown request type '%s'" % request_type)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            response['error'] = 'Time budget exceeded'
+        except (ValueError, TypeError, KeyError) as e:
+            self.stats['errors'] += 1
+            response['error'] = str(e)
+        response['time'] = round(time.time() - start, 6)
+        return response
+
+    async def _evaluate(self, request):
+        if 'line' in request:
+            state = parser.LineParser.parse_game(request['line'])
+            cards, player_num = state.cards, state.player_num
+            opponents, opponent_ranges = state.opponents, state.ranges
+        else:
+            cards = request['cards']
+            if isinstance(cards, str):
+                cards = cards.split()
+            cards = model.Card.parse_cards(cards)
+            opponents = tuple(model.Card.parse_cards(hole)
+                              for hole in request.get('opponents', ()))
+            if any(len(hole) != 2 for hole in opponents):
+                raise ValueError('Two hole cards of opponent expected')
+            opponent_ranges = tuple(ranges.Range.parse(text)
+                                    for text in request.get('ranges', ()))
+            dealt = list(cards) + [card for hole in opponents for card in hole]
+            if len(dealt) != len(set(dealt)):
+                raise ValueError('Duplicate cards: %s' % (dealt,))
+            player_num = request.get('player_num')
+            if not player_num and (opponents or opponent_ranges):
+                player_num = len(opponents) + len(opponent_ranges) + 1
+        player_num = player_num or config.player_num.value
+        if not isinstance(player_num, int) or isinstance(player_num, bool):
+            raise ValueError('Invalid player number %r' % (player_num,))
+        budget = float(request.get('budget') or self.default_budget)
+        simulator = self._manager.find_simulator(player_num, *cards, opponents=opponents,
+                                                 ranges=opponent_ranges)
+        if not simulator:
+            raise ValueError('No simulator found')
+        cycle = max(min(simulation.MonteCarloSimulator.sim_cycle.value or budget,
+                        budget - self.budget_margin), self.budget_margin)
+        if isinstance(simulator, simulation.MonteCarloSimulator):
+            simulator = simulation.MonteCarloSimulator(
+                cycle, simulator.sim_samples.value, simulator.sim_precision.value)
+        elif isinstance(simulator, simulation.KnownHandsSimulator):
+            simulator = type(simulator)(
+                cycle, simulation.MonteCarloSimulator.sim_samples.value,
+                simulator.headsup_matrix.value)
+        response = {'simulator': simulator.name, 'player_num': player_num}
+        if isinstance(simulator, simulation.LookUpSimulator):
+            self.stats['inline'] += 1
+            response.update(batch.format_result(simulator.simulate(player_num, *cards)))
+            return response
+
+        key = cache.make_key(simulator, player_num, cards, opponents, opponent_ranges)
+        result = self._cache.get(key)
+        if result is None:
+            future = self._in_flight.get(key)
+            if future is None:
+                future = asyncio.get_event_loop().create_future()
+                self._in_flight[key] = future
+                task = (simulator, player_num, cards, opponents, opponent_ranges)
+                await self._queue.put((key, task, future))
+            else:
+                self.stats['coalesced'] += 1
+            result = await asyncio.wait_for(asyncio.shield(future), budget)
+        if isinstance(result, str):
+            raise ValueError(result)
+        response.update(batch.format_result(result))
+        return response
+
+    async def _dispatch(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            items = [await self._queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(items) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.stats['batches'] += 1
+            self._submit(items)
+
+    def _submit(self, items):
+        exact = [item for item in items if item[1][0].exact]
+        # exact simulations are split among worker processes, the others need
+        # process each to keep their time budgets
+        processes = simulation.worker_pool.processes
+        chunks = [exact[i::processes] for i in range(min(processes, len(exact)))]
+        chunks.extend([item] for item in items if not item[1][0].exact)
+        for chunk in chunks:
+            future = simulation.worker_pool.submit(_simulate_games,
+                                                   [item[1] for item in chunk])
+            asyncio.wrap_future(future).add_done_callback(
+                lambda done, chunk=chunk: self._resolve(chunk, done))
+
+    def _resolve(self, chunk, done):
+        if done.exception():
+            results = [str(done.exception())] * len(chunk)
+        else:
+            results = done.result()
+        for (key, _, future), result in zip(chunk, results):
+            del self._in_flight[key]
+            if not isinstance(result, str):
+                self._cache.put(key, result)
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['uptime'] = round(time.time() - self._started, 3)
+        stats['queued'] = self._queue.qsize() if self._queue else 0
+        stats['in_flight'] = len(self._in_flight)
+        stats['cache'] = self._cache.stats()
+        return stats
+
+
+class Client:
+    """Blocking client of equity server."""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, timeout=None):
+        super().__init__()
+        if path:
+            self._socket = socket.socket(socket.AF_UNIX)
+            self._socket.settimeout(timeout)
+            self._socket.connect(path)
+        else:
+            self._socket = socket.create_connection((host, port), timeout)
+        self._file = self._socket.makefile('rw')
+        self._ids = itertools.count(1)
+
+    def request(self, **request):
+        request.setdefault('id', next(self._ids))
+        self._file.write(json.dumps(request) + '\n')
+        self._file.flush()
+        return json.loads(self._file.readline())
+
+    def evaluate(self, line=None, cards=None, player_num=None, budget=None,
+                 opponents=None, ranges=None):
+        request = {'line': line} if line else {'cards': cards, 'player_num': player_num}
+        if opponents:
+            request['opponents'] = opponents
+        if ranges:
+            request['ranges'] = ranges
+        if budget:
+            request['budget'] = budget
+        return self.request(**request)
+
+    def stats(self):
+        return self.request(type='stats')
+
+    def health(self):
+        return self.request(type='health')
+
+    def close(self):
+        self._file.close()
+        self._socket.close()
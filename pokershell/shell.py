@@ -1,23 +1,33 @@
 import argparse
+import asyncio
 import cmd
 import collections
 import enum
+import os
+import sys
 import time
 
 import prettytable
 
+import pokershell.batch as batch
 import pokershell.config as config
 import pokershell.eval.bet as bet
+import pokershell.eval.cache as cache
+import pokershell.eval.distributed as distributed
+import pokershell.eval.headsup as headsup
 import pokershell.eval.manager as manager
 import pokershell.eval.simulation as simulation
+import pokershell.eval.tables as tables
 import pokershell.intro as intro
 import pokershell.model as model
 import pokershell.parser as parser
+import pokershell.server as server
 
 
 @enum.unique
 class InputTableColumn(enum.Enum):
     HOLE = 'Hole'
+    OPPONENTS = 'Opponents'
     FLOP = 'Flop'
     TURN = 'Turn'
     RIVER = 'River'
@@ -29,6 +39,39 @@ class InputTableColumn(enum.Enum):
     POT_GROWTH = 'Pot Growth'
 
 
+class ProgressView:
+    """Shows partial simulation results, each one is redrawn in place of previous."""
+    redraw_interval = 0.05
+
+    def __init__(self, stream=None):
+        super().__init__()
+        self._stream = stream or sys.stdout
+        self._line_num = 0
+        self._drawn = 0
+
+    def update(self, result):
+        if time.time() - self._drawn < self.redraw_interval or not result.total:
+            return
+        table = prettytable.PrettyTable(['Samples', 'Win', 'Tie', 'Loss', 'Win 95% CI'])
+        counts = (result.win, result.tie, result.lose)
+        table.add_row([result.total] +
+                      ['%.2f%%' % (count / result.total * 100) for count in counts] +
+                      ['+/-%.2f%%' % (1.96 * result.std_error * 100)])
+        text = str(table)
+        self.clear()
+        self._stream.write(text + '\n')
+        self._stream.flush()
+        self._line_num = text.count('\n') + 1
+        self._drawn = time.time()
+
+    def clear(self):
+        if self._line_num:
+            # move cursor up to the first line of the view and erase the rest of screen
+            self._stream.write('\x1b[%dA\x1b[J' % self._line_num)
+            self._stream.flush()
+            self._line_num = 0
+
+
 class PokerShell(cmd.Cmd):
     """Poker Shell"""
     prompt = '(pokershell) '
@@ -36,6 +79,8 @@ class PokerShell(cmd.Cmd):
     def __init__(self):
         super().__init__()
         self._sim_manager = simulation.SimulatorManager()
+        self._cache = cache.ResultCache.from_config()
+        self._last_simulation = None
 
     def _parse_history(self, line):
         if parser.LineParser.validate_syntax(line):
@@ -64,16 +109,22 @@ Example:
         """
 Launches simulation. Proper simulator is chosen automatically.
 Eval is the default command therefore 'eval' can be omitted.
+Hole cards or ranges of opponents are given with '@', the others are unknown.
 
 Example:
     eval As6c AdAc6d 3 1.2; 7d 2 3.0
     (or shorter form)
     As6c AdAc6d 3 1.2; 7d 2 3.0
+    (against known opponents)
+    As6c AdAc6d @KhKd @QsJs 4
+    (against ranges of opponents)
+    As6c AdAc6d @TT+,AQs+,KJo @22+,A2s+ 5
 """
         state = self._parse_history(cards)
         if state:
             simulator = self._sim_manager.find_simulator(
-                state.player_num or config.player_num.value, *state.cards)
+                state.player_num or config.player_num.value, *state.cards,
+                opponents=state.opponents, ranges=state.ranges)
             self._simulate(state, simulator)
 
     def default(self, line):
@@ -106,6 +157,50 @@ Example:
             simulator = simulation.LookUpSimulator.from_config()
             self._simulate(state, simulator)
 
+    def do_matchup(self, line):
+        """
+Shows exact pre-flop heads-up result of hand against known hand. Hands are given
+by hole cards or by pre-flop classes (e.g. AKs, AKo, QQ).
+
+Example:
+    matchup AKo QQ
+    matchup AsKd QhQc
+"""
+        path = simulation.KnownHandsSimulator.headsup_matrix.value
+        try:
+            hands = line.split()
+            if len(hands) != 2:
+                raise ValueError('Two hands expected')
+            if all(len(hand) == 4 for hand in hands):
+                cards = model.Card.parse_cards((hands[0][:2], hands[0][2:],
+                                                hands[1][:2], hands[1][2:]))
+                codes = [card.code for card in cards]
+                result = headsup.equity(codes[:2], codes[2:], path)
+            else:
+                result = headsup.class_equity(*hands, path=path)
+        except ValueError as e:
+            print(e)
+            return
+        win, tie, lose = result
+        print('\nMatchup:')
+        out_table = prettytable.PrettyTable(['Hand', 'Win', 'Tie'])
+        out_table.add_row([hands[0], '%.2f%%' % win, '%.2f%%' % tie])
+        out_table.add_row([hands[1], '%.2f%%' % lose, '%.2f%%' % tie])
+        print(out_table)
+
+    def do_refine(self, _):
+        """
+Continues the last Monte Carlo simulation, new samples are added to its result.
+
+Example:
+    eval_monte_carlo As6c AdAc6d 3
+    refine
+"""
+        if self._last_simulation and self._last_simulation[1].resumable:
+            self._simulate(*self._last_simulation)
+        else:
+            print('\nNo simulation to refine!\n')
+
     def do_option_set(self, line):
         """
 Set configuration option.
@@ -191,6 +286,25 @@ Example:
         else:
             print("No such simulator '%s'" % name)
 
+    def do_cache_stats(self, _):
+        """
+Shows simulation results cache statistics.
+
+Example:
+    cache_stats
+"""
+        print('\nCache:')
+        self._print_dict('Property', self._cache.stats())
+
+    def do_cache_clear(self, _):
+        """
+Removes all simulation results from cache.
+
+Example:
+    cache_clear
+"""
+        self._cache.clear()
+
     def do_intro_show(self, name):
         """
 Shows intro text.
@@ -219,10 +333,48 @@ Example:
                   (simulator.name, cards_num))
             return
 
+        if not simulator.is_supported(player_num, cards_num):
+            print("\nSimulator '%s' does not support '%d' players with '%d' cards!\n" %
+                  (simulator.name, player_num, cards_num))
+            return
+
+        if state.ranges and not simulator.opponent_ranges:
+            print("\nSimulator '%s' does not support ranges of opponents!\n" %
+                  simulator.name)
+            return
+        if not state.ranges and bool(state.opponents) != simulator.known_opponents:
+            if state.opponents:
+                print("\nSimulator '%s' does not support known opponents!\n" %
+                      simulator.name)
+            else:
+                print("\nSimulator '%s' needs known opponents!\n" % simulator.name)
+            return
+
         start = time.time()
-        result = simulator.simulate(player_num, *state.cards)
-        print('\nSimulation (%s):' % simulator.name)
-        self._print_simulation(state, result, player_num)
+        self._last_simulation = state, simulator
+        view = ProgressView() if sys.stdout.isatty() else None
+        try:
+            result, previous = self._cache.simulate(simulator, player_num, *state.cards,
+                                                    progress=view and view.update,
+                                                    opponents=state.opponents,
+                                                    ranges=state.ranges)
+        except KeyboardInterrupt:
+            print('\nSimulation cancelled!\n')
+            return
+        except ValueError as e:
+            print('\nSimulation failed: %s\n' % e)
+            return
+        finally:
+            if view:
+                view.clear()
+        if previous is None:
+            print('\nSimulation (%s):' % simulator.name)
+        elif previous is result:
+            print('\nSimulation (%s, cached):' % simulator.name)
+        else:
+            print('\nSimulation (%s, resumed after %d samples):' %
+                  (simulator.name, previous.total))
+        self._print_simulation(state, result, player_num, simulator.exact)
         elapsed = time.time() - start
         print('\nSimulation finished in %.2f seconds\n' % elapsed)
 
@@ -233,7 +385,10 @@ Example:
             t.add_row([key, val])
         print(t)
 
-    def _print_simulation(self, state, sim_result, player_num):
+    def _print_simulation(self, state, sim_result, player_num, exact=True):
+        if not sim_result.total:
+            print('\nNo game was simulated!')
+            return
         counts = (sim_result.win, sim_result.tie, sim_result.lose)
         header = ['Win', 'Tie', 'Loss']
 
@@ -244,6 +399,10 @@ Example:
             pct = counts
             row = ['%.2f%%' % val for val in pct]
 
+        if not exact and sim_result.total:
+            header.append('Win 95% CI')
+            row.append('+/-%.2f%%' % (1.96 * sim_result.std_error * 100))
+
         if state.pot:
             equity = bet.BetAdviser.get_equity(sim_result.win_rate, state.pot)
             header.append('Equity')
@@ -256,8 +415,20 @@ Example:
         out_table.add_row(row)
         print(out_table)
 
+        if sim_result.equities:
+            self._print_equities(state, sim_result)
         self._print_hand_stats(sim_result)
 
+    @staticmethod
+    def _print_equities(state, sim_result):
+        hands = [' '.join(map(repr, hole))
+                 for hole in [state.cards[:2]] + list(state.opponents)]
+        hands.extend(str(opponent_range) for opponent_range in state.ranges)
+        equity_table = prettytable.PrettyTable(['Hand', 'Pot Share'])
+        for hand, share in zip(hands, sim_result.equities):
+            equity_table.add_row([hand, '%.2f%%' % (share / sim_result.total * 100)])
+        print(equity_table)
+
     def _print_hand_stats(self, sim_result):
         winning_hands = sim_result.sorted_winning_hands
         beating_hands = sim_result.sorted_beating_hands
@@ -302,6 +473,10 @@ Example:
         for state in state.history:
             cards = state.cards
             table[InputTableColumn.HOLE].append(' '.join(map(repr, cards[0:2])))
+            if state.opponents or state.ranges:
+                table[InputTableColumn.OPPONENTS].append(
+                    ' '.join([''.join(map(repr, hole)) for hole in state.opponents] +
+                             [str(opponent_range) for opponent_range in state.ranges]))
             if len(cards) >= 5:
                 table[InputTableColumn.FLOP].append(' '.join(map(repr, cards[2:5])))
             if len(cards) >= 6:
@@ -323,11 +498,9 @@ Example:
                     table[InputTableColumn.PLAYER_NUM].append(config.player_num.value)
 
             if len(cards) >= 5:
-                evaluator_manager = manager.EvaluatorManager()
-                result = evaluator_manager.find_best_hand(cards)
-                table[InputTableColumn.HAND].append(result.hand.name)
-
-                table[InputTableColumn.RANKS].append(result.complement_ranks)
+                strength = manager.EvaluatorManager.get_strength(cards)
+                table[InputTableColumn.HAND].append(tables.get_hand(strength).name)
+                table[InputTableColumn.RANKS].append(tables.get_ranks(strength))
 
             if state.pot:
                 table[InputTableColumn.POT].append(state.pot)
@@ -345,6 +518,8 @@ Example:
         return table
 
     def do_EOF(self, _):
+        simulation.worker_pool.shutdown()
+        self._cache.close()
         return True
 
     def emptyline(self):
@@ -365,6 +540,40 @@ def main():
             parser.add_argument(opt.long, type=opt.type, default=opt.value,
                                 help=opt.description)
 
+    commands = parser.add_subparsers(dest='command')
+    batch_parser = commands.add_parser('batch', help='evaluates games given by lines '
+                                                     'of input without interaction')
+    batch_parser.add_argument('-i', '--input', default='-',
+                              help='input file with one game per line in eval command '
+                                   'syntax (default: standard input)')
+    batch_parser.add_argument('-o', '--output', default='-',
+                              help='output file (default: standard output)')
+    batch_parser.add_argument('-f', '--format', choices=sorted(batch.WRITERS),
+                              default='jsonl', help='output format (default: jsonl)')
+    batch_parser.add_argument('-w', '--window', type=int, default=None,
+                              help='maximal number of simulations in flight '
+                                   '(default: 4 per worker process)')
+
+    serve_parser = commands.add_parser('serve', help='serves simulation requests '
+                                                     'over socket, see README')
+    serve_parser.add_argument('--host', default=server.DEFAULT_HOST,
+                              help='listening address (default: %(default)s)')
+    serve_parser.add_argument('--port', type=int, default=server.DEFAULT_PORT,
+                              help='listening port (default: %(default)s)')
+    serve_parser.add_argument('--unix', default=None,
+                              help='path of Unix socket to listen on instead of TCP')
+
+    worker_parser = commands.add_parser('worker', help='draws Monte Carlo samples for '
+                                                       'coordinator on other host')
+    worker_parser.add_argument('connect', metavar='HOST[:PORT]',
+                               help='address of coordinator (default port: %d)'
+                                    % distributed.DEFAULT_PORT)
+    worker_parser.add_argument('--authkey', default=None,
+                               help='key printed by coordinator (default: '
+                                    '$%s)' % distributed.AUTHKEY_VARIABLE)
+    worker_parser.add_argument('--processes', type=int, default=None,
+                               help='number of worker processes (default: CPU count)')
+
     args = parser.parse_args()
     if args.unicode:
         model.enable_unicode = True
@@ -372,7 +581,73 @@ def main():
     for opt in config.options.values():
         opt.value = getattr(args, opt.python_name)
 
-    PokerShell().cmdloop(intro.INTRO)
+    if args.command == 'batch':
+        _run_batch(args)
+        return
+    if args.command == 'serve':
+        _run_server(args)
+        return
+    if args.command == 'worker':
+        _run_workers(args)
+        return
+
+    pokershell = PokerShell()
+    try:
+        intro_text = intro.INTRO
+        while True:
+            try:
+                pokershell.cmdloop(intro_text)
+                break
+            except KeyboardInterrupt:
+                # Ctrl-C cancels only the current line
+                print('^C')
+                intro_text = ''
+    finally:
+        simulation.worker_pool.shutdown()
+
+
+def _run_batch(args):
+    input_file = sys.stdin if args.input == '-' else open(args.input)
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    result_cache = cache.ResultCache.from_config()
+    try:
+        writer = batch.WRITERS[args.format](output_file)
+        batch.BatchEvaluator(writer, args.window, result_cache).evaluate(input_file)
+    except KeyboardInterrupt:
+        sys.exit('Batch evaluation cancelled')
+    finally:
+        result_cache.close()
+        simulation.worker_pool.shutdown()
+        for f in (input_file, output_file):
+            if f not in (sys.stdin, sys.stdout):
+                f.close()
+
+
+def _run_server(args):
+    result_cache = cache.ResultCache.from_config()
+    equity_server = server.EquityServer(result_cache)
+    try:
+        asyncio.run(equity_server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        result_cache.close()
+        simulation.worker_pool.shutdown()
+
+
+def _run_workers(args):
+    address = distributed.parse_address(args.connect)
+    authkey = args.authkey or os.environ.get(distributed.AUTHKEY_VARIABLE)
+    if not authkey:
+        sys.exit('Authkey of coordinator is needed (--authkey or $%s)' %
+                 distributed.AUTHKEY_VARIABLE)
+    workers = distributed.start_workers(address, authkey.encode(), args.processes)
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,126 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import pokershell.eval.cache as cache
+import pokershell.eval.ranges as ranges
+import pokershell.eval.simulation as simulation
+import pokershell.model as model
+
+
+def _result(win):
+    return simulation.SimulationResult(win, 1, 2, [win] + [0] * 8, [0, 2] + [0] * 7)
+
+
+class TestMakeKey(unittest.TestCase):
+    def test_suit_relabeling(self):
+        simulator = simulation.BruteForceSimulator()
+        cards = model.Card.parse_cards_line('As Ks 2h 7h 9c')
+        other_cards = model.Card.parse_cards_line('Kd Ad 7c 2c 9s')
+        key = cache.make_key(simulator, 2, cards)
+        other = cache.make_key(simulator, 2, other_cards)
+        self.assertEqual(key, other)
+
+    def test_distinct(self):
+        cards = model.Card.parse_cards_line('As Ks 2h 7h 9c')
+        brute_force = simulation.BruteForceSimulator()
+        keys = {cache.make_key(brute_force, 2, cards),
+                cache.make_key(brute_force, 3, cards),
+                cache.make_key(simulation.MonteCarloSimulator(1), 2, cards),
+                cache.make_key(simulation.MonteCarloSimulator(2), 2, cards)}
+        self.assertEqual(4, len(keys))
+
+    def test_opponents(self):
+        simulator = simulation.KnownHandsSimulator()
+        cards = model.Card.parse_cards_line('As Ks 2h 7h 9c')
+        other_cards = model.Card.parse_cards_line('Kd Ad 7c 2c 9s')
+        opponents = [model.Card.parse_cards_line('Qs Qh')]
+        other_opponents = [model.Card.parse_cards_line('Qd Qc')]
+        key = cache.make_key(simulator, 2, cards, opponents)
+        self.assertEqual(key, cache.make_key(simulator, 2, other_cards, other_opponents))
+        self.assertNotEqual(key, cache.make_key(simulator, 2, other_cards, opponents))
+
+    def test_ranges(self):
+        simulator = simulation.RangeSimulator()
+        cards = model.Card.parse_cards_line('As Ks 2h 7h 9c')
+        other_cards = model.Card.parse_cards_line('Kd Ad 7c 2c 9s')
+        key = cache.make_key(simulator, 2, cards, ranges=[ranges.Range.parse('AhKh')])
+        self.assertEqual(key, cache.make_key(simulator, 2, other_cards,
+                                             ranges=[ranges.Range.parse('AcKc')]))
+        self.assertNotEqual(key, cache.make_key(simulator, 2, other_cards,
+                                                ranges=[ranges.Range.parse('AhKh')]))
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'results.sqlite')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        return super().tearDown()
+
+    def test_lru(self):
+        result_cache = cache.ResultCache(size=2)
+        for key in 'abc':
+            result_cache.put(key, _result(1))
+        result_cache.get('b')
+        result_cache.put('d', _result(1))
+        self.assertIsNone(result_cache.get('a'))
+        self.assertIsNone(result_cache.get('c'))
+        self.assertIsNotNone(result_cache.get('b'))
+        self.assertEqual((2, 2), (result_cache.hits, result_cache.misses))
+
+    def test_persistence(self):
+        result_cache = cache.ResultCache(path=self.path)
+        result_cache.put('a', _result(5))
+        result_cache.close()
+        result_cache = cache.ResultCache(path=self.path)
+        self.assertEqual(repr(_result(5)), repr(result_cache.get('a')))
+        result_cache.close()
+
+    def test_file_size(self):
+        result_cache = cache.ResultCache(size=0, path=self.path, file_size=2)
+        for key in 'abc':
+            result_cache.put(key, _result(1))
+        self.assertIsNone(result_cache.get('a'))
+        self.assertEqual(2, result_cache._file_entries())
+        result_cache.close()
+
+    def test_version(self):
+        result_cache = cache.ResultCache(path=self.path)
+        result_cache.put('a', _result(5))
+        result_cache.close()
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("UPDATE meta SET value = '0.0' WHERE name = 'version'")
+        result_cache = cache.ResultCache(path=self.path)
+        self.assertIsNone(result_cache.get('a'))
+        result_cache.close()
+
+    def test_clear(self):
+        result_cache = cache.ResultCache(path=self.path)
+        result_cache.put('a', _result(5))
+        result_cache.clear()
+        self.assertIsNone(result_cache.get('a'))
+        result_cache.close()
+
+    def test_simulate(self):
+        result_cache = cache.ResultCache()
+        simulator = simulation.BruteForceSimulator()
+        cards = model.Card.parse_cards_line('As 6c Ad 8s Ac 6d 7d')
+        result, previous = result_cache.simulate(simulator, 2, *cards)
+        self.assertIsNone(previous)
+        self.assertEqual((result, result), result_cache.simulate(simulator, 2, *cards))
+        self.assertEqual(1, result_cache.hits)
+
+    def test_simulate_resumable(self):
+        result_cache = cache.ResultCache()
+        simulator = simulation.MonteCarloSimulator(sim_samples=1000)
+        cards = model.Card.parse_cards_line('As 6c Ad 8s Ac')
+        first, _ = result_cache.simulate(simulator, 2, *cards)
+        result, previous = result_cache.simulate(simulator, 2, *cards)
+        self.assertIs(first, previous)
+        self.assertTrue(result.total >= first.total + 1000)
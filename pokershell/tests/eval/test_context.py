@@ -20,6 +20,14 @@ class TestEvalContext(unittest.TestCase, common.TestUtilsMixin):
         self.assertEqual(3, len(self.ctx.suit_dict[model.Suit.HEARTS]))
         self.assertEqual(1, len(self.ctx.suit_dict[model.Suit.DIAMONDS]))
 
+    def test_rank_mask(self):
+        self.assertEqual(0b1000001001, self.ctx.rank_mask)
+
+    def test_suit_masks(self):
+        self.assertEqual(0b1000001001, self.ctx.suit_masks[model.Suit.HEARTS])
+        self.assertEqual(0b1000000001, self.ctx.suit_masks[model.Suit.CLUBS])
+        self.assertEqual(0, self.ctx.suit_masks[model.Suit.SPADES])
+
     def test_sorted_ranks(self):
         self.assertEqual([model.Rank.JACK, model.Rank.JACK, model.Rank.FIVE],
                          self.ctx.sorted_ranks[:3])
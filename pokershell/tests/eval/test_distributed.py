@@ -0,0 +1,94 @@
+import threading
+import time
+import unittest
+
+import pokershell.eval.distributed as distributed
+import pokershell.model as model
+
+AUTHKEY = b'test'
+
+
+class TestCoordinator(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.coordinator = distributed.Coordinator(('127.0.0.1', 0), AUTHKEY)
+        self.coordinator.job_size = 1000
+        self.coordinator.start()
+        self.cards = model.Card.parse_cards_line('As 6c Ad 8s Ac')
+        self.workers = []
+
+    def tearDown(self):
+        for worker in self.workers:
+            worker.terminate()
+            worker.join()
+        self.coordinator.shutdown()
+        super().tearDown()
+
+    def _start_workers(self, processes):
+        self.workers.extend(distributed.start_workers(self.coordinator.address, AUTHKEY,
+                                                      processes))
+
+    def test_simulate(self):
+        self._start_workers(2)
+        result = self.coordinator.simulate(3, self.cards, 5500)
+        self.assertEqual(5500, result.total)
+        self.assertEqual(result.lose, sum(result.beating_hands))
+        self.assertEqual(6, sum(self.coordinator.stats['workers'].values()))
+
+    def test_seed(self):
+        self._start_workers(2)
+        first = self.coordinator.simulate(3, self.cards, 4000, seed=7)
+        second = self.coordinator.simulate(3, self.cards, 4000, seed=7)
+        self.assertEqual(repr(first), repr(second))
+
+    def test_lost_worker(self):
+        self.coordinator.job_timeout = 0.5
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            self.coordinator.simulate(2, self.cards, 3000)))
+        thread.start()
+        # job taken by a worker which dies before finishing it
+        jobs = self.coordinator._manager.get_jobs()
+        run_id, index = jobs.get(timeout=5)[:2]
+        results_queue = self.coordinator._manager.get_results()
+        results_queue.put(('start', run_id, index, 'lost', None))
+        time.sleep(0.1)
+        self._start_workers(1)
+        thread.join(30)
+        self.assertEqual(3000, results[0].total)
+        self.assertEqual(1, self.coordinator.stats['reissued'])
+        self.assertNotIn('lost', self.coordinator.stats['workers'])
+
+    def test_lost_before_start(self):
+        self.coordinator.job_timeout = 0.5
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            self.coordinator.simulate(2, self.cards, 1000)))
+        thread.start()
+        # the only job is taken by a worker which dies before starting it
+        self.coordinator._manager.get_jobs().get(timeout=5)
+        time.sleep(0.1)
+        self._start_workers(1)
+        thread.join(30)
+        self.assertEqual(1000, results[0].total)
+        self.assertEqual(1, self.coordinator.stats['reissued'])
+
+    def test_no_worker(self):
+        self.coordinator.idle_timeout = 0.5
+        self.assertRaises(TimeoutError, self.coordinator.simulate, 2, self.cards, 1000)
+        self._start_workers(1)
+        self.assertRaises(TimeoutError, self.coordinator.simulate, 2, self.cards,
+                          10 ** 7, timeout=0.5)
+
+    def test_authkey(self):
+        coordinator = distributed.Coordinator(('127.0.0.1', 0))
+        self.assertEqual(32, len(coordinator.authkey))
+        self.assertNotEqual(coordinator.authkey,
+                            distributed.Coordinator(('127.0.0.1', 0)).authkey)
+        self.assertEqual('127.0.0.1', distributed.Coordinator()._manager.address[0])
+
+    def test_simulator(self):
+        self._start_workers(1)
+        simulator = distributed.DistributedSimulator(self.coordinator, 2000)
+        result = simulator.simulate(2, *self.cards)
+        self.assertEqual(2000, result.total)
@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+
+import pokershell.eval.flopdb as flopdb
+import pokershell.eval.generate as generate
+import pokershell.eval.lookup as lookup
+import pokershell.eval.simulation as simulation
+import pokershell.model as model
+
+
+class TestFlopDatabase(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'flop.bin')
+        hole = lookup.class_hole(lookup.parse_class('AA'))
+        self.game_forms = flopdb.game_forms([hole])[:5]
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def _cards(self, hole, flop):
+        return [model.Card.from_code(code) for code in hole + flop]
+
+    def test_game_forms(self):
+        hole = lookup.class_hole(lookup.parse_class('AKs'))
+        # flops of suited hole are equivalent by relabeling of the other three suits
+        self.assertEqual(4494, len(flopdb.game_forms([hole])))
+
+    def test_generate(self):
+        generate.generate_flop_database(self.path, self.game_forms, chunk_size=2)
+        self.assertFalse(os.path.exists(self.path + '.partial'))
+        database = flopdb.load_database_file(self.path)
+        self.assertEqual(5, len(database))
+        for hole, flop in self.game_forms:
+            expected = simulation.BruteForceSimulator().simulate(
+                2, *self._cards(hole, flop))
+            self.assertEqual(repr(expected),
+                             repr(simulation.SimulationResult(*database.get(hole, flop))))
+        hole, flop = self.game_forms[0]
+        self.assertIsNone(database.get(hole, (flop[0], flop[1], 51)))
+
+    def test_resume(self):
+        def interrupt(done, total):
+            raise KeyboardInterrupt()
+
+        with self.assertRaises(KeyboardInterrupt):
+            generate.generate_flop_database(self.path, self.game_forms, chunk_size=2,
+                                            progress=interrupt)
+        self.assertRaises(ValueError, flopdb.load_database_file, self.path + '.partial')
+        reported = []
+        generate.generate_flop_database(self.path, self.game_forms, chunk_size=2,
+                                        progress=lambda *args: reported.append(args))
+        self.assertEqual([(2, 3), (3, 3)], reported)
+        self.assertEqual(5, len(flopdb.load_database_file(self.path)))
+
+    def test_corrupted(self):
+        generate.generate_flop_database(self.path, self.game_forms[:1])
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'x')
+        self.assertRaises(ValueError, flopdb.load_database_file, self.path)
+
+    def test_simulator(self):
+        generate.generate_flop_database(self.path, self.game_forms[:1])
+        simulator = simulation.FlopLookUpSimulator(self.path)
+        hole, flop = self.game_forms[0]
+        # suits relabeled
+        cards = self._cards(tuple(code ^ 1 for code in hole),
+                            tuple(code ^ 1 for code in flop))
+        self.assertEqual(repr(simulation.BruteForceSimulator().simulate(2, *cards)),
+                         repr(simulator.simulate(2, *cards)))
+        cards = model.Card.parse_cards_line('2c 7d Ah Kh 9s')
+        self.assertEqual(repr(simulation.BruteForceSimulator().simulate(2, *cards)),
+                         repr(simulator.simulate(2, *cards)))
+
+    def test_generated_later(self):
+        self.assertIsNone(simulation.FlopLookUpSimulator._get_database(self.path))
+        generate.generate_flop_database(self.path, self.game_forms[:1])
+        self.assertIsNotNone(simulation.FlopLookUpSimulator._get_database(self.path))
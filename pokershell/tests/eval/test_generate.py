@@ -0,0 +1,109 @@
+import math
+import os
+import shutil
+import tempfile
+import unittest
+
+import pokershell.eval.distributed as distributed
+import pokershell.eval.generate as generate
+import pokershell.eval.lookup as lookup
+
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'test.journal')
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_reopen(self):
+        journal = generate.Journal(self.path, 'a')
+        journal.start()
+        journal.add(3, '[1, 2]')
+        journal.add(5)
+        with open(self.path, 'a') as f:
+            f.write('7 [1')
+        self.assertEqual({3: '[1, 2]', 5: ''}, generate.Journal(self.path, 'a').done)
+        self.assertEqual({}, generate.Journal(self.path, 'b').done)
+
+
+class TestPreflopTables(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def _read(self, name):
+        with open(os.path.join(self.path, name)) as f:
+            return f.read()
+
+    def test_text_table(self):
+        generate.generate_preflop_tables(self.path, precision=5, player_nums=(3,))
+        self.assertEqual(['3.txt'], os.listdir(self.path))
+        lines = self._read('3.txt').splitlines()
+        self.assertEqual(lookup.CLASS_NUM, len(lines))
+        self.assertEqual('AA', lines[0].split()[1])
+        classes = {lookup.parse_class(line.split()[1]) for line in lines}
+        self.assertEqual(lookup.CLASS_NUM, len(classes))
+
+    def test_resume(self):
+        def interrupt(done, total):
+            if done == 10:
+                raise KeyboardInterrupt()
+
+        with self.assertRaises(KeyboardInterrupt):
+            generate.generate_preflop_tables(self.path, precision=5, player_nums=(2,),
+                                             progress=interrupt)
+        reported = []
+        generate.generate_preflop_tables(self.path, precision=5, player_nums=(2,),
+                                         progress=lambda *args: reported.append(args))
+        self.assertEqual((11, lookup.CLASS_NUM), reported[0])
+        resumed = self._read('2.txt')
+        generate.generate_preflop_tables(self.path, precision=5, player_nums=(2,))
+        self.assertEqual(resumed, self._read('2.txt'))
+
+    def test_coordinator(self):
+        coordinator = distributed.Coordinator(('127.0.0.1', 0))
+        coordinator.start()
+        workers = distributed.start_workers(coordinator.address, coordinator.authkey, 1)
+        try:
+            generate.generate_preflop_tables(self.path, precision=10, player_nums=(2,),
+                                             coordinator=coordinator)
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.join()
+            coordinator.shutdown()
+        lines = self._read('2.txt').splitlines()
+        self.assertEqual(lookup.CLASS_NUM, len(lines))
+        self.assertIn(lines[0].split()[1], ('AA', 'KK'))
+        self.assertTrue(coordinator.stats['jobs'] >= lookup.CLASS_NUM)
+
+    def test_partial_index(self):
+        for player_num in lookup.PLAYER_NUMS:
+            name = '%d.txt' % player_num
+            shutil.copy(os.path.join(lookup.TEXT_DIR, name), self.path)
+        generate.generate_preflop_tables(self.path, precision=10, player_nums=(3,))
+        index = lookup.load_index_file(os.path.join(self.path, 'equity.bin'))
+        shipped = lookup.read_text_files()
+        for player_num, regenerated in ((2, False), (3, True)):
+            position = (player_num - 2) * lookup.CLASS_NUM * lookup.RECORD_SIZE
+            record = index[position:position + lookup.RECORD_SIZE].tolist()
+            self.assertEqual(regenerated, record[0] != shipped[position])
+            self.assertEqual(not regenerated, math.isnan(record[2]))
+
+    def test_binary_index(self):
+        generate.generate_preflop_tables(self.path, precision=10)
+        index = lookup.load_index_file(os.path.join(self.path, 'equity.bin'))
+        hand_num = (lookup.RECORD_SIZE - 2) // 2
+        for position in range(0, len(index), lookup.RECORD_SIZE * 50):
+            record = index[position:position + lookup.RECORD_SIZE].tolist()
+            self.assertAlmostEqual(record[0], sum(record[2:2 + hand_num]))
+            self.assertTrue(0 < sum(record[2 + hand_num:]) < 100)
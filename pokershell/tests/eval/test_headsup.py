@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+
+import pokershell.eval.generate as generate
+import pokershell.eval.headsup as headsup
+import pokershell.eval.lookup as lookup
+import pokershell.eval.vectorized as vectorized
+import pokershell.model as model
+
+
+def _codes(cards_str):
+    return [card.code for card in model.Card.parse_cards_line(cards_str)]
+
+
+class TestMatchups(unittest.TestCase):
+    def test_class_matchups(self):
+        aces, kings = lookup.parse_class('AA'), lookup.parse_class('KK')
+        matchups = headsup.class_matchups(aces, kings)
+        # kings of the same suits as aces, of the other suits and of one of each
+        self.assertEqual([1, 1, 4], sorted(matchups.values()))
+        matchups = headsup.class_matchups(aces, lookup.parse_class('AKo'))
+        self.assertEqual(6, sum(matchups.values()))
+
+    def test_canonize(self):
+        hole, other, swapped = headsup.canonize(_codes('As Ac'), _codes('Kh Kd'))
+        self.assertTrue(swapped)
+        self.assertEqual(headsup.canonize(_codes('Ks Kh'), _codes('Ad Ac')),
+                         (hole, other, False))
+
+
+@unittest.skipUnless(vectorized.AVAILABLE, 'numpy is not installed')
+class TestHeadsUpMatrix(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'headsup.bin')
+        self.classes = [lookup.parse_class('AA'), lookup.parse_class('KK')]
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_on_demand(self):
+        matrix = headsup.HeadsUpMatrix()
+        self.assertEqual((1410336, 9308, 292660),
+                         matrix.get(_codes('Ah Ac'), _codes('Kh Kc')))
+        self.assertEqual((292660, 9308, 1410336),
+                         matrix.get(_codes('Kd Ks'), _codes('Ad As')))
+        self.assertRaises(ValueError, matrix.get, _codes('Ah Ac'), _codes('Ah Kc'))
+
+    def test_class_equity(self):
+        win, tie, lose = headsup.class_equity('AKo', 'QQ', self.path)
+        self.assertAlmostEqual(43.03, win, 2)
+        self.assertAlmostEqual(0.42, tie, 2)
+        self.assertEqual((lose, tie, win), headsup.class_equity('QQ', 'AKo', self.path))
+
+    def test_generate(self):
+        matchups = headsup.matchup_forms(self.classes)
+        self.assertEqual(5, len(matchups))
+        generate.generate_headsup_matrix(self.path, matchups, chunk_size=2)
+        self.assertFalse(os.path.exists(self.path + '.journal'))
+        matrix = headsup.load_matrix_file(self.path)
+        self.assertEqual(headsup.HeadsUpMatrix().get(_codes('Kd Ks'), _codes('Ad Ah')),
+                         matrix.get(_codes('Kd Ks'), _codes('Ad Ah')))
+        aces_kings = matrix.get_class(*self.classes)
+        self.assertEqual(6 * 1712304, sum(aces_kings))
+        self.assertEqual(tuple(reversed(aces_kings)),
+                         matrix.get_class(*reversed(self.classes)))
+
+    def test_resume(self):
+        def interrupt(done, total):
+            raise KeyboardInterrupt()
+
+        matchups = headsup.matchup_forms(self.classes)
+        with self.assertRaises(KeyboardInterrupt):
+            generate.generate_headsup_matrix(self.path, matchups, chunk_size=2,
+                                             progress=interrupt)
+        reported = []
+        generate.generate_headsup_matrix(self.path, matchups, chunk_size=2,
+                                         progress=lambda *args: reported.append(args))
+        self.assertEqual([(2, 3), (3, 3)], reported)
+
+    def test_corrupted(self):
+        generate.generate_headsup_matrix(self.path, headsup.matchup_forms(
+            self.classes[:1]))
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'x')
+        self.assertRaises(ValueError, headsup.load_matrix_file, self.path)
@@ -0,0 +1,81 @@
+import itertools
+import os
+import tempfile
+import unittest
+
+import pokershell.eval.lookup as lookup
+import pokershell.eval.tables as tables
+import pokershell.model as model
+
+
+class TestLookUp(unittest.TestCase):
+    def _codes(self, cards_str):
+        return [card.code for card in model.Card.parse_cards_line(cards_str)]
+
+    def test_classes(self):
+        classes = {lookup.class_index(first, second)
+                   for first, second in itertools.combinations(range(tables.CARD_NUM), 2)}
+        self.assertEqual(set(range(lookup.CLASS_NUM)), classes)
+
+    def test_class_name(self):
+        for line, name in (('As Kc', 'AKo'), ('Kh Ah', 'AKs'), ('Td Tc', 'TT'),
+                           ('2c 7c', '72s')):
+            codes = self._codes(line)
+            index = lookup.class_index(*codes)
+            self.assertEqual(name, lookup.class_name(index))
+            self.assertEqual(index, lookup.parse_class(name))
+            self.assertEqual(index, lookup.CLASS_TABLE[codes[0] * tables.CARD_NUM +
+                                                       codes[1]])
+
+    def test_parse_class(self):
+        self.assertEqual(lookup.parse_class('AKo'), lookup.parse_class('KA'))
+        self.assertEqual(lookup.parse_class('AKs'), lookup.parse_class('KAs'))
+        self.assertRaises(ValueError, lookup.parse_class, 'AAs')
+        self.assertRaises(ValueError, lookup.parse_class, 'AKx')
+
+    def test_equity(self):
+        self.assertEqual((84.97, 0.57), lookup.equity(2, *self._codes('Ah Ac')))
+        self.assertEqual((19.21, 4.17), lookup.equity(5, *self._codes('6c As')))
+        self.assertEqual(lookup.equity(7, *self._codes('Kd Qd')),
+                         lookup.equity(7, *self._codes('Qs Ks')))
+        self.assertRaises(ValueError, lookup.equity, 11, *self._codes('Ah Ac'))
+
+    def test_record(self):
+        # histograms of tables converted from text format are unknown
+        self.assertEqual((84.97, 0.57, None, None),
+                         lookup.record(2, *self._codes('Ah Ac')))
+
+
+class TestIndexFile(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'equity.bin')
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_shipped_file(self):
+        self.assertEqual(lookup.read_text_files().tobytes(),
+                         lookup.load_index_file().tobytes())
+
+    def test_write_load(self):
+        index = lookup.read_text_files()
+        index[0] = 1.5
+        lookup.write_index_file(self.path, index)
+        self.assertEqual(index.tobytes(), lookup.load_index_file(self.path).tobytes())
+
+    def test_corrupted(self):
+        lookup.write_index_file(self.path)
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'x')
+        self.assertRaises(ValueError, lookup.load_index_file, self.path)
+
+    def test_stale(self):
+        lookup.write_index_file(self.path)
+        with open(self.path, 'r+b') as f:
+            f.seek(4)
+            f.write(bytes(4))
+        self.assertRaises(ValueError, lookup.load_index_file, self.path)
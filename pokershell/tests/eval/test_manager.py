@@ -50,3 +50,19 @@ class TestEvaluatorManager(unittest.TestCase, common.TestUtilsMixin):
         cards = model.Card.parse_cards_line(cards_str)
         best_hand = self.manager.find_best_hand(cards)
         self.assertEqual(expected_hand, best_hand.hand)
+
+    def test_min_hand(self):
+        cards = model.Card.parse_cards_line('2h 2c 5h Jh Jc')
+        self.assertIsNone(self.manager.find_best_hand(cards, min_hand=model.Hand.FLUSH))
+        best_hand = self.manager.find_best_hand(cards, min_hand=model.Hand.TWO_PAIR)
+        self.assertEqual(model.Hand.TWO_PAIR, best_hand.hand)
+        self.assertEqual((model.Rank.JACK, model.Rank.DEUCE, model.Rank.FIVE),
+                         best_hand.complement_ranks)
+
+    def test_get_strength(self):
+        flush = self.manager.get_strength(model.Card.parse_cards_line('2h 9h 3h 4h Ah'))
+        pair = self.manager.get_strength(model.Card.parse_cards_line('2h 2c 3h 4h Ah'))
+        self.assertTrue(flush > pair)
+        result = manager.EvalResult.from_strength(pair)
+        self.assertEqual(model.Hand.ONE_PAIR, result.hand)
+        self.assertEqual(pair, result.strength)
@@ -0,0 +1,68 @@
+import os
+import time
+import unittest
+
+import pokershell.eval.pool as pool
+
+
+def _get_pid(_):
+    return os.getpid()
+
+
+def _crash(_):
+    os._exit(1)
+
+
+def _wait_for_cancel(timeout):
+    start = time.time()
+    while not pool.cancelled() and time.time() - start < timeout:
+        time.sleep(0.01)
+    return pool.cancelled()
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.pool = pool.WorkerPool(processes=2)
+
+    def tearDown(self):
+        self.pool.shutdown()
+        super().tearDown()
+
+    def test_map(self):
+        self.assertEqual([1, 4, 9], self.pool.map(abs, [-1, -4, -9]))
+
+    def test_map_unordered(self):
+        self.assertEqual([1, 4, 9], sorted(self.pool.map_unordered(abs, [-1, -4, -9])))
+
+    def test_map_unordered_worker_death(self):
+        results = self.pool.map_unordered(_crash, [1])
+        self.assertRaises(pool.BrokenProcessPool, list, results)
+        self.assertFalse(self.pool.running)
+
+    def test_reuse(self):
+        pids = set(self.pool.map(_get_pid, range(20)))
+        self.assertTrue(self.pool.running)
+        pids.update(self.pool.map(_get_pid, range(20)))
+        self.assertTrue(len(pids) <= 2)
+
+    def test_restart_after_worker_death(self):
+        self.assertRaises(pool.BrokenProcessPool, self.pool.map, _crash, [1])
+        self.assertFalse(self.pool.running)
+        self.assertEqual([1, 2], self.pool.map(abs, [-1, -2]))
+
+    def test_timeout(self):
+        start = time.time()
+        self.assertEqual([], list(self.pool.map_unordered(_wait_for_cancel, [10],
+                                                          timeout=0.2)))
+        self.assertTrue(time.time() - start < 5)
+        self.assertFalse(self.pool.running)
+        self.assertEqual([False], list(self.pool.map_unordered(_wait_for_cancel, [0])))
+
+    def test_not_cancelled(self):
+        self.assertFalse(pool.cancelled())
+
+    def test_shutdown(self):
+        self.pool.map(abs, [-1])
+        self.pool.shutdown()
+        self.assertFalse(self.pool.running)
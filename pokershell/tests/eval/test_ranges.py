@@ -0,0 +1,54 @@
+import collections
+import random
+import unittest
+
+import pokershell.canonical as canonical
+import pokershell.eval.ranges as ranges
+import pokershell.model as model
+
+
+class TestRanges(unittest.TestCase):
+    def _codes(self, cards_str):
+        return tuple(sorted(card.code for card in model.Card.parse_cards_line(cards_str)))
+
+    def test_parse_classes(self):
+        for text, count in (('TT+', 5 * 6), ('AQs+', 2 * 4), ('KJo', 12), ('AK', 16),
+                            ('A2s-A5s', 4 * 4), ('55-22', 4 * 6), ('KTo+', 3 * 12),
+                            ('AhKh', 1), ('TT+, AQs+, KJo', 50), ('kjo', 12)):
+            self.assertEqual(count, len(ranges.parse_range(text)), text)
+
+    def test_parse_weights(self):
+        combos = ranges.parse_range('AK:0.5, AKs')
+        self.assertEqual({50, 100}, set(combos.values()))
+        self.assertEqual(100, combos[self._codes('Ah Kh')])
+        self.assertEqual(50, combos[self._codes('Ah Kd')])
+        self.assertEqual(12, len(ranges.parse_range('AK, AKs:0')))
+
+    def test_parse_invalid(self):
+        for text in ('', 'XX', 'TTs', 'A5s-K2s', 'AKs:2', 'AhAh', 'AKs:0'):
+            self.assertRaises(ValueError, ranges.parse_range, text)
+
+    def test_live(self):
+        opponent_range = ranges.Range.parse('AA, AhKh')
+        holes, weights = opponent_range.live(self._codes('As 2c'))
+        self.assertEqual(4, len(holes))
+        self.assertEqual([100] * 4, weights)
+        self.assertRaises(ValueError, opponent_range.sampler, self._codes('Ah Ad Ac'))
+
+    def test_key(self):
+        hole, other = self._codes('Ah Kh'), self._codes('Ad Kd')
+        perm = canonical.canonize(hole)[1]
+        other_perm = canonical.canonize(other)[1]
+        self.assertEqual(ranges.Range.parse('AhKh, QQ').key(perm),
+                         ranges.Range.parse('AdKd, QQ').key(other_perm))
+        self.assertNotEqual(ranges.Range.parse('AhKh').key(perm),
+                            ranges.Range.parse('AdKd').key(perm))
+
+    def test_alias_table(self):
+        weights = [1, 2, 3, 4, 0]
+        table = ranges.AliasTable(weights)
+        rnd = random.Random(7)
+        counts = collections.Counter(table.sample(rnd) for _ in range(100000))
+        for index, weight in enumerate(weights):
+            self.assertAlmostEqual(weight / 10, counts[index] / 100000, places=2)
+        self.assertRaises(ValueError, ranges.AliasTable, [])
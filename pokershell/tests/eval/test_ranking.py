@@ -0,0 +1,73 @@
+import itertools
+import random
+import unittest
+
+import pokershell.eval.ranking as ranking
+import pokershell.eval.tables as tables
+import pokershell.model as model
+
+
+class TestBoardRanking(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        board = model.Card.parse_cards_line('8s Ac 6d 9d 2c')
+        self.board = [card.code for card in board]
+        self.ranking = ranking.BoardRanking(self.board)
+
+    def test_holdings(self):
+        self.assertEqual(1081, len(self.ranking.sorted_strengths))
+
+    def test_showdown(self):
+        hole = [card.code for card in model.Card.parse_cards_line('As 6c')]
+        win, tie, lose, beaten_by = self.ranking.showdown(hole)
+        self.assertEqual(990, win + tie + lose)
+        self.assertEqual(lose, sum(beaten_by))
+        self.assertEqual(self._count(hole), (win, tie, lose))
+
+    def test_showdown_multiway(self):
+        hole = [card.code for card in model.Card.parse_cards_line('As 6c')]
+        win, tie, lose, beaten_by = self.ranking.showdown(hole, 2)
+        self.assertEqual(990 * 903 // 2, win + tie + lose)
+        self.assertEqual(lose, sum(beaten_by))
+        self.assertEqual(self._count_multiway(hole), (win, tie, lose))
+
+    def _count_multiway(self, hole):
+        strength = tables.evaluate(hole + self.board)
+        live = [code for code in range(tables.CARD_NUM)
+                if code not in self.board and code not in hole]
+        holdings = {pair: tables.evaluate(pair + tuple(self.board))
+                    for pair in itertools.combinations(live, 2)}
+        counts = [0, 0, 0]
+        for pair1, pair2 in itertools.combinations(holdings, 2):
+            if set(pair1) & set(pair2):
+                continue
+            best = max(holdings[pair1], holdings[pair2])
+            counts[0 if strength > best else 1 if strength == best else 2] += 1
+        return tuple(counts)
+
+    def _count(self, hole):
+        strength = tables.evaluate(hole + self.board)
+        live = [code for code in range(tables.CARD_NUM)
+                if code not in self.board and code not in hole]
+        counts = [0, 0, 0]
+        for opponent in itertools.combinations(live, 2):
+            other = tables.evaluate(opponent + tuple(self.board))
+            counts[0 if strength > other else 1 if strength == other else 2] += 1
+        return tuple(counts)
+
+
+class TestCountDisjoint(unittest.TestCase):
+    def test_small_graphs(self):
+        rnd = random.Random(7)
+        for _ in range(50):
+            pairs = rnd.sample(list(itertools.combinations(range(9), 2)),
+                               rnd.randint(0, 25))
+            cuts = sorted(rnd.randint(0, len(pairs)) for _ in range(3))
+            for size in range(1, 4):
+                expected = [sum(1 for subset in itertools.combinations(pairs[:cut], size)
+                                if len(set(itertools.chain(*subset))) == 2 * size)
+                            for cut in cuts]
+                self.assertEqual(expected, ranking.count_disjoint(pairs, size, cuts))
+
+    def test_unsupported_size(self):
+        self.assertRaises(ValueError, ranking.count_disjoint, [], 4, [0])
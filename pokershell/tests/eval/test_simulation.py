@@ -1,7 +1,12 @@
+import itertools
+import math
 import time
 import unittest
 
+import pokershell.eval.ranges as ranges
 import pokershell.eval.simulation as simulation
+import pokershell.eval.tables as tables
+import pokershell.eval.vectorized as vectorized
 import pokershell.model as model
 import pokershell.tests.eval.common as common
 
@@ -28,6 +33,41 @@ class TestBruteForceSimulator(unittest.TestCase, common.TestUtilsMixin):
         print(result)
         self.assertTrue(result.win / result.total > 0.9)
 
+    def test_flop(self):
+        cards = model.Card.parse_cards_line('As Ad 2h 7h 9h')
+        result = self.simulator.simulate(2, *cards)
+        self.assertEqual(1081 * 990, result.total)
+        self.assertEqual(result.lose, sum(result.beating_hands))
+        self.assertTrue(0.65 < result.win_rate < 0.75)
+
+    def test_turn_symmetries(self):
+        cards = model.Card.parse_cards_line('As Ad 2h 7h 9h 3h')
+        result = self.simulator.simulate(2, *cards)
+        expected = simulation.ParallelSimulatorMixin._empty_result()
+        for river in model.Deck(*cards).cards:
+            expected += self.simulator._simulate_river(cards + (river,))
+        self.assertEqual(repr(expected), repr(result))
+
+    def test_turn_multiway(self):
+        cards = model.Card.parse_cards_line('As Ad 2h 7h 9h 3h')
+        for player_num in (3, 4):
+            result = self.simulator.simulate(player_num, *cards)
+            expected = simulation.ParallelSimulatorMixin._empty_result()
+            for river in model.Deck(*cards).cards:
+                expected += self.simulator._simulate_river(cards + (river,), player_num)
+            self.assertEqual(repr(expected), repr(result))
+            self.assertEqual(result.lose, sum(result.beating_hands))
+
+    def test_river_multiway(self):
+        cards = model.Card.parse_cards_line('As 6c Ad 8s Ac 6d 9d')
+        result = self.simulator.simulate(4, *cards)
+        self.assertEqual(990 * 903 * 820 // 6, result.total)
+        self.assertTrue(result.win_rate > 0.9)
+
+    def test_flop_multiway(self):
+        cards = model.Card.parse_cards_line('As Ad 2h 7h 9h')
+        self.assertRaises(ValueError, self.simulator.simulate, 3, *cards)
+
     def test_turn_bad_luck(self):
         cards = model.Card.parse_cards_line('2c 4d 8c Js Qd Qc')
         result = self.simulator.simulate(2, *cards)
@@ -52,6 +92,39 @@ class TestMonteCarloSimulator(unittest.TestCase, common.TestUtilsMixin):
         print(result)
         self.assertTrue(result.tie < result.win < result.lose)
 
+    def test_resume(self):
+        cards = model.Card.parse_cards_line('As 6c Ad 8s Ac')
+        simulator = monte_carlo(sim_samples=2000)
+        first = simulator.simulate(3, *cards)
+        result = simulator.simulate(3, *cards, result=first)
+        self.assertTrue(result.total >= first.total + 2000)
+        self.assertTrue(result.win >= first.win)
+        self.assertEqual(result.lose, sum(result.beating_hands))
+
+    def test_progress(self):
+        cards = model.Card.parse_cards_line('As 6c Ad 8s Ac')
+        partial_results = []
+        result = monte_carlo(0.3).simulate(3, *cards, progress=partial_results.append)
+        self.assertTrue(len(partial_results) > 1)
+        totals = [partial.total for partial in partial_results]
+        self.assertEqual(sorted(totals), totals)
+        self.assertEqual(result.total, totals[-1])
+
+    def test_interrupt(self):
+        cards = model.Card.parse_cards_line('As 6c Ad 8s Ac')
+        partial_results = []
+
+        def progress(result):
+            partial_results.append(result)
+            if len(partial_results) == 2:
+                raise KeyboardInterrupt()
+
+        start = time.time()
+        result = monte_carlo(10).simulate(3, *cards, progress=progress)
+        self.assertTrue(time.time() - start < 5)
+        self.assertIs(partial_results[-1], result)
+        self.assertFalse(simulation.worker_pool.running)
+
     def test_river_full_house(self):
         cards = model.Card.parse_cards_line('As 6c Ad 8s Ac 6d 9d')
         result = self.simulator.simulate(5, *cards)
@@ -77,6 +150,34 @@ class TestMonteCarloSimulator(unittest.TestCase, common.TestUtilsMixin):
         self.assertEquals(result.win, sum(result.winning_hands))
         self.assertEquals(result.lose, sum(result.beating_hands))
 
+    def test_sample_num(self):
+        cards = model.Card.parse_cards_line('As 6c')
+        result = self.simulator._sample(5, 10, tuple(cards), sample_num=500)
+        self.assertEqual(500, result.total)
+
+    def test_sim_samples(self):
+        cards = model.Card.parse_cards_line('As 6c 8s 8c 2d')
+        simulator = monte_carlo(10, sim_samples=3000)
+        result = simulator.simulate(3, *cards)
+        self.assertTrue(3000 <= result.total < 3000 + simulation.worker_pool.processes)
+
+    def test_time_limit(self):
+        self.assertEqual(monte_carlo.default_cycle, monte_carlo().time_limit)
+        self.assertEqual(math.inf, monte_carlo(sim_samples=3000).time_limit)
+        self.assertEqual(math.inf, monte_carlo(sim_precision=1.0).time_limit)
+        self.assertEqual(2, monte_carlo(2, sim_samples=3000).time_limit)
+        cards = model.Card.parse_cards_line('As 6c 8s 8c 2d')
+        result = monte_carlo(sim_samples=3000).simulate(3, *cards)
+        self.assertTrue(3000 <= result.total < 3000 + simulation.worker_pool.processes)
+
+    def test_sim_precision(self):
+        cards = model.Card.parse_cards_line('As 6c 8s 8c 2d')
+        start_time = time.time()
+        result = monte_carlo(10, sim_precision=1.0).simulate(3, *cards)
+        self.assertTrue(time.time() - start_time < 5)
+        low, high = result.confidence_interval()
+        self.assertTrue(high - low <= 0.02)
+
     def test_performance(self):
         cards = model.Card.parse_cards_line('As Ah Ad 8s Ac 7d')
         start_time = time.time()
@@ -106,6 +207,152 @@ class TestLookUpSimulator(unittest.TestCase, common.TestUtilsMixin):
         result = self.simulator.simulate(5, *cards)
         self.assertEqual(55.78, result.win)
 
+    def test_suit_relabeling(self):
+        for line in ('Ac 6c', 'Ad 6d', 'Ah 6h', 'As 6s'):
+            result = self.simulator.simulate(5, *model.Card.parse_cards_line(line))
+            self.assertEqual(23.33, result.win)
+
+
+class TestKnownHandsSimulator(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.simulator = simulation.KnownHandsSimulator(sim_cycle=10, sim_samples=2000)
+
+    @staticmethod
+    def _parse(line, *opponents):
+        return (model.Card.parse_cards_line(line),
+                [model.Card.parse_cards_line(hole) for hole in opponents])
+
+    def test_river_split_pot(self):
+        cards, opponents = self._parse('As 6c Ts Tc Th Td Kd', 'Ah 2c', 'Ad 3c')
+        result = self.simulator.simulate(3, *cards, opponents=opponents)
+        self.assertTrue(self.simulator.exact)
+        self.assertEqual((0, 1, 0), (result.win, result.tie, result.lose))
+        for share in result.equities:
+            self.assertAlmostEqual(1 / 3, share)
+
+    def test_flop(self):
+        cards, opponents = self._parse('As Ad 2c 7d 9h', 'Kh Kd')
+        result = self.simulator.simulate(2, *cards, opponents=opponents)
+        self.assertTrue(self.simulator.exact)
+        self.assertEqual((907, 0, 83), (result.win, result.tie, result.lose))
+        self.assertEqual([907, 83], result.equities)
+        self.assertEqual(result.lose, sum(result.beating_hands))
+
+    def test_flop_multiway(self):
+        cards, opponents = self._parse('As Ad 2c 7d 9h', 'Kh Kd', 'Qs Qc')
+        known = [[card.code for card in hole] for hole in [cards[:2]] + opponents]
+        board = [card.code for card in cards[2:]]
+        deck = [code for code in range(52) if code not in sum(known, board)]
+        expected = self.simulator._enumerate(known, board, 0, deck,
+                                             itertools.combinations(deck, 2))
+        result = self.simulator.simulate(3, *cards, opponents=opponents)
+        self.assertEqual(repr(expected), repr(result))
+        self.assertEqual(43 * 42 // 2, result.total)
+        self.assertAlmostEqual(result.total, sum(result.equities))
+
+    def test_river_unknown_opponent(self):
+        cards, opponents = self._parse('As Ad 2c 7d 9h Ts 3c', 'Kh Kd')
+        result = self.simulator.simulate(3, *cards, opponents=opponents)
+        self.assertTrue(self.simulator.exact)
+        self.assertEqual(43 * 42 // 2, result.total)
+        self.assertEqual(result.lose, sum(result.beating_hands))
+        self.assertTrue(result.win <= result.equities[0] <= result.win + result.tie)
+        # kings never beat aces on this board, the unknown hand does
+        self.assertEqual(0, result.equities[1])
+        self.assertTrue(result.lose)
+
+    def test_pre_flop_sampling(self):
+        cards, opponents = self._parse('As Ad', 'Kh Kd')
+        result = self.simulator.simulate(4, *cards, opponents=opponents)
+        self.assertFalse(self.simulator.exact)
+        self.assertTrue(result.total >= 2000)
+        self.assertTrue(0.4 < result.win_rate < 0.8)
+
+    def test_too_many_opponents(self):
+        cards, opponents = self._parse('As Ad', 'Kh Kd', 'Qh Qd')
+        self.assertRaises(ValueError, self.simulator.simulate, 2, *cards,
+                          opponents=opponents)
+        cards, opponents = self._parse('As Ad', 'As Kd')
+        self.assertRaises(ValueError, self.simulator.simulate, 2, *cards,
+                          opponents=opponents)
+
+
+class TestRangeSimulator(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.simulator = simulation.RangeSimulator(sim_cycle=10, sim_samples=20000)
+
+    @staticmethod
+    def _exact(cards, opponent_range):
+        """Returns player's win rate counted over all holes of range and runouts."""
+        codes = [card.code for card in cards]
+        holes, weights = opponent_range.live(codes)
+        win, total = 0, 0
+        for hole, weight in zip(holes, weights):
+            deck = [code for code in range(52) if code not in codes + list(hole)]
+            for runout in itertools.combinations(deck, 7 - len(codes)):
+                strength = tables.evaluate(codes + list(runout))
+                other = tables.evaluate(list(hole) + codes[2:] + list(runout))
+                win += weight * (strength > other)
+                total += weight
+        return win / total
+
+    def test_river(self):
+        cards = model.Card.parse_cards_line('As Ad 2c 7d 9h Ts 3c')
+        opponent_range = ranges.Range.parse('TT+, AQs+, KJo:0.5')
+        result = self.simulator.simulate(2, *cards, ranges=[opponent_range])
+        self.assertTrue(self.simulator.exact)
+        self.assertAlmostEqual(self._exact(cards, opponent_range), result.win_rate)
+        self.assertAlmostEqual(result.total, sum(result.equities))
+        self.assertEqual(result.lose, sum(result.beating_hands))
+
+    def test_river_known_opponent(self):
+        cards = model.Card.parse_cards_line('As 6c Ts Tc Th Td Kd')
+        opponents = [model.Card.parse_cards_line('Ah 2c')]
+        result = self.simulator.simulate(3, *cards, opponents=opponents,
+                                         ranges=[ranges.Range.parse('AdKs, 99')])
+        # aces split with ace of the range, pocket nines lose to both kickers
+        self.assertEqual((0, 700, 0), (result.win, result.tie, result.lose))
+        for expected, share in zip([1000 / 3, 1000 / 3, 100 / 3], result.equities):
+            self.assertAlmostEqual(expected, share)
+
+    def test_turn_sampling(self):
+        cards = model.Card.parse_cards_line('As Kd 2c 7d 9h Ts')
+        opponent_range = ranges.Range.parse('TT+, AQs+, KJo')
+        expected = self._exact(cards, opponent_range)
+        available = vectorized.AVAILABLE
+        try:
+            for vectorized.AVAILABLE in {False, available}:
+                result = self.simulator.simulate(2, *cards, ranges=[opponent_range])
+                self.assertFalse(self.simulator.exact)
+                self.assertTrue(result.total >= 20000)
+                self.assertAlmostEqual(expected, result.win_rate, delta=0.02)
+        finally:
+            vectorized.AVAILABLE = available
+
+    def test_pre_flop_multiway(self):
+        cards = model.Card.parse_cards_line('As Kd')
+        opponent_ranges = [ranges.Range.parse('TT+, AQs+'), ranges.Range.parse('22+')]
+        result = self.simulator.simulate(5, *cards, ranges=opponent_ranges)
+        self.assertEqual(3, len(result.equities))
+        self.assertTrue(result.equities[1] > result.equities[0])
+
+    def test_blocked_range(self):
+        cards = model.Card.parse_cards_line('As Ad 2c 7d 9h')
+        opponents = [model.Card.parse_cards_line('Ah Ac')]
+        self.assertRaises(ValueError, self.simulator.simulate, 3, *cards,
+                          opponents=opponents, ranges=[ranges.Range.parse('AA')])
+
+    def test_ranges_blocking_each_other(self):
+        cards = model.Card.parse_cards_line('As Ah')
+        opponent_ranges = [ranges.Range.parse('AA'), ranges.Range.parse('AA')]
+        self.assertRaises(ValueError, self.simulator.simulate, 3, *cards,
+                          ranges=opponent_ranges)
+        opponent_ranges = [ranges.Range.parse('AA, KK'), ranges.Range.parse('AA')]
+        self.assertTrue(simulation.RangeSimulator._can_deal(
+            [opponent_range.live([])[0] for opponent_range in opponent_ranges]))
+
 
 class TestSimulatorManager(unittest.TestCase):
     def setUp(self):
@@ -120,6 +367,11 @@ class TestSimulatorManager(unittest.TestCase):
     def test_flop(self):
         cards = model.Card.parse_cards_line('As 6c Ad 8s Ac')
         simulator = self.manager.find_simulator(2, *cards)
+        self.assertIsInstance(simulator, simulation.BruteForceSimulator)
+
+    def test_flop_three_players(self):
+        cards = model.Card.parse_cards_line('As 6c Ad 8s Ac')
+        simulator = self.manager.find_simulator(3, *cards)
         self.assertIsInstance(simulator, monte_carlo)
 
     def test_turn(self):
@@ -132,6 +384,11 @@ class TestSimulatorManager(unittest.TestCase):
         simulator = self.manager.find_simulator(2, *cards)
         self.assertIsInstance(simulator, simulation.BruteForceSimulator)
 
+    def test_river_four_players(self):
+        cards = model.Card.parse_cards_line('As 6c Ad 8s Ac 4d 5h')
+        simulator = self.manager.find_simulator(4, *cards)
+        self.assertIsInstance(simulator, simulation.BruteForceSimulator)
+
     def test_river_five_players(self):
         cards = model.Card.parse_cards_line('As 6c Ad 8s Ac 4d 5h')
         simulator = self.manager.find_simulator(5, *cards)
@@ -142,8 +399,32 @@ class TestSimulatorManager(unittest.TestCase):
         simulator = self.manager.find_simulator(7, *cards)
         self.assertIsInstance(simulator, monte_carlo)
 
+    def test_known_opponents(self):
+        cards = model.Card.parse_cards_line('As 6c Ad 8s Ac 4d')
+        opponents = [model.Card.parse_cards_line('Kh Kd')]
+        simulator = self.manager.find_simulator(3, *cards, opponents=opponents)
+        self.assertIsInstance(simulator, simulation.KnownHandsSimulator)
+        simulator = self.manager.find_simulator(3, *cards, opponents=opponents,
+                                                ranges=[ranges.Range.parse('TT+')])
+        self.assertIsInstance(simulator, simulation.RangeSimulator)
+
 
 class TestSimulationResult(unittest.TestCase):
+    def test_add(self):
+        result1 = simulation.SimulationResult(3, 1, 2, [0, 3] + [0] * 7, [2] + [0] * 8)
+        result2 = simulation.SimulationResult(1, 0, 1, [1] + [0] * 8, [0, 1] + [0] * 7)
+        result = result1 + result2
+        self.assertEqual((4, 1, 3), (result.win, result.tie, result.lose))
+        self.assertEqual([1, 3] + [0] * 7, result.winning_hands)
+        self.assertEqual([2, 1] + [0] * 7, result.beating_hands)
+
+    def test_confidence_interval(self):
+        result = simulation.SimulationResult(2500, 0, 7500, None, None)
+        self.assertAlmostEqual(0.25 * 0.75 / 10000, result.variance)
+        low, high = result.confidence_interval()
+        self.assertAlmostEqual(0.25 - 1.96 * 0.0043301, low, places=5)
+        self.assertAlmostEqual(0.25 + 1.96 * 0.0043301, high, places=5)
+
     def test_beaten_by(self):
         beaten_by = [0, 0, 5824, 2736, 324, 849, 1478, 135, 6]
         result = simulation.SimulationResult(35000, 1600, 1100, None, beaten_by)
@@ -0,0 +1,122 @@
+import os
+import random
+import tempfile
+import unittest
+
+import pokershell.eval.manager as manager
+import pokershell.eval.tables as tables
+import pokershell.model as model
+
+
+class TestTables(unittest.TestCase):
+    def _evaluate(self, cards_str):
+        cards = model.Card.parse_cards_line(cards_str)
+        return tables.evaluate([card.code for card in cards])
+
+    def test_straight_table(self):
+        self.assertEqual(5, tables.STRAIGHT_TABLE[0b1000000001111])
+        self.assertEqual(14, tables.STRAIGHT_TABLE[0b1111100000000])
+        self.assertEqual(0, tables.STRAIGHT_TABLE[0b1000000000111])
+
+    def test_pack(self):
+        strength = tables.pack(model.Hand.TWO_PAIR, (11, 5, 14))
+        self.assertEqual(model.Hand.TWO_PAIR, tables.get_hand(strength))
+        self.assertEqual((model.Rank.JACK, model.Rank.FIVE, model.Rank.ACE),
+                         tables.get_ranks(strength))
+
+    def test_wheel(self):
+        strength = self._evaluate('2h 3c 4d Ac 5d Jc')
+        self.assertEqual(model.Hand.STRAIGHT, tables.get_hand(strength))
+        self.assertEqual((model.Rank.FIVE,), tables.get_ranks(strength))
+
+    def test_straight_flush(self):
+        strength = self._evaluate('2c 2h 3h 4h Ah 5h Jc')
+        self.assertEqual(model.Hand.STRAIGHT_FLUSH, tables.get_hand(strength))
+
+    def test_flush(self):
+        strength = self._evaluate('2h 9h 3h 4h Ah Kh 5c')
+        self.assertEqual(model.Hand.FLUSH, tables.get_hand(strength))
+        self.assertEqual((model.Rank.ACE, model.Rank.KING, model.Rank.NINE,
+                          model.Rank.FOUR, model.Rank.THREE), tables.get_ranks(strength))
+
+    def test_full_house_two_trips(self):
+        strength = self._evaluate('2h 2c 2d 5h Jh Js Jc')
+        self.assertEqual(model.Hand.FULL_HOUSE, tables.get_hand(strength))
+        self.assertEqual((model.Rank.JACK, model.Rank.DEUCE), tables.get_ranks(strength))
+
+    def test_compare_with_evaluators(self):
+        evaluator_manager = manager.EvaluatorManager()
+        rnd = random.Random(42)
+        cards = list(model.Card.all_cards())
+        for _ in range(3000):
+            hand = rnd.sample(cards, rnd.randint(5, 7))
+            expected = evaluator_manager.find_best_hand_by_evaluators(hand)
+            strength = tables.evaluate([card.code for card in hand])
+            self.assertEqual(expected.hand, tables.get_hand(strength))
+            self.assertEqual(tuple(expected.complement_ranks), tables.get_ranks(strength))
+
+
+class TestPartialHand(unittest.TestCase):
+    def test_evaluate(self):
+        rnd = random.Random(11)
+        for _ in range(2000):
+            codes = rnd.sample(range(tables.CARD_NUM), 7)
+            known = rnd.randint(0, 5)
+            state = tables.PartialHand(codes[:known])
+            self.assertEqual(tables.evaluate(codes), state.evaluate(*codes[known:]))
+            self.assertEqual(tables.evaluate(codes),
+                             state.add(*codes[known:5]).evaluate(*codes[5:]))
+
+    def test_add_keeps_state(self):
+        cards = model.Card.parse_cards_line('2h 9h 3h 4h')
+        state = tables.PartialHand([card.code for card in cards])
+        flush = state.add(model.Card.parse('Ah').code)
+        self.assertEqual(model.Hand.FLUSH, tables.get_hand(flush.evaluate()))
+        self.assertEqual(model.Hand.HIGH_CARD,
+                         tables.get_hand(state.evaluate(model.Card.parse('Ac').code)))
+
+
+class TestTableFile(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'ranks', 'hand_ranks.bin')
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def test_shipped_file(self):
+        flush, keys, values = tables.load_table_file()
+        self.assertEqual(tables.FLUSH_TABLE, list(flush))
+        self.assertEqual(len(tables.RANK_TABLE), len(keys))
+
+    def test_write_load(self):
+        tables.write_table_file(self.path)
+        flush, keys, values = tables.load_table_file(self.path)
+        self.assertEqual(tables.FLUSH_TABLE, list(flush))
+        self.assertEqual(tables.RANK_TABLE, dict(zip(keys, values)))
+
+    def test_rewrite_keeps_mapped_file(self):
+        tables.write_table_file(self.path)
+        flush = tables.load_table_file(self.path)[0]
+        tables.write_table_file(self.path)
+        self.assertEqual(tables.FLUSH_TABLE, list(flush))
+        self.assertEqual(['hand_ranks.bin'], os.listdir(os.path.dirname(self.path)))
+
+    def test_corrupted(self):
+        tables.write_table_file(self.path)
+        with open(self.path, 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'x')
+        self.assertRaises(ValueError, tables.load_table_file, self.path)
+
+    def test_stale(self):
+        tables.write_table_file(self.path)
+        with open(self.path, 'r+b') as f:
+            f.seek(4)
+            f.write(bytes(4))
+        self.assertRaises(ValueError, tables.load_table_file, self.path)
+
+    def test_missing(self):
+        self.assertRaises(FileNotFoundError, tables.load_table_file, self.path)
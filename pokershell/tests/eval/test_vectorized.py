@@ -0,0 +1,94 @@
+import itertools
+import random
+import unittest
+
+import pokershell.eval.lookup as lookup
+import pokershell.eval.ranges as ranges
+import pokershell.eval.simulation as simulation
+import pokershell.eval.tables as tables
+import pokershell.eval.vectorized as vectorized
+import pokershell.model as model
+
+
+@unittest.skipUnless(vectorized.AVAILABLE, 'numpy is not installed')
+class TestVectorized(unittest.TestCase):
+    def test_evaluate(self):
+        rnd = random.Random(7)
+        for card_num in range(5, 8):
+            hands = [rnd.sample(range(tables.CARD_NUM), card_num) for _ in range(2000)]
+            expected = [tables.evaluate(hand) for hand in hands]
+            self.assertEqual(expected, vectorized.evaluate(hands).tolist())
+
+    def test_evaluate_flush(self):
+        cards = model.Card.parse_cards_line('2h 9h 3h 4h Ah Kh 5c')
+        strengths = vectorized.evaluate([[card.code for card in cards]])
+        self.assertEqual(model.Hand.FLUSH, tables.get_hand(int(strengths[0])))
+
+    def test_sample(self):
+        rng = vectorized.numpy.random.default_rng(1)
+        deck_codes = list(range(10, 50))
+        sampled = vectorized.sample(rng, deck_codes, 100, 9)
+        self.assertEqual((100, 9), sampled.shape)
+        for row in sampled.tolist():
+            self.assertEqual(9, len(set(row)))
+            self.assertTrue(set(row) <= set(deck_codes))
+
+    def test_sample_batch(self):
+        cards = model.Card.parse_cards_line('4h 4d 8c 4c Qd')
+        result = simulation.MonteCarloSimulator()._sample_batch(5, 0.5, tuple(cards))
+        rate = result.win / result.total
+        self.assertTrue(0.75 <= rate <= 0.8)
+        self.assertEqual(result.win, sum(result.winning_hands))
+        self.assertEqual(result.lose, sum(result.beating_hands))
+
+    def test_preflop_equity(self):
+        holes = [[card.code for card in model.Card.parse_cards_line(line)]
+                 for line in ('Ah Ac', 'As 6c', '6c 6d')]
+        expected = [list(lookup.equity(4, *hole)) for hole in holes]
+        self.assertEqual(expected, vectorized.preflop_equity(4, holes).tolist())
+
+    def test_showdown_counts(self):
+        rnd = random.Random(5)
+        for _ in range(5):
+            cards = rnd.sample(range(tables.CARD_NUM), 7)
+            hole, other, board = cards[:2], cards[2:4], cards[4:]
+            expected = [0, 0, 0]
+            deck = [code for code in range(tables.CARD_NUM) if code not in cards]
+            for runout in itertools.combinations(deck, 2):
+                strength = tables.evaluate(hole + board + list(runout))
+                other_strength = tables.evaluate(other + board + list(runout))
+                if strength > other_strength:
+                    expected[0] += 1
+                elif strength == other_strength:
+                    expected[1] += 1
+                else:
+                    expected[2] += 1
+            self.assertEqual(tuple(expected),
+                             vectorized.showdown_counts(hole, other, board))
+
+    def test_sample_dead(self):
+        rng = vectorized.numpy.random.default_rng(3)
+        dead = vectorized.numpy.array([[0, 1], [2, 3], [4, 5]])
+        drawn = vectorized.sample(rng, range(8), 3, 6, dead)
+        for row, dead_row in zip(drawn.tolist(), dead.tolist()):
+            self.assertEqual(set(range(8)) - set(dead_row), set(row))
+
+    def test_alias_sample(self):
+        rng = vectorized.numpy.random.default_rng(3)
+        table = ranges.AliasTable([1, 3, 0, 4])
+        drawn = vectorized.alias_sample(rng, vectorized.numpy.array(table.probabilities),
+                                        vectorized.numpy.array(table.aliases), 80000)
+        counts = vectorized.numpy.bincount(drawn, minlength=4) / 80000
+        for expected, count in zip([0.125, 0.375, 0, 0.5], counts):
+            self.assertAlmostEqual(expected, count, places=2)
+
+    def test_board_strengths(self):
+        holes, board = [[0, 1], [4, 9], [50, 51]], [12, 22, 30, 41]
+        strengths = vectorized.board_strengths(holes, board)
+        deck = [code for code in range(tables.CARD_NUM)
+                if code not in board + sum(holes, [])]
+        self.assertEqual((len(deck), 3), strengths.shape)
+        expected = [[tables.evaluate(hole + board + [river]) for hole in holes]
+                    for river in deck]
+        self.assertEqual(sorted(expected), sorted(strengths.tolist()))
+        self.assertRaises(ValueError, vectorized.board_strengths, holes, [0])
@@ -0,0 +1,64 @@
+import csv
+import io
+import json
+import unittest
+
+import pokershell.batch as batch
+import pokershell.eval.cache as cache
+
+LINES = ['As 6c Ad 8s Ac 6d 7d',
+         'Ad 6h As 8d Ah 6s 7s',
+         '',
+         '# comment',
+         'As 6c 3',
+         'As As 2c 3c 4c',
+         'xx']
+
+
+class TestBatchEvaluator(unittest.TestCase):
+    def _evaluate(self, lines, window=None, result_cache=None):
+        stream = io.StringIO()
+        evaluator = batch.BatchEvaluator(batch.JsonLinesWriter(stream), window,
+                                         result_cache)
+        evaluator.evaluate(lines)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        return {record['line']: record for record in records}
+
+    def test_evaluate(self):
+        records = self._evaluate(LINES)
+        self.assertEqual({1, 2, 5, 6, 7}, set(records))
+        self.assertEqual('brute-force', records[1]['simulator'])
+        self.assertEqual(990, records[1]['total'])
+        self.assertEqual('look-up', records[5]['simulator'])
+        self.assertEqual(3, records[5]['player_num'])
+        self.assertIn('Duplicate cards', records[6]['error'])
+        self.assertIn('Invalid syntax', records[7]['error'])
+
+    def test_opponents(self):
+        records = self._evaluate(['As Ad 2c 7d 9h @KhKd'])
+        self.assertEqual('known-hands', records[1]['simulator'])
+        self.assertEqual(990, records[1]['total'])
+        self.assertEqual([91.6162, 8.3838], records[1]['equity'])
+
+    def test_ranges(self):
+        records = self._evaluate(['As Ad 2c 7d 9h Ts 3c @KK+', 'As 6c @XX'])
+        self.assertEqual('range', records[1]['simulator'])
+        # weights are counted in percents
+        self.assertEqual(700, records[1]['total'])
+        self.assertIn('error', records[2])
+
+    def test_duplicates(self):
+        result_cache = cache.ResultCache()
+        records = self._evaluate(LINES[:2] * 3, window=1, result_cache=result_cache)
+        self.assertEqual(6, len(records))
+        results = {(record['win'], record['tie'], record['lose'])
+                   for record in records.values()}
+        self.assertEqual(1, len(results))
+        self.assertEqual(1, result_cache.misses)
+
+    def test_csv(self):
+        stream = io.StringIO()
+        batch.BatchEvaluator(batch.CsvWriter(stream)).evaluate(LINES[:1])
+        rows = list(csv.DictReader(io.StringIO(stream.getvalue())))
+        self.assertEqual(1, len(rows))
+        self.assertEqual('990', rows[0]['total'])
@@ -0,0 +1,65 @@
+import itertools
+import unittest
+
+import pokershell.canonical as canonical
+import pokershell.model as model
+
+
+def _codes(cards_line):
+    return tuple(card.code for card in model.Card.parse_cards_line(cards_line))
+
+
+class TestSuitSymmetries(unittest.TestCase):
+    def test_permute(self):
+        permuted = canonical.permute(_codes('Ac Kd'), (3, 2, 1, 0))
+        self.assertEqual(_codes('As Kh'), permuted)
+
+    def test_rainbow(self):
+        symmetries = canonical.suit_symmetries(_codes('As Kd'), _codes('2h 7c 9s'))
+        self.assertEqual([(0, 1, 2, 3)], symmetries)
+
+    def test_monotone(self):
+        symmetries = canonical.suit_symmetries(_codes('2h 7h 9h'))
+        self.assertEqual(6, len(symmetries))
+
+    def test_orbits(self):
+        known = _codes('As Ad 2h 7h 9h')
+        deck = [code for code in range(52) if code not in known]
+        symmetries = canonical.suit_symmetries(known[:2], known[2:])
+        weights = canonical.orbits(itertools.combinations(deck, 2), symmetries)
+        self.assertEqual(1081, sum(weights.values()))
+        self.assertTrue(len(weights) < 1081)
+
+
+class TestCanonize(unittest.TestCase):
+    def test_equivalent(self):
+        form, perm = canonical.canonize(_codes('As Ks'), _codes('2h 7h 9c'))
+        other_form, _ = canonical.canonize(_codes('Ad Kd'), _codes('2c 7c 9s'))
+        self.assertEqual(form, other_form)
+        self.assertEqual(form, (canonical.permute(_codes('Ks As'), perm),
+                                tuple(sorted(canonical.permute(_codes('2h 7h 9c'),
+                                                               perm)))))
+
+    def test_not_equivalent(self):
+        form, _ = canonical.canonize(_codes('As Ks'), _codes('2h 7h 9c'))
+        other_form, _ = canonical.canonize(_codes('As Ks'), _codes('2s 7s 9c'))
+        self.assertNotEqual(form, other_form)
+
+    def test_invert(self):
+        perm = (2, 0, 3, 1)
+        codes = _codes('As Kd 2h 7c')
+        permuted = canonical.permute(codes, perm)
+        self.assertEqual(codes, canonical.permute(permuted, canonical.invert(perm)))
+
+    def test_classes(self):
+        preflop = canonical.classes(2)
+        self.assertEqual(169, len(preflop))
+        self.assertEqual(1326, sum(preflop.values()))
+        self.assertEqual(6, preflop[_codes('Ac Ad')])
+        self.assertEqual(4, preflop[_codes('Kc Ac')])
+        self.assertEqual(12, preflop[_codes('Kc Ad')])
+
+    def test_flop_classes(self):
+        flops = canonical.classes(3)
+        self.assertEqual(1755, len(flops))
+        self.assertEqual(22100, sum(flops.values()))
@@ -38,6 +38,21 @@ class TestCard(unittest.TestCase):
         loaded = pickle.loads(pickle.dumps(orig))
         self.assertEqual(orig, loaded)
 
+    def test_code(self):
+        self.assertEqual(0, model.Card.parse('2c').code)
+        self.assertEqual(51, model.Card.parse('As').code)
+        for code in range(52):
+            self.assertEqual(code, model.Card.from_code(code).code)
+
+    def test_canonize(self):
+        hole = model.Card.parse_cards_line('As Ks')
+        board = model.Card.parse_cards_line('2h 7h 9c')
+        other_hole = model.Card.parse_cards_line('Kd Ad')
+        other_board = model.Card.parse_cards_line('9s 2c 7c')
+        forms, perm = model.Card.canonize(hole, board)
+        self.assertEqual(forms, model.Card.canonize(other_hole, other_board)[0])
+        self.assertEqual(4, len(set(perm)))
+
     def test_hole_hand_combinations(self):
         all_cards = model.Card.all_cards()
         count = len(list(model.Card.all_combinations(all_cards, 2)))
@@ -63,6 +78,14 @@ class TestDeck(unittest.TestCase):
 
         self.assertEqual(52, len(set(all_cards())))
 
+    def test_orbits(self):
+        cards = model.Card.parse_cards_line('As Ad 2h 7h 9h')
+        orbits = model.Deck(*cards).orbits(2, cards[:2], cards[2:])
+        self.assertEqual(1081, sum(orbits.values()))
+        self.assertTrue(len(orbits) < 1081)
+        for combination in orbits:
+            self.assertFalse(set(combination) & set(cards))
+
     def test_pickle(self):
         orig = model.Deck()
         orig.shuffle()
@@ -102,3 +102,42 @@ class TestLineParser(unittest.TestCase):
         self.assertEqual(canonical, self.history(line + ' ;'))
         self.assertEqual(canonical, self.history(line + '; '))
         self.assertEqual(canonical, self.history(line + '; ;; '))
+
+    def test_parse_game(self):
+        state = parser.LineParser.parse_game('As 6c 6 0.2; 8c 8s qc 3 0.4')
+        self.assertEqual(3, state.player_num)
+        self.assertRaises(ValueError, parser.LineParser.parse_game, 'xx')
+        self.assertRaises(ValueError, parser.LineParser.parse_game, 'As As')
+
+    def test_parse_opponents(self):
+        parsed = self.parse('As6c AdAc6d @KhKd @QsJs')
+        self.assertEqual(2, len(parsed.opponents))
+        self.assertEqual('Kh', repr(parsed.opponents[0][0]))
+        self.assertEqual(3, parsed.player_num)
+        parsed = self.parse('As6c @KhKd 4')
+        self.assertEqual(4, parsed.player_num)
+        self.assertTrue(self.syntax('As6c @KhKd 4'))
+        self.assertFalse(self.syntax('As6c @Kx 4'))
+
+    def test_semantics_opponents(self):
+        self.assertFalse(self.semantics('As6c @KhKd @QsJs 3'))
+        self.assertEquals(1, self._error_count('As6c @Kh6c'))
+        self.assertEquals(1, self._error_count('As6c @KhKd @QsJs 2'))
+        self.assertEquals(1, self._error_count(
+            'As6c @KhKd @QsJs @2c3c @4c5c @6d7d @8d9d @TdJd @QdKc @AdAh @2h3h'))
+
+    def test_parse_ranges(self):
+        parsed = self.parse('As6c AdAc6d @KhKd @TT+,AQs+,KJo:0.5')
+        self.assertEqual(1, len(parsed.opponents))
+        self.assertEqual(1, len(parsed.ranges))
+        self.assertEqual(30 + 8 + 12, len(parsed.ranges[0]))
+        self.assertEqual(3, parsed.player_num)
+        self.assertTrue(self.syntax('As6c @TT+,AKs:0.5 4'))
+
+    def test_semantics_ranges(self):
+        self.assertFalse(self.semantics('As6c @TT+ @KhKd 3'))
+        self.assertEquals(1, self._error_count('As6c @Kh'))
+        self.assertEquals(1, self._error_count('As6c @TT+,JJs'))
+        self.assertEquals(1, self._error_count('As6c @TT+ @KhKd 2'))
+        self.assertEquals(1, self._error_count('AsKs AhAdAc @AA'))
+        self.assertEquals(1, self._error_count('AsAh @AdAc @AA'))
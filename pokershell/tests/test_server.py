@@ -0,0 +1,127 @@
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import pokershell.server as server
+
+
+class TestEquityServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.path = os.path.join(cls.directory, 'server.sock')
+        cls.loop = asyncio.new_event_loop()
+        cls.server = server.EquityServer()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(cls.loop)
+            cls.tcp = cls.loop.run_until_complete(cls.server.start(port=0))
+            cls.unix = cls.loop.run_until_complete(
+                asyncio.start_unix_server(cls.server._handle_connection, cls.path))
+            started.set()
+            cls.loop.run_forever()
+
+        cls.thread = threading.Thread(target=run, daemon=True)
+        cls.thread.start()
+        started.wait()
+        cls.port = cls.tcp.sockets[0].getsockname()[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run_coroutine_threadsafe(cls._stop(), cls.loop).result()
+        cls.loop.call_soon_threadsafe(cls.loop.stop)
+        cls.thread.join()
+        cls.loop.close()
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    @classmethod
+    async def _stop(cls):
+        for listening in (cls.tcp, cls.unix):
+            listening.close()
+            await listening.wait_closed()
+        await cls.server.stop()
+
+    def setUp(self):
+        super().setUp()
+        self.client = server.Client(port=self.port, timeout=30)
+
+    def tearDown(self):
+        self.client.close()
+        super().tearDown()
+
+    def test_health(self):
+        self.assertEqual('ok', self.client.health()['status'])
+
+    def test_look_up(self):
+        response = self.client.evaluate('As 6c 5')
+        self.assertEqual('look-up', response['simulator'])
+        self.assertEqual(19.21, response['win'])
+
+    def test_brute_force(self):
+        response = self.client.evaluate(cards=['As', '6c', 'Ad', '8s', 'Ac', '6d', '7d'])
+        self.assertEqual('brute-force', response['simulator'])
+        self.assertEqual(990, response['total'])
+        self.assertEqual(response, dict(response, id=response['id']))
+
+    def test_monte_carlo_budget(self):
+        response = self.client.evaluate(cards='As 6c 8h 9h 2c', player_num=5,
+                                        budget=0.3)
+        self.assertEqual('monte-carlo', response['simulator'])
+        self.assertTrue(response['time'] < 3)
+        self.assertIn('error', self.client.evaluate('As 6c 8h 9h 2c', budget=0.01))
+
+    def test_opponents(self):
+        response = self.client.evaluate(cards='As Ad 2c 7d 9h',
+                                        opponents=[['Kh', 'Kd']])
+        self.assertEqual('known-hands', response['simulator'])
+        self.assertEqual(2, response['player_num'])
+        self.assertEqual([91.6162, 8.3838], response['equity'])
+
+    def test_ranges(self):
+        response = self.client.evaluate(cards='As Ad 2c 7d 9h Ts 3c', ranges=['KK+'])
+        self.assertEqual('range', response['simulator'])
+        self.assertEqual(700, response['total'])
+        self.assertIn('error', self.client.evaluate(cards='As Ad', ranges=['XX']))
+
+    def test_errors(self):
+        self.assertIn('error', self.client.evaluate('xx'))
+        self.assertIn('error', self.client.evaluate(cards=['As', 'As']))
+        self.assertIn('error', self.client.request(type='unknown'))
+        for player_num in ('3', 3.5):
+            response = self.client.evaluate(cards='As 6c', player_num=player_num)
+            self.assertIn('error', response)
+
+    def test_not_object(self):
+        for line in ('"abc"\n', '[1, 2]\n', '{\n'):
+            self.client._file.write(line)
+            self.client._file.flush()
+            self.assertIn('error', json.loads(self.client._file.readline()))
+
+    def test_coalesced(self):
+        clients = [server.Client(port=self.port, timeout=30) for _ in range(4)]
+        try:
+            for client in clients:
+                client._file.write('{"line": "Kh Qh 2h 7h 9c Jd 3"}\n')
+                client._file.flush()
+            responses = [json.loads(client._file.readline()) for client in clients]
+        finally:
+            for client in clients:
+                client.close()
+        self.assertEqual(1, len({response['win'] for response in responses}))
+        stats = self.client.stats()
+        self.assertTrue(stats['batches'] >= 1)
+        self.assertTrue(stats.get('coalesced', 0) + stats['cache']['Hits'] >= 3)
+
+    def test_unix_socket(self):
+        client = server.Client(path=self.path, timeout=30)
+        try:
+            self.assertEqual('ok', client.health()['status'])
+        finally:
+            client.close()
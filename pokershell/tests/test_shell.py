@@ -1,13 +1,18 @@
+import io
 import unittest
 
 import pokershell.config as config
+import pokershell.eval.cache as cache
 import pokershell.eval.simulation as simulation
+import pokershell.eval.vectorized as vectorized
 import pokershell.shell as shell
 
 
 class TestShell(unittest.TestCase):
     def setUp(self):
         super().setUp()
+        self._cache_file = cache.ResultCache.cache_file.value
+        cache.ResultCache.cache_file.value = ''
         self.shell = shell.PokerShell()
         self._player_num = config.player_num
         self._sim_cycle = simulation.MonteCarloSimulator.sim_cycle
@@ -15,6 +20,7 @@ class TestShell(unittest.TestCase):
     def tearDown(self):
         config.player_num = self._player_num
         config.sim_cycle = self._sim_cycle
+        cache.ResultCache.cache_file.value = self._cache_file
         return super().tearDown()
 
     def test_brute_force(self):
@@ -35,6 +41,12 @@ class TestShell(unittest.TestCase):
     def test_look_up(self):
         self.shell.do_eval_look_up('As 6s 5')
 
+    @unittest.skipUnless(vectorized.AVAILABLE, 'numpy is not installed')
+    def test_matchup(self):
+        self.shell.do_matchup('AsKd QhQc')
+        self.shell.do_matchup('AA KK')
+        self.shell.do_matchup('AA')
+
     def test_eval(self):
         self.shell.do_eval('As 6c Ad 8s Ac 6d 7d')
 
@@ -44,6 +56,15 @@ class TestShell(unittest.TestCase):
     def test_eval_unbeatable(self):
         self.shell.do_eval('ad kd jd qd td 5 100.; 4 500. 3c 4d')
 
+    def test_eval_opponents(self):
+        self.shell.do_eval('As 6c Ad Ac 6d @KhKd @QsJs')
+        self.shell.do_eval_monte_carlo('As 6c @KhKd')
+
+    def test_eval_ranges(self):
+        self.shell.do_eval('As 6c Ad Ac 6d 2h 9c @KhKd @TT+,AQs+,KJo:0.5')
+        self.shell.do_eval('As 6c @TT+ @JJ')
+        self.shell.do_eval('As Ah @AA @AA')
+
     def test_eval_pre_flop(self):
         self.shell.do_eval('As 6c')
 
@@ -69,6 +90,60 @@ class TestShell(unittest.TestCase):
         self.shell.do_option_set('sim-cycle 33')
         self.assertEqual(33, simulation.MonteCarloSimulator.sim_cycle.value)
 
+    def test_eof(self):
+        self.shell.do_eval_brute_force('As 6c Ad 8s Ac 6d')
+        self.assertTrue(self.shell.do_EOF(''))
+        self.assertFalse(simulation.worker_pool.running)
+
+    def test_sim_samples(self):
+        self.shell.do_option_set('sim-samples 1000')
+        try:
+            self.shell.do_eval_monte_carlo('As 6s 8c 8s qc')
+        finally:
+            self.shell.do_option_set('sim-samples 0')
+
     def test_player_num(self):
         self.shell.do_option_set('player-num 5')
         self.assertEqual(5, config.player_num.value)
+
+    def test_cache(self):
+        self.shell.do_eval('As 6c Ad 8s Ac 6d 7d')
+        self.shell.do_eval('Ad 6h As 8d Ah 6s 7s')
+        self.shell.do_cache_stats('')
+        self.assertEqual((1, 1), (self.shell._cache.hits, self.shell._cache.misses))
+        self.shell.do_cache_clear('')
+        self.assertEqual((0, 0), (self.shell._cache.hits, self.shell._cache.misses))
+
+    def test_refine(self):
+        self.shell.do_refine('')
+        self.shell.do_option_set('sim-samples 1000')
+        try:
+            self.shell.do_eval_monte_carlo('As 6s 8c 8s qc')
+            self.shell.do_refine('')
+        finally:
+            self.shell.do_option_set('sim-samples 0')
+        self.assertEqual(1, self.shell._cache.hits)
+
+    def test_cancel(self):
+        class InterruptedSimulator(simulation.BruteForceSimulator):
+            def simulate(self, player_num, *cards):
+                raise KeyboardInterrupt()
+
+        state = self.shell._parse_history('As 6c Ad 8s Ac 6d')
+        self.shell._simulate(state, InterruptedSimulator())
+        self.assertEqual(0, self.shell._cache.stats()['Hits'])
+
+
+class TestProgressView(unittest.TestCase):
+    def test_redraw(self):
+        stream = io.StringIO()
+        view = shell.ProgressView(stream)
+        view.redraw_interval = 0
+        view.update(simulation.SimulationResult(10, 2, 8, None, None))
+        first = stream.getvalue()
+        self.assertIn('50.00%', first)
+        view.update(simulation.SimulationResult(30, 2, 8, None, None))
+        self.assertIn('\x1b[%dA' % first.count('\n'), stream.getvalue())
+        self.assertIn('75.00%', stream.getvalue())
+        view.clear()
+        self.assertTrue(stream.getvalue().endswith('\x1b[J'))
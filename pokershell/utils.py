@@ -1,3 +1,5 @@
+import os
+import tempfile
 from functools import lru_cache
 
 
@@ -18,3 +20,21 @@ class CommonEqualityMixin(object):
 class CommonReprMixin(object):
     def __repr__(self):
         return repr(self.__dict__)
+
+
+def write_file_atomic(path, data):
+    """Writes data to temporary file in the directory of 'path' and renames it over
+    'path', so that processes mapping the old file keep reading its pages and
+    concurrent readers never see half-written file.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -17,11 +17,16 @@ setuptools.setup(
     namespace_packages=[],
     packages=setuptools.find_packages(),
     package_data={
-        'pokershell.eval': ['preflop/*.txt']},
+        'pokershell.eval': ['preflop/*.txt', 'preflop/*.bin', 'ranks/*.bin']},
     include_package_data=True,
+    python_requires='>=3.9',
+    extras_require={
+        'numpy': ['numpy>=1.17']},
     entry_points={
         'console_scripts': [
-            'pokershell = pokershell.shell:main'
+            'pokershell = pokershell.shell:main',
+            'pokershell-tables = pokershell.eval.tables:main',
+            'pokershell-generate = pokershell.eval.generate:main'
         ]
     },
     keywords=['poker'],